@@ -0,0 +1,101 @@
+# Fixed vs adaptive batch sizes against a simulated browser agent.
+# The agent pays a per-batch overhead plus a per-company cost, and drops
+# companies according to a failure curve:
+#   steps   - each company takes a random number of agent steps; companies
+#             past the step budget are dropped (the real agent's max_steps)
+#   linear  - each company is dropped with probability slope * batch size
+#   crash   - the whole batch fails with probability slope * batch size
+# Simulated seconds run as milliseconds.
+# Usage: python3 bench_adaptive_batches.py [companies] [curve] [seed]
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from scheduler import AdaptiveBatchScheduler, BatchSizeController
+
+BATCH_OVERHEAD_SECONDS = 20.0
+COMPANY_SECONDS = 12.0
+STEP_BUDGET = 100
+STEPS_PER_COMPANY = (4, 14)
+DROP_SLOPE = 0.02
+TIME_SCALE = 0.001
+
+
+class SimulatedAgent:
+    def __init__(self, curve: str, seed: int):
+        self.curve = curve
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.seconds = 0.0
+
+    async def run_batch(self, batch):
+        self.calls += 1
+        size = len(batch)
+        returned = []
+        if self.curve == "steps":
+            steps = 0
+            for company in batch:
+                steps += self.random.randint(*STEPS_PER_COMPANY)
+                if steps > STEP_BUDGET:
+                    break
+                returned.append(company)
+        elif self.curve == "linear":
+            returned = [company for company in batch if self.random.random() >= DROP_SLOPE * size]
+        elif self.curve == "crash":
+            returned = list(batch)
+        else:
+            raise ValueError(f"unknown curve {self.curve}")
+
+        seconds = BATCH_OVERHEAD_SECONDS + COMPANY_SECONDS * size
+        self.seconds += seconds
+        await asyncio.sleep(seconds * TIME_SCALE)
+        if self.curve == "crash" and self.random.random() < DROP_SLOPE * size:
+            raise RuntimeError("agent crashed")
+        return [{"company_name": company[0]} for company in returned]
+
+
+def by_name(batch, result):
+    names = {company["company_name"] for company in result}
+    return [company for company in batch if company[0] in names]
+
+
+async def run(label, companies, curve, seed, controller, max_attempts):
+    agent = SimulatedAgent(curve, seed)
+    scheduler = AdaptiveBatchScheduler(
+        run_batch=agent.run_batch,
+        match_returned=by_name,
+        controller=controller,
+        concurrency=2,
+        max_attempts=max_attempts,
+    )
+    outcomes = await scheduler.run(companies)
+    enriched = sum(len(outcome.batch) - len(outcome.missing) for outcome in outcomes)
+    sizes = [size for _, _, _, size in controller.history]
+    print(
+        f"{label:<22} enriched={enriched:>4}/{len(companies):<4} lost={len(companies) - enriched:<4} "
+        f"batches={agent.calls:<4} agent_seconds={agent.seconds:>7.0f} "
+        f"per_company={agent.seconds / max(enriched, 1):5.1f}s final_size={sizes[-1] if sizes else '-'}"
+    )
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    curves = [sys.argv[2]] if len(sys.argv) > 2 else ["steps", "linear", "crash"]
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    companies = [[f"Company {i}", "SaaS", "Seed"] for i in range(count)]
+    for curve in curves:
+        print(f"curve={curve}")
+        for size in (5, 21):
+            fixed = BatchSizeController(initial=size, minimum=size, maximum=size)
+            await run(f"fixed {size}, no requeue", companies, curve, seed, fixed, max_attempts=1)
+        fixed = BatchSizeController(initial=21, minimum=21, maximum=21)
+        await run("fixed 21, requeue", companies, curve, seed, fixed, max_attempts=3)
+        await run("adaptive 5..20", companies, curve, seed, BatchSizeController(initial=5, maximum=20), max_attempts=3)
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+# Startup latency: persistent agent worker vs one agent.py process per batch.
+# Each "batch" is a ping that checks out a browser context, so the numbers
+# are pure per-batch overhead (interpreter, imports, Chromium, context).
+# Usage (from src/): python3 ../experiments/bench_agent_startup.py [batches]
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from main import AgentWorkerClient
+
+
+async def spawn_per_batch(batches: int) -> list:
+    timings = []
+    for _ in range(batches):
+        start = time.perf_counter()
+        worker = AgentWorkerClient(pool_size=1)
+        await worker.ping()
+        await worker.close()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def persistent_pool(batches: int) -> tuple:
+    start = time.perf_counter()
+    worker = AgentWorkerClient(pool_size=1)
+    await worker.start()
+    warmup = time.perf_counter() - start
+    timings = []
+    for _ in range(batches):
+        start = time.perf_counter()
+        await worker.ping()
+        timings.append(time.perf_counter() - start)
+    await worker.close()
+    return warmup, timings
+
+
+async def main():
+    batches = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    spawn = await spawn_per_batch(batches)
+    print(f"spawn-per-batch  total={sum(spawn):.2f}s per_batch={sum(spawn) / batches:.2f}s")
+
+    warmup, pooled = await persistent_pool(batches)
+    print(
+        f"persistent pool  total={warmup + sum(pooled):.2f}s warmup={warmup:.2f}s "
+        f"per_batch={sum(pooled) / batches * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
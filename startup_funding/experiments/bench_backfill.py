@@ -0,0 +1,144 @@
+# End-to-end backfill, offline: synthetic Inc42 weekly tables saved as HTML
+# (one week as a whole page with its publication date in a meta tag) loaded
+# into a local libsql file. Runs the first half of the range, with one
+# company failing to upload in the first week, then the whole range to show
+# the ledger skipping finished weeks but redoing the partial one, and checks
+# every week landed under its own snapshot_date. Report URLs dated outside
+# the range are never downloaded.
+# Usage: python3 bench_backfill.py [weeks] [rounds_per_week]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+
+import validate_and_upload
+from backfill import backfill, load_ledger, read_html_dir
+from resources import resources
+
+# Nothing listens here: fetching these would leave unresolved reports
+OUT_OF_RANGE_URLS = ["http://127.0.0.1:9/2023/06/03/weekly-funding-report/"]
+
+HEADER = ["Date", "Name", "Sector", "Funding Round Size", "Funding Round Type", "Investors"]
+STAGES = ["Seed", "Pre-Series A", "Series A", "Series B", "Series C"]
+SECTORS = ["Fintech", "Ecommerce", "Enterprisetech", "Healthtech", "Edtech"]
+# Word pairs rather than "Startup <n>", which the fuzzy name matcher rightly
+# treats as near-duplicates
+PREFIXES = ["Nova", "Kite", "Zen", "Orbit", "Pixel", "Quanta", "Ripple", "Sprout", "Tidal", "Vertex", "Bloom", "Cobalt", "Drift", "Ember", "Flux"]
+SUFFIXES = ["Labs", "Pay", "Health", "Cart", "Learn", "Works", "Logistics", "Grid", "Foods", "Mobility"]
+
+
+def company_name(i: int) -> str:
+    return f"{PREFIXES[i % len(PREFIXES)]} {SUFFIXES[i // len(PREFIXES) % len(SUFFIXES)]}"
+
+
+def inc42_table(published: date, rounds: int, week: int) -> str:
+    rows = ["<tr>" + "".join(f"<th>{cell}</th>" for cell in HEADER) + "</tr>"]
+    for i in range(rounds):
+        # Some companies raise again in later weeks
+        company = company_name((week * rounds + i) % (rounds * 3))
+        cells = [
+            published.strftime("%d %b %Y"),
+            company,
+            SECTORS[i % len(SECTORS)],
+            f"${i % 40 + 1} Mn",
+            STAGES[i % len(STAGES)],
+            f"Fund {i % 9}, Angel {i % 5}",
+        ]
+        rows.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+    return "<table>" + "".join(rows) + "</table>"
+
+
+def write_reports(directory: str, weeks: int, rounds: int, first: date) -> list:
+    dates = [first + timedelta(weeks=week) for week in range(weeks)]
+    for week, published in enumerate(dates):
+        table = inc42_table(published, rounds, week)
+        if week == 0:
+            # A whole saved page: source and date come from its head
+            path = os.path.join(directory, "saved-page.html")
+            html = (
+                f'<html><head><link rel="canonical" href="https://inc42.com/buzz/funding-week-{week}/">'
+                f'<meta property="article:published_time" content="{published}T09:00:00+05:30"></head>'
+                f"<body><article>{table}</article></body></html>"
+            )
+        else:
+            os.makedirs(os.path.join(directory, str(published)), exist_ok=True)
+            path = os.path.join(directory, str(published), "inc42.html")
+            html = table
+        with open(path, "w") as f:
+            f.write(html)
+    return dates
+
+
+def failing_first_upload(upload_week_delta):
+    """upload_week_delta reporting one failed company the first time it's called"""
+    calls = []
+
+    async def upload(client, funding_data, snapshot_date, *args, **kwargs):
+        calls.append(snapshot_date)
+        failed, stored = await upload_week_delta(client, funding_data, snapshot_date, *args, **kwargs)
+        if len(calls) == 1:
+            failed = failed + [funding_data.companies[0].company_name]
+        return failed, stored
+
+    return upload
+
+
+async def run(label, directory, database_url, ledger, **options):
+    start = time.perf_counter()
+    summary = await backfill(
+        read_html_dir(directory), OUT_OF_RANGE_URLS, database_url, ledger_file=ledger,
+        start_date="2024-01-01", **options
+    )
+    print(f"{label}: {summary} in {time.perf_counter() - start:.2f}s\n")
+    return summary
+
+
+async def main():
+    weeks = int(sys.argv[1]) if len(sys.argv) > 1 else 52
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "reports")
+        os.makedirs(directory)
+        dates = write_reports(directory, weeks, rounds, date(2024, 1, 6))
+        database_url = f"file:{os.path.join(tmp, 'backfill.db')}"
+        ledger = os.path.join(tmp, "ledger.jsonl")
+
+        halfway = str(dates[weeks // 2 - 1])
+        upload_week_delta = validate_and_upload.upload_week_delta
+        validate_and_upload.upload_week_delta = failing_first_upload(upload_week_delta)
+        try:
+            first = await run("first half", directory, database_url, ledger, end_date=halfway)
+        finally:
+            validate_and_upload.upload_week_delta = upload_week_delta
+        summary = await run("whole range (resumed)", directory, database_url, ledger)
+        await resources.aclose()
+
+        client = libsql_client.create_client(url=database_url)
+        try:
+            snapshots = await client.execute("SELECT COUNT(DISTINCT snapshot_date), COUNT(*) FROM funding_rounds")
+            companies = await client.execute("SELECT COUNT(*) FROM companies")
+        finally:
+            await client.close()
+        stored_weeks, stored_rounds = snapshots.rows[0]
+        print(f"snapshot dates stored: {stored_weeks}/{weeks}, rounds: {stored_rounds}/{weeks * rounds}, "
+              f"companies: {companies.rows[0][0]}, ledger entries: {len(load_ledger(ledger))}")
+        ok = (
+            stored_weeks == weeks
+            and stored_rounds == weeks * rounds
+            and len(first.partial_weeks) == 1
+            and summary.skipped_weeks == weeks // 2 - 1
+            and not first.unresolved_reports
+            and not summary.unresolved_reports
+        )
+        print("ok" if ok else "MISMATCH")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
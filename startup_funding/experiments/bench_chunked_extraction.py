@@ -0,0 +1,112 @@
+# Wall time and companies recovered vs chunk count for funding extraction,
+# against a local fake LLM whose latency grows with the number of companies
+# it writes out and which stops after MAX_OUTPUT_COMPANIES (like a model
+# hitting its output token limit). Then one chunk is refused, which should
+# cost only that chunk's companies.
+# Usage: python3 bench_chunked_extraction.py [companies]
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_openai import FakeOpenAIServer, prompt_text
+
+BASE_LATENCY = 0.3
+SECONDS_PER_COMPANY = 0.04
+MAX_OUTPUT_COMPANIES = 40
+
+DEAL = re.compile(r"^(Startup \d+) raised \$(\d+) million in a (Series [A-C]|Seed) round led by (.+)\.$", re.M)
+
+
+def extract_deals(request: dict) -> dict:
+    """The deals in the prompt, as the extraction schema, cut off at MAX_OUTPUT_COMPANIES"""
+    content = prompt_text(request)
+    source = "Inc42" if "from Inc42" in content else "Entrackr"
+    companies = [
+        {
+            "company_name": name,
+            "amount": int(amount),
+            "currency": "USD",
+            "amount_unit": "Mn",
+            "investors": [investors],
+            "industry_sector": "Fintech",
+            "funding_stage": stage,
+            "source": [source],
+        }
+        for name, amount, stage, investors in DEAL.findall(content)
+    ][:MAX_OUTPUT_COMPANIES]
+    return {"funding_companies_list": companies}
+
+
+def output_latency(request: dict, content: Optional[dict]) -> float:
+    return BASE_LATENCY + SECONDS_PER_COMPANY * len((content or {}).get("funding_companies_list", []))
+
+
+def refuse_first_deal(request: dict) -> Optional[dict]:
+    """A refusal for the chunk holding Startup 0, extraction for the rest"""
+    if "Startup 0 raised" in prompt_text(request):
+        return None
+    return extract_deals(request)
+
+
+def report(companies: int) -> str:
+    paragraphs = []
+    for i in range(companies):
+        paragraphs.append(f"[Startup {i}]")
+        paragraphs.append(
+            f"Startup {i} raised ${i % 20 + 1} million in a {('Seed', 'Series A', 'Series B', 'Series C')[i % 4]} "
+            f"round led by Fund {i % 7}."
+        )
+        paragraphs.append("The company plans to use the funds to expand its team and grow into new cities. " * 3)
+    return "\n".join(paragraphs)
+
+
+def main():
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    server = FakeOpenAIServer(respond=extract_deals, latency=output_latency).start()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": server.base_url,
+        "LLM_CACHE_DIR": tmp,
+        "LLM_CACHE_BYPASS": "1",
+    })
+    from funding import EXTRACTION_CONCURRENCY, ContentExtractor
+    from html_reduce import chunk_text
+
+    text = report(companies)
+    extractor = ContentExtractor()
+    print(f"{companies} companies, {len(text):,} chars, concurrency {EXTRACTION_CONCURRENCY}")
+    untruncated = BASE_LATENCY + SECONDS_PER_COMPANY * companies
+    print(f"one call without an output limit would take {untruncated:.2f}s")
+    for chunks in (1, 2, 4, 8, 16):
+        max_chars = len(text) // chunks + 1
+        start = time.perf_counter()
+        result = extractor.extract_funding_details_chunked(
+            [("Extracted Content from Entrackr", text)], max_chars=max_chars
+        )
+        elapsed = time.perf_counter() - start
+        found = len(result.funding_companies_list)
+        print(
+            f"chunks={len(chunk_text(text, max_chars)):<3} max_chars={max_chars:<7} "
+            f"companies={found:>4}/{companies:<4} wall={elapsed:6.2f}s"
+        )
+
+    server.respond = refuse_first_deal
+    max_chars = len(text) // 8 + 1
+    refused = len(DEAL.findall(next(chunk for chunk in chunk_text(text, max_chars) if "Startup 0 raised" in chunk)))
+    result = extractor.extract_funding_details_chunked([("Extracted Content from Entrackr", text)], max_chars=max_chars)
+    found = len(result.funding_companies_list)
+    ok = found == companies - refused
+    print(f"one chunk refused: companies={found}/{companies}, {refused} lost with it; " + ("ok" if ok else "MISMATCH"))
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
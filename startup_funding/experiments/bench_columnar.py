@@ -0,0 +1,170 @@
+# Columnar export vs SQL over libsql for the common aggregates: total raised
+# per sector per month, stage distribution and weekly totals. Seeds a local
+# libsql file with synthetic weekly rounds, exports it to Parquet and Arrow
+# IPC, appends one more week incrementally, re-exports after a company is
+# edited (only its weeks should be rewritten) and checks both paths agree.
+# The libsql timings are for a local file; over the network every row of a
+# row-by-row read also pays transfer time.
+# Usage: python3 bench_columnar.py [rounds] [weeks]
+import asyncio
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+
+from columnar import export_rounds, load_rounds, raised_by_sector_month, stage_distribution, weekly_totals
+from validate_and_upload import FundRaiseStages, create_turso_table
+
+SECTORS = ["Fintech", "Ecommerce", "Enterprisetech", "Healthtech", "Logistics", "Agritech", "Deeptech", "Edtech"]
+
+SECTOR_MONTH_SQL = '''
+    SELECT c.industry_sector, substr(fr.snapshot_date, 1, 7) AS month,
+           SUM(fr.amount_raised_usd), COUNT(fr.amount_raised_usd)
+    FROM funding_rounds fr JOIN companies c ON c.company_id = fr.company_id
+    GROUP BY 1, 2
+'''
+STAGE_SQL = "SELECT funding_stage, COUNT(*), SUM(amount_raised_usd) FROM funding_rounds GROUP BY 1"
+WEEKLY_SQL = "SELECT snapshot_date, SUM(amount_raised_usd), COUNT(*) FROM funding_rounds GROUP BY 1"
+# Row-by-row: what a client that aggregates in Python reads
+ROWS_SQL = '''
+    SELECT c.industry_sector, fr.snapshot_date, fr.funding_stage, fr.amount_raised_usd
+    FROM funding_rounds fr JOIN companies c ON c.company_id = fr.company_id
+'''
+
+
+def seed(path: str, rounds: int, weeks: int, first_week: int = 0) -> None:
+    rng = random.Random(first_week)
+    per_week = max(1, rounds // weeks)
+    stages = [str(stage) for stage in FundRaiseStages]
+    start = date(2020, 1, 4)
+    connection = sqlite3.connect(path)
+    companies = [(uuid.uuid4().hex, f"Company {first_week}-{i}", rng.choice(SECTORS)) for i in range(per_week * weeks)]
+    connection.executemany("INSERT INTO companies (company_id, company_name, industry_sector) VALUES (?, ?, ?)", companies)
+    connection.executemany(
+        "INSERT INTO funding_rounds (round_id, company_id, amount_raised_usd, funding_stage, snapshot_date, fingerprint) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (
+                uuid.uuid4().hex,
+                companies[week * per_week + i][0],
+                # Roughly one in ten amounts undisclosed
+                None if rng.random() < 0.1 else rng.lognormvariate(15, 1.2),
+                rng.choice(stages),
+                (start + timedelta(weeks=first_week + week)).isoformat(),
+                uuid.uuid4().hex,
+            )
+            for week in range(weeks)
+            for i in range(per_week)
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<44} {(time.perf_counter() - start) * 1000:9.1f}ms")
+    return result
+
+
+async def atimed(label: str, coro):
+    start = time.perf_counter()
+    result = await coro
+    print(f"  {label:<44} {(time.perf_counter() - start) * 1000:9.1f}ms")
+    return result
+
+
+def same(sql_rows, table, key_columns, value_column) -> bool:
+    arrow = {tuple(row[key] for key in key_columns): row[value_column] for row in table.to_pylist()}
+    return len(arrow) == len(sql_rows) and all(
+        math.isclose(arrow[tuple(row[:len(key_columns)])] or 0, row[len(key_columns)] or 0, rel_tol=1e-9)
+        for row in sql_rows
+    )
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 260
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "funding.db")
+        client = libsql_client.create_client(url=f"file:{path}")
+        await create_turso_table(client)
+        seed(path, rounds, weeks)
+        print(f"{rounds} rounds over {weeks} weeks\n")
+
+        print("export")
+        for file_format in ("parquet", "arrow"):
+            directory = os.path.join(tmp, file_format)
+            summary = await atimed(f"{file_format}: full", export_rounds(client, directory, file_format))
+            size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+            print(f"    {summary}, {size / 1e6:.1f} MB on disk")
+        seed(path, rounds // weeks, 1, first_week=weeks)
+        summary = await atimed("parquet: incremental after one new week", export_rounds(client, os.path.join(tmp, "parquet")))
+        print(f"    {summary}")
+
+        # Company columns are exported through the join; editing one must rewrite its weeks
+        company_id, = (await client.execute(
+            "SELECT company_id FROM funding_rounds GROUP BY company_id ORDER BY COUNT(*) DESC, company_id LIMIT 1"
+        )).rows[0]
+        await client.execute("UPDATE companies SET industry_sector = 'Spacetech' WHERE company_id = ?", [company_id])
+        company_weeks = sorted(row[0] for row in (await client.execute(
+            "SELECT snapshot_date FROM funding_rounds WHERE company_id = ?", [company_id]
+        )).rows)
+        summary = await atimed("parquet: incremental after a company edit", export_rounds(client, os.path.join(tmp, "parquet")))
+        print(f"    {summary}")
+        exported = load_rounds(os.path.join(tmp, "parquet"), columns=["company_id", "industry_sector"]).to_pylist()
+        edited = (
+            sorted(summary.written) == company_weeks
+            and all(row["industry_sector"] == "Spacetech" for row in exported if row["company_id"] == company_id)
+        )
+        print(f"    rewrote {len(summary.written)}/{len(company_weeks)} weeks of the edited company; "
+              + ("ok" if edited else "MISMATCH"))
+        print(f"  libsql file: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        print("\nsector x month totals")
+        sector_sql = (await atimed("SQL GROUP BY over libsql", client.execute(SECTOR_MONTH_SQL))).rows
+        await atimed("row-by-row read over libsql", client.execute(ROWS_SQL))
+        # The arrow export predates the extra week, so only parquet is compared
+        for file_format in ("arrow", "parquet"):
+            directory = os.path.join(tmp, file_format)
+            table = timed(f"{file_format}: load", lambda: load_rounds(
+                directory, columns=["industry_sector", "amount_raised_usd", "snapshot_date"]
+            ))
+            sector_arrow = timed(f"{file_format}: raised_by_sector_month", lambda: raised_by_sector_month(table))
+
+        print("\nstage distribution and weekly totals")
+        stage_sql = (await atimed("SQL stage GROUP BY over libsql", client.execute(STAGE_SQL))).rows
+        weekly_sql = (await atimed("SQL weekly GROUP BY over libsql", client.execute(WEEKLY_SQL))).rows
+        table = timed("parquet: load", lambda: load_rounds(
+            os.path.join(tmp, "parquet"), columns=["round_id", "funding_stage", "amount_raised_usd", "snapshot_date"]
+        ))
+        stages = timed("parquet: stage_distribution", lambda: stage_distribution(table))
+        weekly = timed("parquet: weekly_totals", lambda: weekly_totals(table))
+        recent = timed("parquet: load last 12 weeks only", lambda: load_rounds(
+            os.path.join(tmp, "parquet"), start_date=str(date(2020, 1, 4) + timedelta(weeks=weeks - 11))
+        ))
+        print(f"    {recent.num_rows} rows")
+        await client.close()
+
+    ok = (
+        edited
+        and same(sector_sql, sector_arrow, ["industry_sector", "month"], "amount_raised_usd_sum")
+        and same([(stage, total) for stage, _, total in stage_sql], stages, ["funding_stage"], "amount_raised_usd_sum")
+        and same([(day, count) for day, _, count in weekly_sql], weekly, ["snapshot_date"], "round_id_count")
+    )
+    print("\nSQL and columnar aggregates match" if ok else "\nMISMATCH between SQL and columnar aggregates")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+# Connections opened against a local OpenAI-compatible stub: a new OpenAI
+# client per call (previous behaviour) vs the shared ResourceRegistry pool.
+# Usage: python3 bench_connections.py [calls] [concurrency]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from openai import OpenAI
+from pydantic import BaseModel
+
+from fake_openai import FakeOpenAIServer
+from llm_cache import LLMCache
+from resources import ResourceRegistry
+
+
+class Answer(BaseModel):
+    company_name: str
+
+
+async def run(label, get_client, cache, calls, concurrency, server):
+    server.connections = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i):
+        async with semaphore:
+            messages = [{"role": "user", "content": f"call {i}"}]
+            await asyncio.to_thread(
+                cache.parse, get_client(), model="gpt-4o-mini", messages=messages, response_format=Answer
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} calls={calls:<5} connections={server.connections:<5} wall={elapsed * 1000:.0f}ms")
+
+
+async def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    server = FakeOpenAIServer().start()
+    base_url = server.base_url
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(directory=tmp, bypass=True)
+        await run("client per call", lambda: OpenAI(api_key="stub", base_url=base_url),
+                  cache, calls, concurrency, server)
+
+        registry = ResourceRegistry(max_connections=concurrency, max_keepalive_connections=concurrency)
+        await run("shared registry", lambda: registry.openai(api_key="stub", base_url=base_url),
+                  cache, calls, concurrency, server)
+        registry.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+# Currency normalization: fx.normalize_amounts over a week and fx.usd_amounts
+# over all of history vs a per-record loop that looks each rate up on its own.
+# Setting the pydantic fields dominates both per-week timings, so the
+# arithmetic is also timed alone.
+# Then uploads synthetic weeks to a local libsql file, corrects the rupee
+# rates and re-prices stored rounds with recompute_usd_amounts, checking the
+# stored amounts match the corrected table and a second pass changes nothing.
+# Usage: python3 bench_fx.py [rounds] [weeks]
+import asyncio
+import bisect
+import csv
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+
+from fx import DEFAULT_FX_RATES_FILE, FxTable, normalize_amounts, usd_amounts
+from models import FinalFundingDataList, FinalFundingDetails, FundRaiseStages
+from normalize import UNIT_VALUES
+from validate_and_upload import create_turso_table, insert_weekly_data, recompute_usd_amounts
+
+FIRST_WEEK = date(2019, 1, 5)
+# (currency, unit, typical number as written)
+AMOUNT_STYLES = [("INR", "Cr", 40), ("INR", "Lakh", 300), ("USD", "Mn", 8), ("USD", "K", 600), ("USD", None, 250_000)]
+STAGES = [FundRaiseStages.SEED, FundRaiseStages.SERIES_A, FundRaiseStages.SERIES_B, FundRaiseStages.PRE_SEED]
+
+
+def rate_rows(scale: float = 1.0) -> dict:
+    """currency -> sorted (date, per_usd) from the shipped table, rates scaled to fake a correction"""
+    with open(DEFAULT_FX_RATES_FILE, newline="") as f:
+        rows = csv.DictReader(line for line in f if line.strip() and not line.startswith("#"))
+        by_currency = {}
+        for row in rows:
+            by_currency.setdefault(row["currency"], []).append((row["date"], float(row["per_usd"]) * scale))
+    return {currency: sorted(rates) for currency, rates in by_currency.items()}
+
+
+def rate_table(rates: dict) -> FxTable:
+    return FxTable((effective, currency, per_usd) for currency, rows in rates.items() for effective, per_usd in rows)
+
+
+def synthetic_weeks(rounds: int, weeks: int):
+    rng = random.Random(11)
+    per_week = max(1, rounds // weeks)
+    result = []
+    for week in range(weeks):
+        snapshot_date = str(FIRST_WEEK + timedelta(weeks=week))
+        companies = []
+        for i in range(per_week):
+            currency, unit, typical = rng.choice(AMOUNT_STYLES)
+            disclosed = rng.random() > 0.1
+            companies.append(FinalFundingDetails(
+                company_name=f"Company {week}-{i}",
+                investors=[f"Fund {rng.randrange(50)}"],
+                industry_sector="Fintech",
+                funding_stage=rng.choice(STAGES),
+                source=["Inc42"],
+                amount_raw=round(rng.uniform(0.2, 3) * typical, 1) if disclosed else None,
+                amount_currency=currency if disclosed else None,
+                amount_unit=unit if disclosed else None,
+            ))
+        result.append((snapshot_date, companies))
+    return result
+
+
+def per_record(companies, snapshot_date: str, rates: dict, assign: bool = False):
+    """One rate lookup and conversion per record, the way a loop would do it"""
+    results = []
+    for company in companies:
+        if company.amount_raw is None:
+            results.append(None)
+            continue
+        rate = 1.0
+        if company.amount_currency != "USD":
+            rows = rates[company.amount_currency]
+            index = bisect.bisect_right([effective for effective, _ in rows], snapshot_date) - 1
+            rate = rows[max(index, 0)][1]
+        results.append(round(company.amount_raw * UNIT_VALUES.get(company.amount_unit, 1.0) / rate, 2))
+        if assign:
+            company.amount_raised_usd = results[-1]
+            company.fx_rate = rate
+    return results
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<48} {elapsed * 1000:9.1f}ms")
+    return result, elapsed
+
+
+async def stored_amounts(client) -> dict:
+    result = await client.execute(
+        "SELECT c.company_name, fr.amount_raised_usd, fr.fx_rate, fr.fingerprint "
+        "FROM funding_rounds fr JOIN companies c ON c.company_id = fr.company_id"
+    )
+    return {row[0]: tuple(row[1:]) for row in result.rows}
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    rates = rate_rows()
+    table = rate_table(rates)
+    history = synthetic_weeks(rounds, weeks)
+    companies = [company for _, week in history for company in week]
+    print(f"{len(companies)} rounds over {weeks} weeks\n")
+
+    print("convert every week")
+    expected, _ = timed("per-record loop, arithmetic only", lambda: [
+        value for snapshot_date, week in history for value in per_record(week, snapshot_date, rates)
+    ])
+    timed("per-record loop, setting the model fields", lambda: [
+        per_record(week, snapshot_date, rates, assign=True) for snapshot_date, week in history
+    ])
+    timed("normalize_amounts, one call per week", lambda: [
+        normalize_amounts(week, snapshot_date, table) for snapshot_date, week in history
+    ])
+    raw = [(company, snapshot_date) for snapshot_date, week in history for company in week if company.amount_raw is not None]
+    (history_usd, _), _ = timed("usd_amounts, all of history, arithmetic only", lambda: usd_amounts(
+        [company.amount_raw for company, _ in raw],
+        [company.amount_unit for company, _ in raw],
+        [company.amount_currency for company, _ in raw],
+        [snapshot_date for _, snapshot_date in raw],
+        table,
+    ))
+    converted = [company.amount_raised_usd for company in companies]
+    ok = converted == expected and history_usd.tolist() == [value for value in expected if value is not None]
+
+    print("\nre-price stored history after correcting the rupee rates by +1%")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = libsql_client.create_client(url=f"file:{os.path.join(tmp, 'funding.db')}")
+        await create_turso_table(client)
+        stored_weeks = history[-20:]
+        for snapshot_date, week in stored_weeks:
+            await insert_weekly_data(client, FinalFundingDataList(companies=week), snapshot_date, match_threshold=None)
+
+        corrected_rates = rate_rows(scale=1.01)
+        corrected = rate_table(corrected_rates)
+        checked, changed = await recompute_usd_amounts(client, corrected, dry_run=True)
+        print(f"  dry run: {checked} rounds with raw amounts, {changed} would change")
+        start = time.perf_counter()
+        checked, changed = await recompute_usd_amounts(client, corrected)
+        print(f"  {'recompute_usd_amounts':<48} {(time.perf_counter() - start) * 1000:9.1f}ms ({changed}/{checked} changed)")
+        _, changed_again = await recompute_usd_amounts(client, corrected)
+        stored = await stored_amounts(client)
+        await client.close()
+
+    expected_after = {
+        company.company_name: value
+        for snapshot_date, week in stored_weeks
+        for company, value in zip(week, per_record(week, snapshot_date, corrected_rates))
+    }
+    rupee_rounds = sum(1 for _, week in stored_weeks for company in week if company.amount_currency == "INR")
+    ok = ok and changed == rupee_rounds and changed_again == 0 and all(
+        stored[name][0] is None if value is None else math.isclose(stored[name][0], value, abs_tol=0.005)
+        for name, value in expected_after.items()
+    ) and all(
+        # Re-priced rounds drop their fingerprint so exports and diffs pick them up
+        (stored[company.company_name][2] is None) == (company.amount_currency == "INR")
+        for _, week in stored_weeks for company in week
+    )
+    print(f"  second pass changed {changed_again}")
+    print("\nconversions and re-priced history match" if ok else "\nMISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
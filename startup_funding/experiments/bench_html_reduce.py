@@ -0,0 +1,60 @@
+# Bytes in/out of the HTML reduction stage for saved report fixtures, and
+# checks that the stop marker is honoured when it straddles a feed() chunk
+# boundary or is split by inline tags.
+# Usage: python3 bench_html_reduce.py [fixture.html ...]
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from html_reduce import SERIES_WISE_DEALS_MARKER, reduce_html
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# (html, chunk_size, expected text) with SERIES_WISE_DEALS_MARKER as the stop marker
+STOP_MARKER_CASES = [
+    ("<p>A</p><p>B [Series-wise deals] xx</p>", 10, "A\nB [Series-wise deals]"),
+    ("<p>B [Series-<b>wise</b> deals] xx</p><p>C</p>", 64 * 1024, "B [Series-wise deals]"),
+    ("<p>B [Series-wise <a href='#'>deals]</a> xx</p>", 5, "B [Series-wise deals]"),
+    ("<p>[Series-wise</p><script>deals]</script><p>no marker here</p>", 3, "[Series-wise\nno marker here"),
+]
+
+
+def check_stop_marker(fixture_html: str) -> bool:
+    ok = True
+    for html, chunk_size, expected in STOP_MARKER_CASES:
+        text, _ = reduce_html(html, stop_marker=SERIES_WISE_DEALS_MARKER, chunk_size=chunk_size)
+        if text != expected:
+            print(f"stop marker MISMATCH for {html!r} in {chunk_size}-char chunks: {text!r}")
+            ok = False
+    # Any chunking of a real report gives the same text as one feed()
+    whole, _ = reduce_html(fixture_html, stop_marker=SERIES_WISE_DEALS_MARKER)
+    for chunk_size in (3, 7, 10, 64, 1000):
+        text, _ = reduce_html(fixture_html, stop_marker=SERIES_WISE_DEALS_MARKER, chunk_size=chunk_size)
+        if text != whole:
+            print(f"stop marker MISMATCH for the Entrackr fixture in {chunk_size}-char chunks")
+            ok = False
+    return ok
+
+
+def main():
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    for path in paths:
+        with open(path) as f:
+            html = f.read()
+        stop_marker = SERIES_WISE_DEALS_MARKER if "entrackr" in os.path.basename(path) else None
+        start = time.perf_counter()
+        _, stats = reduce_html(html, source=os.path.basename(path), stop_marker=stop_marker)
+        elapsed = time.perf_counter() - start
+        print(f"{stats} in {elapsed * 1000:.2f}ms")
+
+    with open(os.path.join(FIXTURES_DIR, "entrackr_weekly.html")) as f:
+        ok = check_stop_marker(f.read())
+    print(f"stop marker: {len(STOP_MARKER_CASES)} cases and fixture chunkings " + ("ok" if ok else "MISMATCH"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Startup cost of the CLI and shared modules, measured with `python -X importtime`.
+# Light commands must not import the heavy SDKs; exits 1 if one does or if a
+# command's import time goes over its budget.
+# Usage: python3 bench_importtime.py [runs]
+import os
+import re
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+HEAVY = ("selenium", "browser_use", "langchain_openai", "langchain_core", "openai", "libsql_client", "aiohttp", "httpx", "pyarrow", "numpy")
+
+# (label, python args, budget in ms for the sum of top-level imports)
+CASES = [
+    ("cli.py --help", ["cli.py", "--help"], 150),
+    ("cli.py validate --help", ["cli.py", "validate", "--help"], 150),
+    ("import models", ["-c", "import models"], 400),
+    ("import validate_and_upload", ["-c", "import validate_and_upload"], 500),
+    ("import main", ["-c", "import main"], 600),
+    ("import funding", ["-c", "import funding"], 600),
+]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(args):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules.add(name.split(".")[0])
+        if indent == 1:
+            total_us += cumulative
+    return total_us / 1000, modules
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failures = []
+    for label, args, budget_ms in CASES:
+        samples = [measure(args) for _ in range(runs)]
+        best_ms = min(total for total, _ in samples)
+        heavy = sorted(set(HEAVY) & samples[0][1])
+        status = "ok"
+        if heavy:
+            status = f"imports {', '.join(heavy)}"
+        elif best_ms > budget_ms:
+            status = f"over {budget_ms}ms budget"
+        if status != "ok":
+            failures.append(label)
+        print(f"{label:<30} {best_ms:8.1f}ms  {status}")
+    if failures:
+        print(f"\nStartup regressions: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# inc42_parser on the saved Inc42 weekly fixture: every parsed row and the
+# confidence that decides whether the LLM is skipped, plus the same table
+# with stage labels that have no FundRaiseStages value, which must come out
+# as "Not Available" without lowering confidence.
+# Usage: python3 bench_inc42_parser.py [repeats]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from inc42_parser import MIN_CONFIDENCE, parse_inc42_table
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "inc42_weekly.html")
+
+# (company, amount_raw, currency, unit, stage, sector, investors)
+EXPECTED = [
+    ("Cashfree Payments", 53.0, "USD", "Mn", "Series C", "Fintech", ["Krafton", "Apis Partners", "Lightrock"]),
+    ("Captain Fresh", 15.0, "USD", "Mn", "Not Available", "Ecommerce", ["SBI Holdings", "Prosus"]),
+    ("TrueFoundry", 19.0, "USD", "Mn", "Series A", "Enterprisetech", ["Intel Capital", "Eniac Ventures", "Peak XV's Surge"]),
+    ("HairOriginals", 5.0, "USD", "Mn", "Series A", "Ecommerce", ["Fireside Ventures", "Kae Capital"]),
+    ("Shadowfax", 100.0, "USD", "Mn", "Series F", "Logistics", ["TPG NewQuest", "Nippon India"]),
+    ("Nua", 750.0, "USD", "K", "Pre-Seed", "Ecommerce", ["Blume Ventures"]),
+    ("Presentations.AI", 3.0, "USD", "Mn", "Seed", "Enterprisetech", ["Accel", "Pi Ventures"]),
+    ("Babynama", 4.5, "INR", "Cr", "Seed", "Healthtech", ["Inflection Point Ventures"]),
+    ("Quicklend", 80.0, "INR", "Lakh", "Pre-Seed", "Fintech", ["Angel investors"]),
+    ("Arya.ag", 10.0, "USD", "Mn", "Debt", "Agritech", ["Blue Earth Capital"]),
+    ("Ati Motors", 20.0, "USD", "Mn", "Series B", "Deeptech", ["Walden Catalyst", "Exfinity Venture Partners"]),
+    ("Boba Bhai", None, None, None, "Not Available", "Consumer Services", ["Rukam Capital"]),
+]
+# Stage labels that are recognised but have no stage of their own
+UNMAPPED_STAGES = ["Pre-Series A", "Bridge", "Pre-IPO", "Private Equity"]
+
+
+def as_tuple(row: dict) -> tuple:
+    return (
+        row["company_name"], row["amount_raw"], row["amount_currency"], row["amount_unit"],
+        row["funding_stage"], row["industry_sector"], row["investors"],
+    )
+
+
+def with_stage(html: str, company: str, stage: str) -> str:
+    """The fixture with `company`'s blank stage cell set to `stage`"""
+    lines = html.splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        if f">{company}<" in line:
+            lines[i] = line.replace('"2":"–"}\'>–<', f'"2":"{stage}"}}\'>{stage}<')
+    return "".join(lines)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open(FIXTURE) as f:
+        html = f.read()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parsed = parse_inc42_table(html)
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"{len(parsed.rows)} rows, confidence {parsed.confidence:.2f} (LLM skipped at >= {MIN_CONFIDENCE}), "
+          f"{elapsed * 1000:.2f}ms per parse")
+
+    ok = parsed.confidence == 1.0 and not parsed.problems
+    for expected, row in zip(EXPECTED, parsed.rows):
+        match = as_tuple(row) == expected
+        ok = ok and match
+        print(f"  {'ok' if match else 'MISMATCH':<8} {as_tuple(row)}")
+    ok = ok and len(parsed.rows) == len(EXPECTED)
+
+    print()
+    for stage in UNMAPPED_STAGES:
+        variant = parse_inc42_table(with_stage(html, "Captain Fresh", stage))
+        row = next(row for row in variant.rows if row["company_name"] == "Captain Fresh")
+        match = row["funding_stage"] == "Not Available" and variant.confidence == 1.0
+        ok = ok and match
+        print(f"  {stage!r:<18} -> {row['funding_stage']!r}, confidence {variant.confidence:.2f}  "
+              f"{'ok' if match else 'MISMATCH'}")
+
+    print("\nparsed rows match" if ok else "\nMISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
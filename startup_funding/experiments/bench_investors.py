@@ -0,0 +1,157 @@
+# Investor lookups: LIKE scans over funding_rounds.investors vs the
+# round_investors index, on a synthetic multi-year dataset. The one-off
+# backfill of round_investors is interrupted partway first, and the re-run
+# has to resume from where it stopped and link every round exactly once.
+# Usage: python3 bench_investors.py [rounds] [investor_pool]
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+from name_index import investor_key
+from validate_and_upload import migrate_turso_schema, query_rounds_by_investor, query_top_investors
+
+WEEKS = 260
+
+
+def seed(path: str, rounds: int, pool: int) -> None:
+    rng = random.Random(11)
+    investors = ["Accel"] + [f"Fund {i} Capital" for i in range(pool - 1)]
+    weights = [1 / (rank + 1) for rank in range(pool)]
+    companies = max(1, rounds // 20)
+    company_ids = [uuid.uuid4().hex for _ in range(companies)]
+    start = date(2020, 1, 4)
+
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE companies (company_id TEXT PRIMARY KEY, company_name TEXT UNIQUE, industry_sector TEXT, website TEXT, linkedin TEXT, brief_summary TEXT, enriched_at TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+    connection.execute("CREATE TABLE funding_rounds (round_id TEXT PRIMARY KEY, company_id TEXT, amount_raised_usd REAL, funding_stage TEXT, valuation_usd REAL, investors TEXT, sources TEXT, snapshot_date TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP, UNIQUE(company_id, snapshot_date))")
+    connection.executemany(
+        "INSERT INTO companies (company_id, company_name, industry_sector) VALUES (?, ?, 'Fintech')",
+        [(company_id, f"Company {i}") for i, company_id in enumerate(company_ids)],
+    )
+    rows = {}
+    while len(rows) < rounds:
+        company_id = rng.choice(company_ids)
+        snapshot_date = (start + timedelta(weeks=rng.randrange(WEEKS))).isoformat()
+        backers = set(rng.choices(investors, weights=weights, k=rng.randint(1, 4)))
+        rows[(company_id, snapshot_date)] = ",".join(backers)
+    connection.executemany(
+        "INSERT INTO funding_rounds (round_id, company_id, amount_raised_usd, investors, sources, snapshot_date) VALUES (?, ?, ?, ?, 'Inc42', ?)",
+        ((uuid.uuid4().hex, company_id, rng.random() * 1e7, backers, snapshot_date) for (company_id, snapshot_date), backers in rows.items()),
+    )
+    connection.commit()
+    connection.close()
+
+
+class InterruptedClient:
+    """Fails the batch after `batches` successful ones, like a dropped connection"""
+
+    def __init__(self, client, batches: int):
+        self.client = client
+        self.batches = batches
+        self.sent = 0
+        # Batches that moved the round links backfill marker
+        self.link_pages = 0
+
+    async def execute(self, *args, **kwargs):
+        return await self.client.execute(*args, **kwargs)
+
+    async def batch(self, statements):
+        if self.sent >= self.batches:
+            raise ConnectionError("connection dropped")
+        statements = list(statements)
+        self.sent += 1
+        self.link_pages += any("INTO schema_meta" in getattr(stmt, "sql", stmt) for stmt in statements)
+        return await self.client.batch(statements)
+
+
+def expected_links(path: str) -> int:
+    connection = sqlite3.connect(path)
+    rows = connection.execute("SELECT investors FROM funding_rounds WHERE investors IS NOT NULL").fetchall()
+    connection.close()
+    return sum(len({investor_key(name) for name in row[0].split(",")} - {""}) for row in rows)
+
+
+async def timed(label: str, query) -> list:
+    start = time.perf_counter()
+    result = await query()
+    print(f"{label:<42} rows={len(result):<5} {(time.perf_counter() - start) * 1000:9.1f}ms")
+    return result
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    pool = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, rounds, pool)
+        client = libsql_client.create_client(url=f"file:{path}")
+        try:
+            interrupted = InterruptedClient(client, batches=1 + rounds // 2000 // 2)
+            try:
+                await migrate_turso_schema(interrupted)
+            except ConnectionError:
+                print(f"backfill interrupted after {interrupted.sent} batches")
+            resumed = InterruptedClient(client, batches=10**9)
+            started = time.perf_counter()
+            await migrate_turso_schema(resumed)
+            pages = -(-rounds // 2000)
+            print(f"resumed: linked the rest of {rounds:,} rounds in {time.perf_counter() - started:.1f}s, "
+                  f"{interrupted.link_pages} + {resumed.link_pages} marker writes for {pages} pages")
+            links = (await client.execute("SELECT COUNT(*) FROM round_investors")).rows[0][0]
+            marker = (await client.execute("SELECT value FROM schema_meta")).rows[0][0]
+            # +2: the initial '0' marker and the final 'done'
+            expected = expected_links(path)
+            ok = (
+                links == expected
+                and marker == "done"
+                and interrupted.link_pages > 1
+                and interrupted.link_pages + resumed.link_pages == pages + 2
+            )
+            print(f"round_investors rows: {links}/{expected}, marker {marker!r}; " + ("ok" if ok else "MISMATCH"))
+
+            async def like_scan(investor):
+                return (await client.execute(
+                    "SELECT company_id, snapshot_date FROM funding_rounds WHERE investors LIKE ? ORDER BY snapshot_date DESC LIMIT 50",
+                    [f"%{investor}%"],
+                )).rows
+
+            async def like_top_investors():
+                # Without the join table every comma string has to be split client-side
+                result = await client.execute(
+                    "SELECT investors, amount_raised_usd FROM funding_rounds WHERE snapshot_date >= ? AND investors IS NOT NULL",
+                    ["2024-01-01"],
+                )
+                counts, totals = Counter(), Counter()
+                for investors, amount in result.rows:
+                    for name in investors.split(","):
+                        counts[name] += 1
+                        totals[name] += amount or 0
+                top = sorted(counts, key=lambda name: (counts[name], totals[name]), reverse=True)[:20]
+                return [(name, counts[name], totals[name]) for name in top]
+
+            # The most active investor fills a page early; a long-tail one makes LIKE scan everything
+            for investor in ("Accel", f"Fund {pool * 3 // 4} Capital"):
+                await timed(f"LIKE scan: rounds by {investor}", lambda: like_scan(investor))
+                await timed(f"indexed:   rounds by {investor}", lambda: query_rounds_by_investor(client, investor))
+            like_top = await timed("LIKE scan: top investors since 2024", like_top_investors)
+            top = await timed("indexed:   top investors since 2024", lambda: query_top_investors(client, start_date="2024-01-01"))
+            same_top = [(name, rounds) for name, rounds, _ in like_top] == [(row[0], row[1]) for row in top]
+            print("top investors agree" if same_top else "top investors MISMATCH")
+            ok = ok and same_top
+        finally:
+            await client.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
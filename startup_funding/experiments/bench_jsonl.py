@@ -0,0 +1,80 @@
+# Throughput and memory of the JSON Lines writer/reader vs json.load, and
+# recovery from an append torn by a crash.
+# Usage: python3 bench_jsonl.py [number_of_records]
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from jsonl_store import JsonLinesWriter, iter_json_lines
+from validate_and_upload import AdditionalFundingDetailsList, FundingDetailsAdditionalFields
+
+BATCH_SIZE = 1000
+
+
+def synthetic_record(i: int) -> dict:
+    return {
+        "company_name": f"Company {i}",
+        "website": f"https://company{i}.example",
+        "linkedin": f"https://www.linkedin.com/company/company-{i}",
+        "brief_summary": "Builds software for small and medium businesses in India. " * 2,
+        "valuation_usd": float(i * 1000),
+    }
+
+
+def measure(label: str, fn) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20} records={count:<7} {count / elapsed:>10,.0f} rec/s  peak={peak / 1024 / 1024:.1f} MiB")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "extended.jsonl")
+        json_path = os.path.join(tmp, "extended.json")
+        writer = JsonLinesWriter(jsonl_path)
+
+        def write_jsonl():
+            for start in range(0, n, BATCH_SIZE):
+                writer.append(synthetic_record(i) for i in range(start, min(start + BATCH_SIZE, n)))
+            return n
+
+        def count_streamed():
+            return sum(1 for _ in iter_json_lines(jsonl_path, FundingDetailsAdditionalFields))
+
+        def count_json_load():
+            with open(json_path) as f:
+                return len(AdditionalFundingDetailsList.model_validate(json.load(f)).companies)
+
+        measure(f"jsonl write (fsync/{BATCH_SIZE})", write_jsonl)
+        with open(json_path, "w") as f:
+            json.dump({"companies": [synthetic_record(i) for i in range(n)]}, f)
+        measure("jsonl stream read", count_streamed)
+        measure("json.load read", count_json_load)
+
+        # A crash mid-append leaves half a record and no newline
+        torn_path = os.path.join(tmp, "torn.jsonl")
+        torn = JsonLinesWriter(torn_path)
+        torn.append(synthetic_record(i) for i in range(3))
+        with open(torn_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(synthetic_record(3))[:40])
+        torn.append(synthetic_record(i) for i in range(4, 7))
+        names = [record.company_name for record in iter_json_lines(torn_path, FundingDetailsAdditionalFields)]
+        expected = [f"Company {i}" for i in (0, 1, 2, 4, 5, 6)]
+        ok = names == expected
+        print(f"after a torn append: read {len(names)} records, only the torn one lost; "
+              + ("ok" if ok else f"MISMATCH {names}"))
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
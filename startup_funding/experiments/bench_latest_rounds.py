@@ -0,0 +1,94 @@
+# Latest-round query latency: correlated MAX() subquery vs the latest_round table.
+# Seeds a local database with companies x weekly snapshots of funding rounds.
+# Usage: python3 bench_latest_rounds.py [rounds] [weeks]
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+from validate_and_upload import FundRaiseStages, create_turso_table, migrate_turso_schema, query_latest_rounds
+
+SECTORS = ["Fintech", "Ecommerce", "Enterprisetech", "Healthtech", "Logistics", "Agritech", "Deeptech", "Edtech"]
+
+CORRELATED_QUERY = '''
+    SELECT c.company_name, c.industry_sector, fr.amount_raised_usd, fr.funding_stage,
+           fr.valuation_usd, fr.investors, fr.snapshot_date
+    FROM companies c
+    LEFT JOIN funding_rounds fr ON c.company_id = fr.company_id
+    WHERE fr.snapshot_date = (
+        SELECT MAX(snapshot_date) FROM funding_rounds WHERE company_id = c.company_id
+    ) {filters}
+    ORDER BY fr.snapshot_date DESC, c.company_id
+    LIMIT 50
+'''
+
+
+def seed(path: str, rounds: int, weeks: int) -> None:
+    rng = random.Random(7)
+    companies = max(1, rounds // weeks)
+    stages = [str(stage) for stage in FundRaiseStages]
+    start = date(2020, 1, 4)
+    connection = sqlite3.connect(path)
+    company_ids = [uuid.uuid4().hex for _ in range(companies)]
+    connection.executemany(
+        "INSERT INTO companies (company_id, company_name, industry_sector) VALUES (?, ?, ?)",
+        [(company_id, f"Company {i}", rng.choice(SECTORS)) for i, company_id in enumerate(company_ids)],
+    )
+    connection.executemany(
+        "INSERT INTO funding_rounds (round_id, company_id, amount_raised_usd, funding_stage, snapshot_date) VALUES (?, ?, ?, ?, ?)",
+        (
+            (uuid.uuid4().hex, company_id, rng.random() * 1e8, rng.choice(stages), (start + timedelta(weeks=week)).isoformat())
+            for week in range(weeks)
+            for company_id in company_ids
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+
+async def timed(label: str, query) -> None:
+    start = time.perf_counter()
+    rows = await query()
+    print(f"{label:<40} rows={len(rows):<4} {(time.perf_counter() - start) * 1000:9.1f}ms")
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 260
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        client = libsql_client.create_client(url=f"file:{path}")
+        try:
+            # Tables first, then history, then the migration backfills latest_round
+            await client.execute("CREATE TABLE IF NOT EXISTS companies (company_id TEXT PRIMARY KEY, company_name TEXT UNIQUE, industry_sector TEXT, website TEXT, linkedin TEXT, brief_summary TEXT, enriched_at TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+            await client.execute("CREATE TABLE IF NOT EXISTS funding_rounds (round_id TEXT PRIMARY KEY, company_id TEXT, amount_raised_usd REAL, funding_stage TEXT, valuation_usd REAL, investors TEXT, sources TEXT, snapshot_date TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP, UNIQUE(company_id, snapshot_date))")
+            started = time.perf_counter()
+            seed(path, rounds, weeks)
+            print(f"seeded {rounds:,} rounds in {time.perf_counter() - started:.1f}s")
+            started = time.perf_counter()
+            await migrate_turso_schema(client)
+            await create_turso_table(client)
+            print(f"latest_round backfill in {time.perf_counter() - started:.1f}s")
+
+            async def correlated(filters="", args=()):
+                return (await client.execute(CORRELATED_QUERY.format(filters=filters), list(args))).rows
+
+            await timed("before: first page", correlated)
+            await timed("after:  first page", lambda: query_latest_rounds(client))
+            await timed("before: stage + sector", lambda: correlated("AND fr.funding_stage = ? AND c.industry_sector = ?", ("Series A", "Fintech")))
+            await timed("after:  stage + sector", lambda: query_latest_rounds(client, stage="Series A", sector="Fintech"))
+            await timed("after:  page 20", lambda: query_latest_rounds(client, offset=1000))
+        finally:
+            await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+# LLMCache.parse against a fake OpenAI client that counts calls and takes a
+# fixed time per call: misses vs hits, TTL expiry, LRU eviction down to the
+# size cap, LLM_CACHE_BYPASS, and a hit whose file is evicted by another
+# process before it can be touched.
+# Usage: python3 bench_llm_cache.py [entries] [call_ms]
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pydantic import BaseModel
+
+import llm_cache as llm_cache_module
+from llm_cache import LLMCache
+
+MODEL = "gpt-4o-mini"
+
+
+class Summary(BaseModel):
+    company_name: str
+    highlights: List[str]
+
+
+class FakeClient:
+    """client.beta.chat.completions.parse, answering from the prompt after `latency` seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self.parse)))
+
+    def parse(self, *, model, messages, response_format):
+        self.calls += 1
+        time.sleep(self.latency)
+        name = messages[-1]["content"]
+        parsed = response_format(company_name=name, highlights=[f"{name} raised a round"] * 20)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))],
+            usage=SimpleNamespace(prompt_tokens=len(name), completion_tokens=200),
+        )
+
+
+def ask(cache: LLMCache, client: FakeClient, name: str):
+    return cache.parse(client, model=MODEL, messages=[{"role": "user", "content": name}], response_format=Summary)
+
+
+def key(name: str) -> str:
+    return LLMCache.make_key(MODEL, [{"role": "user", "content": name}], Summary)
+
+
+def disk_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(directory) for name in files)
+
+
+def check(label, ok):
+    print(f"  {'ok' if ok else 'MISMATCH':<8} {label}")
+    return ok
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5) / 1000
+    names = [f"Company {i}" for i in range(entries)]
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{entries} prompts, {latency * 1000:.0f}ms per fake LLM call")
+        client = FakeClient(latency)
+        cache = LLMCache(directory=os.path.join(tmp, "hits"))
+        start = time.perf_counter()
+        first = [ask(cache, client, name) for name in names]
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        second = [ask(cache, client, name) for name in names]
+        warm = time.perf_counter() - start
+        print(f"  cold {cold * 1000:.0f}ms, warm {warm * 1000:.0f}ms; {cache.summary()}")
+        ok &= check("second pass served from the cache", client.calls == entries and cache.hits == entries)
+        ok &= check("cached values equal the fresh ones", first == second)
+
+        client = FakeClient(0)
+        cache = LLMCache(directory=os.path.join(tmp, "ttl"), ttl_seconds=0.05)
+        ask(cache, client, names[0])
+        ask(cache, client, names[0])
+        time.sleep(0.1)
+        ask(cache, client, names[0])
+        ok &= check("entry older than ttl_seconds is refetched", client.calls == 2 and cache.hits == 1)
+
+        client = FakeClient(0)
+        directory = os.path.join(tmp, "lru")
+        cache = LLMCache(directory=directory, max_size_mb=0.05)
+        for name in names:
+            ask(cache, client, name)
+            # Keep the first entry recently used while the rest are written
+            ask(cache, client, names[0])
+        size = disk_size(directory)
+        print(f"  {size} bytes on disk after {entries} writes, cap {cache.max_size_mb * 1024 * 1024:.0f}; "
+              f"{cache.evictions} evictions")
+        ok &= check("evicted down to max_size_mb", cache.evictions > 0 and size <= cache.max_size_mb * 1024 * 1024)
+        ok &= check("recently used entry kept", os.path.exists(cache._path(key(names[0]))))
+        ok &= check("least recently used entry evicted", not os.path.exists(cache._path(key(names[1]))))
+        ok &= check("newest entry kept", os.path.exists(cache._path(key(names[-1]))))
+
+        client = FakeClient(0)
+        os.environ["LLM_CACHE_BYPASS"] = "1"
+        os.environ["LLM_CACHE_DIR"] = os.path.join(tmp, "bypass")
+        cache = LLMCache.from_env()
+        for _ in range(3):
+            ask(cache, client, names[0])
+        ok &= check("LLM_CACHE_BYPASS skips lookups", cache.bypass and client.calls == 3 and cache.hits == 0)
+        ok &= check("LLM_CACHE_BYPASS still stores responses", os.path.exists(cache._path(key(names[0]))))
+        del os.environ["LLM_CACHE_BYPASS"], os.environ["LLM_CACHE_DIR"]
+
+        client = FakeClient(0)
+        cache = LLMCache(directory=os.path.join(tmp, "race"))
+        ask(cache, client, names[0])
+        utime = llm_cache_module.os.utime
+
+        def evicted_meanwhile(path, *args, **kwargs):
+            os.remove(path)
+            return utime(path, *args, **kwargs)
+
+        llm_cache_module.os.utime = evicted_meanwhile
+        try:
+            value = ask(cache, client, names[0])
+        except OSError as e:
+            value = None
+            print(f"  get() raised {e!r}")
+        finally:
+            llm_cache_module.os.utime = utime
+        ok &= check("hit survives its file being evicted before the touch", value is not None and client.calls == 1)
+
+    print("\ncache ok" if ok else "\nMISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
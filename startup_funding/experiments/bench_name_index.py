@@ -0,0 +1,120 @@
+# Build/query time and accuracy of CompanyNameIndex on a synthetic name corpus.
+# Then the same corpus in a local libsql companies table: weekly uploads
+# resolving names against it, where only the first one reads every name and
+# later ones pick up just the companies added since. Recently enriched
+# companies must be found under this week's spelling too.
+# Usage: python3 bench_name_index.py [corpus_size] [queries]
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from name_index import CompanyNameIndex
+
+SYLLABLES = ["ka", "ra", "vi", "sha", "dow", "fax", "true", "foun", "dry", "va", "han", "zep", "to",
+             "nu", "cash", "free", "pay", "mint", "lo", "gi", "bo", "ba", "qui", "lend", "ar", "ya"]
+SUFFIXES = ["", "", "", " Technologies", ".ai", " Labs", " Pvt Ltd", ".in", " Health", " Capital"]
+
+
+def synthetic_name(rng: random.Random) -> str:
+    stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return stem.capitalize() + rng.choice(SUFFIXES)
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(name))
+    operation = rng.choice(["drop", "swap", "suffix"])
+    if operation == "drop":
+        return name[:i] + name[i + 1 :]
+    if operation == "swap" and i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+    return name + rng.choice([".ai", " Pvt Ltd", ""])
+
+
+async def weekly_resolves(corpus, rng: random.Random, weeks: int = 5, per_week: int = 60) -> bool:
+    import libsql_client
+
+    from validate_and_upload import create_turso_table, fetch_enriched_companies, resolve_existing_company_names
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = libsql_client.create_client(url=f"file:{os.path.join(tmp, 'names.db')}")
+        await create_turso_table(client)
+        await client.batch([
+            libsql_client.Statement(
+                "INSERT INTO companies (company_id, company_name) VALUES (?, ?)", [uuid.uuid4().hex, name]
+            )
+            for name in corpus
+        ])
+        ok = True
+        for week in range(weeks):
+            targets = rng.sample(corpus, per_week)
+            # A company stored since the last upload, e.g. by another process
+            added = f"Newco {week} Robotics"
+            await client.execute("INSERT INTO companies (company_id, company_name) VALUES (?, ?)", [uuid.uuid4().hex, added])
+            start = time.perf_counter()
+            # Quiet: the corpus deliberately holds ambiguous spellings
+            with contextlib.redirect_stdout(io.StringIO()):
+                resolved = await resolve_existing_company_names(
+                    client, [name.upper() for name in targets] + [added.lower()]
+                )
+            elapsed = time.perf_counter() - start
+            ok = ok and resolved.get(added.lower()) == added and all(
+                resolved.get(name.upper()) in (name, None) for name in targets
+            )
+            print(f"  upload {week + 1}: resolved {len(resolved)}/{per_week + 1} names in {elapsed * 1000:7.1f}ms")
+
+        await client.execute(
+            "UPDATE companies SET website = 'https://newco.example', linkedin = 'https://linkedin.com/company/newco', "
+            "enriched_at = datetime('now') WHERE company_name LIKE 'Newco % Robotics'"
+        )
+        respelled = [f"NEWCO {week} ROBOTICS" for week in range(weeks)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            enriched = await fetch_enriched_companies(client, respelled + ["Unknownco Robotics"])
+        found = sorted(enriched) == sorted(respelled) and all(
+            details.company_name == name for name, details in enriched.items()
+        )
+        print(f"  enriched companies found under a new spelling: {len(enriched)}/{weeks}")
+        ok = ok and found
+        await client.close()
+    return ok
+
+
+def main():
+    corpus_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    rng = random.Random(42)
+
+    corpus = list(dict.fromkeys(synthetic_name(rng) for _ in range(corpus_size)))
+    start = time.perf_counter()
+    index = CompanyNameIndex(corpus)
+    build = time.perf_counter() - start
+
+    targets = rng.sample(corpus, query_count)
+    queries = [misspell(name, rng) for name in targets]
+    start = time.perf_counter()
+    results = [index.match(query) for query in queries]
+    lookup = time.perf_counter() - start
+
+    correct = sum(result.name == target and not result.ambiguous for result, target in zip(results, targets))
+    ambiguous = sum(result.ambiguous for result in results)
+    unmatched = sum(result.name is None for result in results)
+    print(f"corpus={len(corpus):,} build={build:.2f}s lookups={query_count:,} "
+          f"per_lookup={lookup / query_count * 1000:.2f}ms")
+    print(f"correct={correct} ambiguous={ambiguous} unmatched={unmatched} "
+          f"wrong={query_count - correct - ambiguous - unmatched}")
+
+    print("\nresolve_existing_company_names against a companies table of the corpus")
+    ok = asyncio.run(weekly_resolves(corpus, rng))
+    print("stored names resolved" if ok else "MISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
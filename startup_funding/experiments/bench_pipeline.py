@@ -0,0 +1,142 @@
+# Resume check for the in-process pipeline with fake stages shaped like the
+# real ones: the first run fails in "enrich", the second run with the same
+# run_id must reuse the scrape/extract checkpoints and finish the rest.
+# Then resumes main.build_pipeline "a day later" from scrape/extract
+# checkpoints against a local libsql file, checking the rounds are filed
+# under the snapshot_date the run started with.
+# Usage: python3 bench_pipeline.py [companies]
+import asyncio
+import os
+import sys
+import tempfile
+from collections import Counter
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pydantic import BaseModel
+
+from pipeline import Pipeline, Stage, StageError
+
+
+class Names(BaseModel):
+    names: List[str]
+
+
+class Enriched(BaseModel):
+    websites: List[str]
+
+
+class Uploaded(BaseModel):
+    saved: int
+
+
+def fake_pipeline(companies: int, checkpoint_dir: str, calls: Counter, fail_enrich: bool) -> Pipeline:
+    async def scrape():
+        calls["scrape"] += 1
+        await asyncio.sleep(0.2)
+        return Names(names=[f"Company {i}" for i in range(companies)])
+
+    async def extract(scrape: Names):
+        calls["extract"] += 1
+        await asyncio.sleep(0.1)
+        return Names(names=[name.upper() for name in scrape.names])
+
+    async def enrich(extract: Names):
+        calls["enrich"] += 1
+        await asyncio.sleep(0.3)
+        if fail_enrich:
+            raise RuntimeError("browser crashed")
+        return Enriched(websites=[f"https://{name.lower().replace(' ', '')}.example" for name in extract.names])
+
+    async def merge(extract: Names, enrich: Enriched):
+        calls["merge"] += 1
+        return Names(names=[f"{name} {site}" for name, site in zip(extract.names, enrich.websites)])
+
+    async def upload(merge: Names):
+        calls["upload"] += 1
+        return Uploaded(saved=len(merge.names))
+
+    return Pipeline(
+        [
+            Stage("scrape", scrape, Names),
+            Stage("extract", extract, Names, depends_on=("scrape",)),
+            Stage("enrich", enrich, Enriched, depends_on=("extract",)),
+            Stage("merge", merge, Names, depends_on=("extract", "enrich")),
+            Stage("upload", upload, Uploaded, depends_on=("merge",)),
+        ],
+        checkpoint_dir=checkpoint_dir,
+    )
+
+
+async def main():
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    calls = Counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            await fake_pipeline(companies, tmp, calls, fail_enrich=True).run("week-1")
+            raise AssertionError("first run should fail")
+        except StageError as e:
+            print(f"run 1: {e}")
+            print(e.result.summary())
+
+        result = await fake_pipeline(companies, tmp, calls, fail_enrich=False).run("week-1")
+        print("run 2:")
+        print(result.summary())
+        assert calls == Counter(scrape=1, extract=1, enrich=2, merge=1, upload=1), calls
+        assert result.outputs["upload"].saved == companies
+        assert [timing.resumed for timing in result.timings] == [True, True, False, False, False]
+
+        # resume=False ignores the run's checkpoints and starts over, same run_id or not
+        await fake_pipeline(companies, tmp, calls, fail_enrich=False).run("week-1", resume=False)
+        assert calls["scrape"] == 2
+
+        await check_resumed_snapshot_date(tmp)
+    print("resume OK")
+
+
+async def check_resumed_snapshot_date(tmp: str) -> None:
+    import libsql_client
+
+    import main
+    from models import AdditionalFundingDetailsList, FundingDetails, FundingDetailsList, FundRaiseStages
+    from resources import resources
+    from validate_and_upload import create_turso_table
+
+    database_url = f"file:{os.path.join(tmp, 'pipeline.db')}"
+    client = libsql_client.create_client(url=database_url)
+    await create_turso_table(client)
+    checkpoint_dir = os.path.join(tmp, "checkpoints")
+
+    # What the run that started on 2025-03-01 checkpointed before failing
+    started = main.build_pipeline("https://inc42.com/a", "https://entrackr.com/b", "2025-03-01", checkpoint_dir=checkpoint_dir)
+    started.save_checkpoint("week-9", started.stages["scrape"], main.ScrapedReports(
+        inc42_url="https://inc42.com/a", inc42_html="", entrackr_url="https://entrackr.com/b", entrackr_html="",
+        snapshot_date="2025-03-01",
+    ))
+    started.save_checkpoint("week-9", started.stages["extract"], FundingDetailsList(funding_companies_list=[FundingDetails(
+        company_name="Kite Pay", amount_raised_usd=2_000_000, investors=["Fund 1"], industry_sector="Fintech",
+        funding_stage=FundRaiseStages.SEED, source=["Inc42"],
+    )]))
+
+    async def enrich(extract):
+        return AdditionalFundingDetailsList(companies=[])
+
+    # Resumed on another day, without a snapshot_date, so it defaults to today
+    turso_url, main.TURSO_URL = main.TURSO_URL, database_url
+    try:
+        resumed = main.build_pipeline("https://inc42.com/a", "https://entrackr.com/b", checkpoint_dir=checkpoint_dir)
+        resumed.stages["enrich"].run = enrich
+        result = await resumed.run("week-9")
+    finally:
+        main.TURSO_URL = turso_url
+        await resources.aclose()
+    stored = (await client.execute("SELECT DISTINCT snapshot_date FROM funding_rounds")).rows
+    await client.close()
+    print(f"resumed run uploaded under {result.outputs['upload'].snapshot_date}, stored {[row[0] for row in stored]}")
+    assert result.outputs["upload"].snapshot_date == "2025-03-01"
+    assert [row[0] for row in stored] == ["2025-03-01"]
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
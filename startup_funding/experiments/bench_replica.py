@@ -0,0 +1,172 @@
+# Local replica vs direct remote, with local libsql files standing in for
+# Turso: the "remote" is a file behind a client that adds a network round
+# trip per call. Uploads a week and runs the latest-rounds query (1) straight
+# against the remote, (2) through an online replica that pushes on close and
+# (3) through an offline replica while the remote is down, synced afterwards.
+# Checks all three remotes end up with the same rows, and reports how many
+# runs on one replica it takes for the first pull to pay for itself.
+# Usage: python3 bench_replica.py [seed_weeks] [rounds_per_week] [rtt_ms]
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+
+from models import FinalFundingDataList, FinalFundingDetails, FundRaiseStages
+from replica import ReplicaClient
+from validate_and_upload import create_turso_table, insert_weekly_data, query_latest_rounds, upload_week_delta
+
+PREFIXES = ["Nova", "Kite", "Zen", "Orbit", "Pixel", "Quanta", "Ripple", "Sprout", "Tidal", "Vertex", "Bloom", "Cobalt", "Drift", "Ember", "Flux"]
+SUFFIXES = ["Labs", "Pay", "Health", "Cart", "Learn", "Works", "Logistics", "Grid", "Foods", "Mobility"]
+STAGES = [FundRaiseStages.SEED, FundRaiseStages.SERIES_A, FundRaiseStages.SERIES_B, FundRaiseStages.PRE_SEED]
+
+
+class NetworkClient:
+    """Adds a round trip per call; `down` makes every call fail like an outage"""
+
+    def __init__(self, client, rtt: float):
+        self.client = client
+        self.rtt = rtt
+        self.down = False
+        self.round_trips = 0
+
+    async def _call(self, fn, *args):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+        if self.down:
+            raise ConnectionError("remote unreachable")
+        return await fn(*args)
+
+    async def execute(self, stmt, args=None):
+        return await self._call(self.client.execute, stmt, args)
+
+    async def batch(self, stmts):
+        return await self._call(self.client.batch, list(stmts))
+
+    async def close(self):
+        await self.client.close()
+
+
+def week(index: int, rounds: int) -> FinalFundingDataList:
+    return FinalFundingDataList(companies=[
+        FinalFundingDetails(
+            company_name=f"{PREFIXES[i % len(PREFIXES)]} {SUFFIXES[i // len(PREFIXES) % len(SUFFIXES)]}",
+            amount_raised_usd=float(((index + i) % 30 + 1) * 1_000_000),
+            investors=[f"Fund {i % 9}", f"Angel {i % 5}"],
+            industry_sector="Fintech",
+            funding_stage=STAGES[(index + i) % len(STAGES)],
+            source=["Inc42"],
+        )
+        # Half the companies are new each week, the rest raised before
+        for i in range(index * rounds // 2, index * rounds // 2 + rounds)
+    ])
+
+
+async def rows(path: str) -> set:
+    client = libsql_client.create_client(url=f"file:{path}")
+    try:
+        result = await client.execute('''
+            SELECT c.company_id, c.company_name, fr.snapshot_date, fr.amount_raised_usd, fr.funding_stage, lr.snapshot_date
+            FROM funding_rounds fr
+            JOIN companies c ON c.company_id = fr.company_id
+            JOIN latest_round lr ON lr.company_id = c.company_id
+        ''')
+        links = await client.execute("SELECT COUNT(*) FROM round_investors")
+    finally:
+        await client.close()
+    return {tuple(row[1:]) for row in result.rows} | {("round_investors", links.rows[0][0])}
+
+
+async def workload(client, new_week: FinalFundingDataList, snapshot_date: str) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    await upload_week_delta(client, new_week, snapshot_date)
+    timings["upload"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(5):
+        await query_latest_rounds(client, limit=50)
+    timings["5 queries"] = time.perf_counter() - start
+    return timings
+
+
+async def main():
+    seed_weeks = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    rtt = (float(sys.argv[3]) if len(sys.argv) > 3 else 40) / 1000
+    first = date(2024, 1, 6)
+    new_week = week(seed_weeks, rounds)
+    snapshot_date = str(first + timedelta(weeks=seed_weeks))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed = os.path.join(tmp, "seed.db")
+        client = libsql_client.create_client(url=f"file:{seed}")
+        await create_turso_table(client)
+        for index in range(seed_weeks):
+            await insert_weekly_data(client, week(index, rounds), str(first + timedelta(weeks=index)))
+        await client.close()
+        print(f"remote seeded with {seed_weeks} weeks x {rounds} rounds, {rtt * 1000:.0f}ms per round trip\n")
+
+        results, totals = {}, {}
+        for mode in ("direct", "replica", "offline"):
+            remote_path = os.path.join(tmp, f"remote-{mode}.db")
+            shutil.copy(seed, remote_path)
+            remote = NetworkClient(libsql_client.create_client(url=f"file:{remote_path}"), rtt)
+            replica_path = os.path.join(tmp, f"replica-{mode}.db")
+            start = time.perf_counter()
+            if mode == "direct":
+                timings = await workload(remote, new_week, snapshot_date)
+                await remote.close()
+            elif mode == "replica":
+                client = ReplicaClient(libsql_client.create_client(url=f"file:{replica_path}"), remote=remote)
+                await client.ensure_ready()
+                timings = {"first pull": time.perf_counter() - start}
+                timings.update(await workload(client, new_week, snapshot_date))
+                close_start = time.perf_counter()
+                await client.close()
+                timings["push on close"] = time.perf_counter() - close_start
+            else:
+                # Pull once while online, then lose the remote and keep working
+                client = ReplicaClient(libsql_client.create_client(url=f"file:{replica_path}"), remote=remote)
+                await client.ensure_ready()
+                await client.local.close()
+                remote.down = True
+                offline = ReplicaClient(libsql_client.create_client(url=f"file:{replica_path}"), offline=True)
+                timings = await workload(offline, new_week, snapshot_date)
+                queued = await offline.queued()
+                await offline.close()
+                remote.down = False
+                sync_start = time.perf_counter()
+                client = ReplicaClient(libsql_client.create_client(url=f"file:{replica_path}"), remote=remote)
+                result = await client.sync()
+                await client.close()
+                timings["sync"] = time.perf_counter() - sync_start
+                print(f"offline: {queued} statements queued while down; {result}")
+            total = time.perf_counter() - start
+            totals[mode] = (total, timings)
+            details = ", ".join(f"{label} {seconds * 1000:.0f}ms" for label, seconds in timings.items())
+            print(f"{mode:<8} total {total * 1000:7.0f}ms, {remote.round_trips:>4} remote round trips ({details})")
+            results[mode] = await rows(remote_path)
+
+    direct = totals["direct"][0]
+    replica, timings = totals["replica"]
+    first_pull = timings["first pull"]
+    # Later runs on the same replica skip the pull and pay the rest again
+    saved = direct - (replica - first_pull)
+    print(f"\nfirst run: replica {replica * 1000:.0f}ms vs direct {direct * 1000:.0f}ms; "
+          f"later runs save {saved * 1000:.0f}ms each, "
+          + (f"so the {first_pull * 1000:.0f}ms first pull pays off after {first_pull / saved:.1f} runs"
+             if saved > 0 else "so the first pull never pays off"))
+
+    ok = results["direct"] == results["replica"] == results["offline"]
+    print(f"\nremote rows after upload: {len(results['direct']) - 1} rounds; " + ("ok" if ok else "MISMATCH"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+# LLM and page-load calls against a local fake server that injects errors and
+# latency: no retries vs the resilience layer, then a full outage where the
+# circuit breaker should fail fast instead of waiting out every backoff.
+# Usage: python3 bench_resilience.py [calls] [error_rate] [latency_ms]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pydantic import BaseModel
+
+from fake_openai import FakeOpenAIServer
+from llm_cache import LLMCache
+from resilience import CircuitOpenError, Resilience
+from resources import ResourceRegistry
+import llm_cache as llm_cache_module
+import sources
+
+
+class Answer(BaseModel):
+    company_name: str
+
+
+async def run(label, calls, call, server):
+    server.requests = 0
+    ok = failed = 0
+    semaphore = asyncio.Semaphore(4)
+
+    async def one(i):
+        nonlocal ok, failed
+        async with semaphore:
+            try:
+                await asyncio.to_thread(call, i)
+                ok += 1
+            except Exception:
+                failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} ok={ok:<4} failed={failed:<4} requests={server.requests:<5} wall={elapsed:6.2f}s")
+
+
+def quiet_resilience() -> Resilience:
+    # Short backoff so the benchmark finishes quickly
+    return Resilience(max_attempts=4, base_delay=0.05, max_delay=0.5, failure_threshold=5, reset_seconds=30)
+
+
+async def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    error_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    server = FakeOpenAIServer(latency=latency_ms / 1000, error_rate=error_rate).start()
+    base_url = server.url
+
+    registry = ResourceRegistry(max_connections=4, max_keepalive_connections=4)
+    client = registry.openai(api_key="fake", base_url=f"{base_url}/v1")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(directory=tmp, bypass=True)
+
+        def llm(i):
+            messages = [{"role": "user", "content": f"call {i}"}]
+            return cache.parse(client, model="gpt-4o-mini", messages=messages, response_format=Answer)
+
+        def page(i):
+            return sources.http_get(f"{base_url}/report/{i}", timeout=5)
+
+        print(f"error_rate={error_rate} latency={latency_ms:.0f}ms calls={calls}")
+        no_retries = Resilience(max_attempts=1)
+        for name, layer in (("no retries", no_retries), ("resilience", quiet_resilience())):
+            llm_cache_module.resilience = layer
+            await run(f"llm, {name}", calls, llm, server)
+            await run(f"page load, {name}", calls, lambda i: layer.call("http:fake", page, i), server)
+            if layer is not no_retries:
+                print(layer.summary())
+
+        print("\nendpoint down")
+        server.down = True
+        layer = quiet_resilience()
+        llm_cache_module.resilience = layer
+        await run("llm, resilience", calls, llm, server)
+        print(layer.summary())
+        try:
+            llm(0)
+        except CircuitOpenError as e:
+            print(f"next call fails fast: {e}")
+
+    registry.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+# AdaptiveBatchScheduler against a fake agent coroutine, no browser or
+# network: batches sleep a random time, some fail outright and some drop a
+# company. Checks that no more than `concurrency` batches run at once, that
+# batch starts are paced by the token bucket, that on_result sees batches
+# in order even though they finish out of order, and that the progress
+# counters add up.
+# Usage: python3 bench_scheduler.py [companies] [concurrency] [starts_per_second]
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from scheduler import AdaptiveBatchScheduler, BatchSizeController, TokenBucket
+
+FAIL_RATE = 0.1
+DROP_RATE = 0.1
+
+
+class FakeAgent:
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+        self.running = 0
+        self.max_running = 0
+        self.starts = []
+        # Start number of each batch, in the order they finished
+        self.finished = []
+
+    async def run_batch(self, batch):
+        self.starts.append(time.monotonic())
+        number = len(self.starts) - 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.random.uniform(0.005, 0.05))
+            if self.random.random() < FAIL_RATE:
+                raise RuntimeError("agent crashed")
+            return [{"company_name": company[0]} for company in batch if self.random.random() >= DROP_RATE]
+        finally:
+            self.running -= 1
+            self.finished.append(number)
+
+
+def by_name(batch, result):
+    names = {company["company_name"] for company in result}
+    return [company for company in batch if company[0] in names]
+
+
+async def run(companies, concurrency, rate, seed):
+    agent = FakeAgent(seed)
+    written, last_flags, snapshots = [], [], []
+
+    async def on_result(outcome, is_last):
+        written.append(outcome.index)
+        last_flags.append(is_last)
+        # Give the other workers a chance to finish while this one writes
+        await asyncio.sleep(agent.random.uniform(0, 0.01))
+
+    scheduler = AdaptiveBatchScheduler(
+        run_batch=agent.run_batch,
+        match_returned=by_name,
+        controller=BatchSizeController(initial=3, maximum=6),
+        concurrency=concurrency,
+        rate_limits={"example.com": TokenBucket(rate=rate, capacity=1)} if rate else {},
+        on_result=on_result,
+        on_progress=lambda progress: snapshots.append((progress.running, progress.pending)),
+    )
+    start = time.perf_counter()
+    outcomes = await scheduler.run(companies)
+    return agent, scheduler, outcomes, written, last_flags, snapshots, time.perf_counter() - start
+
+
+def check(label, ok):
+    print(f"  {'ok' if ok else 'MISMATCH':<8} {label}")
+    return ok
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100
+    companies = [[f"Company {i}", "SaaS", "Seed"] for i in range(count)]
+
+    ok = True
+    for label, batch_rate in (("unpaced", 0), (f"{rate:g} starts/s", rate)):
+        agent, scheduler, outcomes, written, last_flags, snapshots, elapsed = await run(
+            companies, concurrency, batch_rate, seed=3
+        )
+        progress = scheduler.progress
+        returned = [company for outcome in outcomes for company in outcome.batch if company not in outcome.missing]
+        gaps = [b - a for a, b in zip(agent.starts, agent.starts[1:])]
+        print(f"{label}: {progress.total} batches in {elapsed * 1000:.0f}ms, "
+              f"at most {agent.max_running} running, {progress}")
+
+        ok &= check(f"at most {concurrency} batches at once", agent.max_running <= concurrency)
+        ok &= check("ran concurrently", concurrency == 1 or agent.max_running > 1)
+        if batch_rate:
+            # One token per start; allow a little timer slack
+            slowest_allowed = 0.9 / batch_rate
+            ok &= check(f"starts at least {1000 / batch_rate:.0f}ms apart (min gap {min(gaps) * 1000:.1f}ms)",
+                        min(gaps) >= slowest_allowed)
+        ok &= check("batches finished out of order", concurrency == 1 or agent.finished != sorted(agent.finished))
+        ok &= check("on_result called in batch order", written == list(range(progress.total)))
+        ok &= check("outcomes returned in batch order", [outcome.index for outcome in outcomes] == written)
+        ok &= check("only the final write is marked last", last_flags == [False] * (len(last_flags) - 1) + [True])
+        ok &= check(
+            "counters add up",
+            progress.completed + progress.failed == progress.total == progress.written
+            and progress.running == 0 and progress.pending == 0
+            and progress.failed == sum(1 for outcome in outcomes if not outcome.ok),
+        )
+        ok &= check("progress never negative", all(running >= 0 and pending >= 0 for running, pending in snapshots))
+        ok &= check(
+            "every company returned or dropped once",
+            sorted(map(tuple, returned + scheduler.dropped)) == sorted(map(tuple, companies)),
+        )
+        print()
+
+    print("scheduler ok" if ok else "MISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+# SourceFetcher against a local HTTP server serving the report fixtures.
+# The server doubles as the HTTP proxy, so the real inc42.com/entrackr.com
+# URLs (and their extractors) are used unchanged. One Entrackr page only
+# renders its report client-side, so it falls back to a fake webdriver that
+# "renders" the fixture. Also checks ElementFinder offsets with line
+# separators other than "\n" before the element, and that two asyncio.run()
+# calls can share the fetcher's drivers.
+# Usage: python3 bench_sources.py [latency_ms]
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+INC42_URL = "http://inc42.com/buzz/funding-galore-indian-startups-this-week/"
+ENTRACKR_URL = "http://entrackr.com/report/weekly-funding-report/this-week"
+# Report element missing from the static HTML: needs the browser
+ENTRACKR_JS_URL = "http://entrackr.com/report/weekly-funding-report/rendered-client-side"
+# Separators str.splitlines() breaks on but HTMLParser.getpos() doesn't count
+LINE_SEPARATOR_URL = "http://entrackr.com/report/weekly-funding-report/odd-line-endings"
+
+
+def fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return f.read()
+
+
+ENTRACKR = fixture("entrackr_weekly.html")
+PAGES = {
+    urlparse(INC42_URL).path: fixture("inc42_weekly.html"),
+    urlparse(ENTRACKR_URL).path: ENTRACKR,
+    urlparse(ENTRACKR_JS_URL).path: "<html><body><div id='app'></div><script>render()</script></body></html>",
+    urlparse(LINE_SEPARATOR_URL).path: "<script>var a = 1;\rvar b = 2;\x0bvar c = '\u2028\x1c';</script>\n" + ENTRACKR,
+}
+# What the browser sees once the page's scripts have run
+RENDERED = {ENTRACKR_JS_URL: ENTRACKR}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        page = PAGES.get(urlparse(self.path).path)
+        body = (page or "not found").encode()
+        self.send_response(200 if page else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeElement:
+    def __init__(self, html: str):
+        self.html = html
+
+    def get_attribute(self, name: str):
+        return self.html if name == "outerHTML" else None
+
+
+class FakeDriver:
+    """The two webdriver calls SourceExtractor uses, over the rendered fixtures"""
+
+    def __init__(self):
+        self.page = None
+        self.loads = 0
+
+    def get(self, url: str) -> None:
+        self.loads += 1
+        self.page = RENDERED.get(url, "")
+
+    def find_element(self, by, selector):
+        from selenium.common.exceptions import NoSuchElementException
+
+        from sources import ElementFinder
+
+        html = ElementFinder(self.page or "", selector).find()
+        if html is None:
+            raise NoSuchElementException(selector)
+        return FakeElement(html)
+
+    def quit(self) -> None:
+        pass
+
+
+def main():
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 200) / 1000
+    FixtureHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for name in ("no_proxy", "NO_PROXY", "https_proxy", "HTTPS_PROXY"):
+        os.environ.pop(name, None)
+    os.environ["http_proxy"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    from sources import SourceFetcher, extractor_for_url
+
+    created = []
+
+    def driver_factory():
+        created.append(FakeDriver())
+        return created[-1]
+
+    urls = [INC42_URL, ENTRACKR_URL, ENTRACKR_JS_URL, LINE_SEPARATOR_URL]
+    fetcher = SourceFetcher(driver_factory=driver_factory, max_drivers=1)
+    print(f"{len(urls)} pages, {latency * 1000:.0f}ms server latency\n")
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            asyncio.run(fetcher.fetch(url))
+        sequential = time.perf_counter() - start
+
+        runs = []
+        for _ in range(2):
+            # A fresh event loop each time, like ContentExtractor.fetch_sources
+            start = time.perf_counter()
+            runs.append(asyncio.run(fetcher.fetch_all(urls)))
+            print(f"fetch_all {time.perf_counter() - start:.2f}s (sequential {sequential:.2f}s)")
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+    entrackr_element = extractor_for_url(ENTRACKR_URL).extract(ENTRACKR)
+    expected = {
+        INC42_URL: ("http", extractor_for_url(INC42_URL).extract(PAGES[urlparse(INC42_URL).path])),
+        ENTRACKR_URL: ("http", entrackr_element),
+        ENTRACKR_JS_URL: ("browser", entrackr_element),
+        LINE_SEPARATOR_URL: ("http", entrackr_element),
+    }
+    ok = len(created) == 1 and all(expected[url][1] for url in urls)
+    for pages in runs:
+        for page in pages:
+            fetched_with, html = expected[page.url]
+            match = page.fetched_with == fetched_with and page.html == html
+            ok = ok and match
+            print(f"  {page.extractor.name:<9} {page.fetched_with:<8} {len(page.html):>7} chars  "
+                  f"{'ok' if match else 'MISMATCH'}  {page.url}")
+    print(f"\n{len(created)} webdriver(s) created, {sum(driver.loads for driver in created)} browser loads; "
+          + ("ok" if ok else "MISMATCH"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
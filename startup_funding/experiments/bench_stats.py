@@ -0,0 +1,155 @@
+# Rollups over synthetic funding rounds: stats.py's NumPy batch versions vs
+# plain Python loops over row tuples (dicts of lists, per-group sorts).
+# Covers per-stage and per-sector totals with quartiles, weekly totals with a
+# 4-week rolling window and investor frequency, checks both agree, and times
+# building the arrays from database-shaped rows.
+# Usage: python3 bench_stats.py [rounds]
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from stats import STAGE_CODES, STAGE_LABELS, RoundArrays, by_sector, by_stage, investor_frequency, weekly
+
+SECTORS = ["Fintech", "Ecommerce", "Enterprisetech", "Healthtech", "Logistics", "Agritech", "Deeptech", "Edtech", "Cleantech", "Media"]
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def synthetic_rows(rounds: int, weeks: int = 520, investors: int = 2000):
+    rng = np.random.default_rng(7)
+    amounts = rng.lognormal(15, 1.2, rounds)
+    amounts[rng.random(rounds) < 0.1] = np.nan
+    stages = rng.integers(0, len(STAGE_LABELS), rounds)
+    sectors = rng.integers(0, len(SECTORS), rounds)
+    first = date(2016, 1, 2)
+    week_dates = [(first + timedelta(weeks=week)).isoformat() for week in range(weeks)]
+    days = rng.integers(0, weeks, rounds)
+    investor_counts = rng.integers(0, 4, rounds)
+    investor_ids = rng.integers(0, investors, investor_counts.sum())
+    offsets = np.concatenate([[0], np.cumsum(investor_counts)])
+    return [
+        (
+            None if np.isnan(amounts[i]) else float(amounts[i]),
+            STAGE_LABELS[stages[i]],
+            SECTORS[sectors[i]],
+            week_dates[days[i]],
+            ", ".join(f"Fund {j}" for j in investor_ids[offsets[i]:offsets[i + 1]]) or None,
+        )
+        for i in range(rounds)
+    ]
+
+
+def quantile(values, q):
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def python_rollups(rows):
+    """The same rollups written the way ad hoc scripts do them"""
+    results = {}
+    for name, column in (("stage", 1), ("sector", 2)):
+        groups = defaultdict(list)
+        counts = defaultdict(int)
+        for row in rows:
+            counts[row[column]] += 1
+            if row[0] is not None:
+                groups[row[column]].append(row[0])
+        results[name] = {
+            key: (counts[key], sum(groups[key]), *([quantile(sorted(groups[key]), q) for q in QUANTILES] if groups[key] else []))
+            for key in counts
+        }
+
+    weekly_totals = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        day = date.fromisoformat(row[3])
+        week = (day - timedelta(days=day.weekday())).isoformat()
+        weekly_totals[week][0] += 1
+        weekly_totals[week][1] += row[0] or 0.0
+    first = min(date.fromisoformat(week) for week in weekly_totals)
+    last = max(date.fromisoformat(week) for week in weekly_totals)
+    series, week = [], first
+    while week <= last:
+        series.append(weekly_totals.get(week.isoformat(), [0, 0.0]))
+        week += timedelta(weeks=1)
+    rolling = [sum(total for _, total in series[max(0, i - 3):i + 1]) for i in range(len(series))]
+    results["weekly"] = ([rounds for rounds, _ in series], rolling)
+
+    investor_counts = defaultdict(int)
+    for row in rows:
+        for investor in {investor.strip() for investor in (row[4] or "").split(",")}:
+            if investor:
+                investor_counts[investor] += 1
+    results["investors"] = investor_counts
+    return results
+
+
+def numpy_rollups(rounds: RoundArrays):
+    stages = by_stage(rounds, QUANTILES)
+    sectors = by_sector(rounds, QUANTILES)
+    series = weekly(rounds)
+    _, rolling_total = series.rolling(4)
+    return stages, sectors, series, rolling_total, investor_frequency(rounds, 20)
+
+
+def timed(label, fn, baseline=None):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:.0f}x)" if baseline else ""
+    print(f"{label:<44} {elapsed * 1000:10.1f}ms{speedup}")
+    return result, elapsed
+
+
+def agree(python, stats, labels) -> bool:
+    for i, label in enumerate(labels):
+        if label not in python:
+            if stats.rounds[i]:
+                return False
+            continue
+        count, total, *quartiles = python[label]
+        if stats.rounds[i] != count or not np.isclose(stats.total_usd[i], total):
+            return False
+        if quartiles and not np.allclose([stats.quantiles[q][i] for q in QUANTILES], quartiles):
+            return False
+    return True
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    start = time.perf_counter()
+    rows = synthetic_rows(rounds)
+    print(f"{rounds:,} synthetic rounds generated in {time.perf_counter() - start:.1f}s\n")
+
+    arrays, _ = timed("RoundArrays.from_rows (one-off load)", lambda: RoundArrays.from_rows(rows))
+    python, python_seconds = timed("python loops: all rollups", lambda: python_rollups(rows))
+    (stages, sectors, series, rolling_total, investors), _ = timed(
+        "numpy: all rollups", lambda: numpy_rollups(arrays), python_seconds
+    )
+    timed("numpy: by_stage with quartiles", lambda: by_stage(arrays, QUANTILES))
+    timed("numpy: weekly + 4-week rolling", lambda: weekly(arrays).rolling(4))
+    timed("numpy: investor_frequency", lambda: investor_frequency(arrays, 20))
+
+    python_rounds, python_rolling = python["weekly"]
+    ok = (
+        agree(python["stage"], stages, STAGE_LABELS)
+        and agree(python["sector"], sectors, sectors.labels)
+        and list(series.rounds) == python_rounds
+        and np.allclose(rolling_total, python_rolling)
+        # Ties may be ordered differently, so compare counts
+        and all(python["investors"][name] == count for name, count, _ in investors)
+        and [count for _, count, _ in investors] == sorted(python["investors"].values(), reverse=True)[:20]
+    )
+    print(f"\n{len(series.week_starts)} weeks, {len(arrays.investor_labels)} investors, "
+          f"{len(STAGE_CODES)} stage codes; " + ("results match" if ok else "MISMATCH"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Per-call overhead of tracer.span() disabled vs enabled, against a bare loop.
+# Usage: python3 bench_tracing.py [iterations]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from tracing import Tracer
+
+
+def work(i):
+    return i * 2
+
+
+def bare(iterations, tracer):
+    for i in range(iterations):
+        work(i)
+
+
+def traced(iterations, tracer):
+    for i in range(iterations):
+        with tracer.span("db_execute", sql="SELECT 1") as span:
+            span.set(rows=work(i))
+
+
+def timed(label, loop, iterations, tracer, baseline=None):
+    start = time.perf_counter()
+    loop(iterations, tracer)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / iterations * 1e9
+    extra = f" (+{per_call - baseline:.0f}ns)" if baseline is not None else ""
+    print(f"{label:<18} {per_call:8.0f}ns per call{extra}")
+    return per_call
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        disabled = Tracer()
+        enabled = Tracer(output_file=os.path.join(tmp, "trace.jsonl"), flush_every=10_000)
+        baseline = timed("no tracing", bare, iterations, disabled)
+        timed("tracing disabled", traced, iterations, disabled, baseline)
+        timed("tracing enabled", traced, iterations // 10, enabled, baseline)
+        enabled.flush()
+
+
+if __name__ == "__main__":
+    main()
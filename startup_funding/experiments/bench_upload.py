@@ -0,0 +1,93 @@
+# Benchmark for insert_weekly_data against a local libsql file.
+# Compares the old per-company execute() loop with the bulk batch path.
+# Usage: python3 bench_upload.py [number_of_companies]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+from validate_and_upload import (
+    FinalFundingDataList,
+    FinalFundingDetails,
+    FundRaiseStages,
+    build_company_statements,
+    create_turso_table,
+    insert_weekly_data,
+)
+
+
+class CountingClient:
+    """Wraps a libsql client and counts calls that would be network round trips"""
+
+    def __init__(self, client):
+        self.client = client
+        self.round_trips = 0
+
+    async def execute(self, *args, **kwargs):
+        self.round_trips += 1
+        return await self.client.execute(*args, **kwargs)
+
+    async def batch(self, *args, **kwargs):
+        self.round_trips += 1
+        return await self.client.batch(*args, **kwargs)
+
+
+def synthetic_week(n: int) -> FinalFundingDataList:
+    stages = list(FundRaiseStages)
+    return FinalFundingDataList(companies=[
+        FinalFundingDetails(
+            company_name=f"Company {i}",
+            amount_raised_usd=float(100000 * (i + 1)),
+            investors=["Accel", "Blume Ventures"],
+            industry_sector="Fintech",
+            funding_stage=stages[i % len(stages)],
+            source=["Inc42"],
+            website=f"https://company{i}.example",
+        )
+        for i in range(n)
+    ])
+
+
+async def per_company_upload(client, funding_data: FinalFundingDataList, snapshot_date: str):
+    # Previous behaviour: one SELECT plus one execute() per statement for every company
+    for company in funding_data.companies:
+        existing = await client.execute(
+            "SELECT company_id, company_name, website, linkedin, brief_summary, enriched_at FROM companies WHERE company_name = ?",
+            [company.company_name]
+        )
+        statements, _ = build_company_statements(
+            company, tuple(existing.rows[0]) if existing.rows else None, snapshot_date
+        )
+        for stmt in statements:
+            await client.execute(stmt)
+
+
+async def run(label, upload, n):
+    with tempfile.TemporaryDirectory() as tmp:
+        client = libsql_client.create_client(url=f"file:{os.path.join(tmp, 'bench.db')}")
+        try:
+            await create_turso_table(client)
+            counting = CountingClient(client)
+            data = synthetic_week(n)
+            start = time.perf_counter()
+            # First pass inserts, second pass re-runs the same week (updates)
+            await upload(counting, data, "2025-02-15")
+            await upload(counting, data, "2025-02-15")
+            elapsed = time.perf_counter() - start
+            print(f"{label:<12} companies={n:<5} round_trips={counting.round_trips:<6} wall={elapsed * 1000:.1f}ms")
+        finally:
+            await client.close()
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    await run("per-company", per_company_upload, n)
+    await run("bulk", insert_weekly_data, n)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+# Write volume of the week-over-week diff on two synthetic consecutive weeks
+# in a local libsql file: full upload vs delta upload for (1) the first week,
+# (2) a re-run of the same week with a few edits and (3) the next week, where
+# part of the deals are repeats of the first week reported by the other outlet.
+# Then checks a deal reported as "Cashfree Payments" one week and "Cashfree"
+# the next is recognised as one round.
+# Usage: python3 bench_week_diff.py [rounds_per_week] [repeat_fraction]
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import libsql_client
+
+from models import FinalFundingDataList, FinalFundingDetails, FundRaiseStages
+from validate_and_upload import create_turso_table, insert_weekly_data, upload_week_delta
+from week_diff import diff_week
+
+PREFIXES = ["Nova", "Kite", "Zen", "Orbit", "Pixel", "Quanta", "Ripple", "Sprout", "Tidal", "Vertex", "Bloom", "Cobalt", "Drift", "Ember", "Flux"]
+SUFFIXES = ["Labs", "Pay", "Health", "Cart", "Learn", "Works", "Logistics", "Grid", "Foods", "Mobility"]
+STAGES = [FundRaiseStages.SEED, FundRaiseStages.SERIES_A, FundRaiseStages.SERIES_B, FundRaiseStages.PRE_SEED]
+
+
+class CountingClient:
+    """Counts statements sent to the database"""
+
+    def __init__(self, client):
+        self.client = client
+        self.statements = 0
+
+    async def execute(self, *args, **kwargs):
+        return await self.client.execute(*args, **kwargs)
+
+    async def batch(self, statements):
+        statements = list(statements)
+        self.statements += len(statements)
+        return await self.client.batch(statements)
+
+
+def company(i: int, source: str) -> FinalFundingDetails:
+    return FinalFundingDetails(
+        company_name=f"{PREFIXES[i % len(PREFIXES)]} {SUFFIXES[i // len(PREFIXES) % len(SUFFIXES)]}",
+        amount_raised_usd=float((i % 30 + 1) * 1_000_000),
+        investors=[f"Fund {i % 9}", f"Angel {i % 5}"],
+        industry_sector="Fintech",
+        funding_stage=STAGES[i % len(STAGES)],
+        source=[source],
+    )
+
+
+async def upload_both_ways(label, tmp, weeks, snapshot_dates):
+    """Upload the same sequence of weeks into two fresh databases, full and delta"""
+    counts = {}
+    for mode in ("full", "delta"):
+        raw = libsql_client.create_client(url=f"file:{os.path.join(tmp, f'{label}-{mode}.db')}")
+        client = CountingClient(raw)
+        await create_turso_table(raw)
+        per_week = []
+        for week, snapshot_date in zip(weeks, snapshot_dates):
+            before = client.statements
+            if mode == "full":
+                await insert_weekly_data(client, week, snapshot_date)
+            else:
+                await upload_week_delta(client, week, snapshot_date)
+            per_week.append(client.statements - before)
+        rounds = (await raw.execute("SELECT COUNT(*) FROM funding_rounds")).rows[0][0]
+        await raw.close()
+        counts[mode] = (per_week, rounds)
+    return counts
+
+
+async def check_renamed_company(tmp) -> bool:
+    """The same deal under two spellings of the company name in adjacent weeks"""
+    client = libsql_client.create_client(url=f"file:{os.path.join(tmp, 'renamed.db')}")
+    await create_turso_table(client)
+
+    def cashfree(name: str, amount: float, source: str) -> FinalFundingDataList:
+        return FinalFundingDataList(companies=[FinalFundingDetails(
+            company_name=name,
+            amount_raised_usd=amount,
+            investors=["Lightspeed"],
+            industry_sector="Fintech",
+            funding_stage=FundRaiseStages.SERIES_A,
+            source=[source],
+        )])
+
+    await upload_week_delta(client, cashfree("Cashfree Payments", 10_000_000, "Inc42"), "2025-02-08")
+    delta = await diff_week(client, cashfree("Cashfree", 10_300_000, "Entrackr"), "2025-02-15")
+    await upload_week_delta(client, cashfree("Cashfree", 10_300_000, "Entrackr"), "2025-02-15")
+    rounds = (await client.execute("SELECT COUNT(*) FROM funding_rounds")).rows[0][0]
+    await client.close()
+    ok = [d.stored_snapshot_date for d in delta.duplicates] == ["2025-02-08"] and rounds == 1
+    print(f"\n'Cashfree Payments' then 'Cashfree' a week later: {len(delta.duplicates)} duplicate, "
+          f"{rounds} round stored; " + ("ok" if ok else "MISMATCH"))
+    return ok
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    repeat_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    repeats = int(rounds * repeat_fraction)
+
+    week1 = FinalFundingDataList(companies=[company(i, "Inc42") for i in range(rounds)])
+    week1_edited = week1.model_copy(deep=True)
+    for record in week1_edited.companies[:5]:
+        record.website = "https://example.com"
+    # Next week: some of last week's deals again, reported by the other outlet
+    week2 = FinalFundingDataList(
+        companies=[company(i, "Entrackr") for i in range(repeats)]
+        + [company(i, "Inc42") for i in range(rounds, 2 * rounds - repeats)]
+    )
+
+    labels = ["week 1", "week 1 re-run, 5 edited", "week 2"]
+    with tempfile.TemporaryDirectory() as tmp:
+        counts = await upload_both_ways(
+            "diff", tmp, [week1, week1_edited, week2], ["2025-02-08", "2025-02-08", "2025-02-15"]
+        )
+        renamed_ok = await check_renamed_company(tmp)
+    print(f"\n{rounds} rounds per week, {repeats} of week 2 repeat week 1")
+    print(f"{'':<26} {'full':>10} {'delta':>10}")
+    for i, label in enumerate(labels):
+        print(f"{label:<26} {counts['full'][0][i]:>10} {counts['delta'][0][i]:>10}  statements")
+    full_total, delta_total = sum(counts["full"][0]), sum(counts["delta"][0])
+    print(f"{'total':<26} {full_total:>10} {delta_total:>10}  statements ({1 - delta_total / full_total:.0%} saved)")
+    print(f"{'funding_rounds rows':<26} {counts['full'][1]:>10} {counts['delta'][1]:>10}")
+    sys.exit(0 if renamed_ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
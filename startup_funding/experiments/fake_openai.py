@@ -0,0 +1,137 @@
+# Local OpenAI-compatible server shared by the benches: chat completions whose
+# JSON content comes from a response builder, with configurable latency,
+# injected errors and a full outage. GET requests serve a static page, for
+# benches that load report pages through the same faults.
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Union
+
+DEFAULT_PAGE = "<html><body><table><tr><td>Nua</td></tr></table></body></html>"
+
+
+def prompt_text(request: dict) -> str:
+    """The last message of a chat completion request"""
+    return request["messages"][-1]["content"]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeOpenAIServer"
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def fault(self) -> bool:
+        """Send an injected error instead of the response, if one is due"""
+        server = self.server
+        if not server.down and server.rng.random() >= server.error_rate:
+            return False
+        status = 503 if server.down else server.rng.choice((429, 500, 503))
+        self.send_body(
+            status,
+            b'{"error": {"message": "injected"}}',
+            "application/json",
+            {"Retry-After": "0"} if status == 429 else None,
+        )
+        return True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        content = self.server.respond(request)
+        latency = self.server.latency
+        time.sleep(latency(request, content) if callable(latency) else latency)
+        if self.fault():
+            return
+        if content is None:
+            reply = {"role": "assistant", "content": None, "refusal": "I'm sorry, I can't help with that."}
+        else:
+            reply = {"role": "assistant", "content": json.dumps(content)}
+        message = reply["content"] or reply["refusal"]
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": reply,
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt_text(request)) // 4,
+                "completion_tokens": len(message) // 4,
+                "total_tokens": (len(prompt_text(request)) + len(message)) // 4,
+            },
+        }).encode()
+        self.send_body(200, body, "application/json")
+
+    def do_GET(self):
+        self.server.requests += 1
+        latency = self.server.latency
+        time.sleep(0 if callable(latency) else latency)
+        if self.fault():
+            return
+        self.send_body(200, self.server.page.encode(), "text/html; charset=utf-8")
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Serves /v1/chat/completions on 127.0.0.1 until shutdown().
+
+    `respond(request)` builds the parsed JSON content of each completion
+    (by default a one-field {"company_name": "Nua"} answer); None makes the
+    model refuse, which the SDK parses to None. `latency` is
+    seconds per request, or a function of the request and the content it
+    answers with. A fraction `error_rate` of requests, or all of them while
+    `down` is set, get a 429/500/503 instead. `requests` and `connections`
+    count what the server saw.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        respond: Optional[Callable[[dict], dict]] = None,
+        latency: Union[float, Callable[[dict, dict], float]] = 0.0,
+        error_rate: float = 0.0,
+        page: str = DEFAULT_PAGE,
+        seed: int = 1,
+    ):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.respond = respond or (lambda request: {"company_name": "Nua"})
+        self.latency = latency
+        self.error_rate = error_rate
+        self.page = page
+        self.rng = random.Random(seed)
+        self.down = False
+        self.requests = 0
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def base_url(self) -> str:
+        """What OpenAI(base_url=...) or OPENAI_BASE_URL should point at"""
+        return f"{self.url}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
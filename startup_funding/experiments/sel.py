@@ -40,12 +40,17 @@ class FundRaiseStages(Enum):
 
 class FundingDetails(BaseModel):
     company_name: str
-    amount_raised_usd: Optional[float]
+    # Amounts as written (4.5, "INR", "Cr"); src/fx.py converts them to USD
+    amount: Optional[float]
+    currency: Optional[str]
+    amount_unit: Optional[str]
     investors: List[str]
     industry_sector: str
     funding_stage: FundRaiseStages
 
-    valuation_usd: Optional[float]
+    valuation: Optional[float]
+    valuation_currency: Optional[str]
+    valuation_unit: Optional[str]
     source: Optional[List[str]]
 
     class Config:
@@ -69,11 +74,11 @@ class FundingDetailsAdditionalFields(BaseModel):
 SYSTEM_PROMPT = """
 You are an expert at extracting structured data from HTML content. Extract the following details from the provided HTML:
 1. Company name (combine data from both sources and construct a unique list (list of dicts)).
-2. Amount raised (convert to USD if in INR; 1 USD = 86 INR).
+2. Amount raised as written, without converting it: the number, the currency code (USD or INR) and the unit (K, Lakh, Mn, Cr or Bn; null if none).
 3. Investors list.
 4. Industry/Sector.
 5. Funding stage (choose from: Seed, Series A, Series B, Series C, Series D, Series E, Series F, Pre-Seed, Angel, Debt).
-6. Valuation (convert to USD if in INR; 1 USD = 86 INR).
+6. Valuation as written, the same way as the amount raised.
 7. For the source just answer in terms of ['Entrackr'] ['Inc42'] or ['Entrackr' , 'Inc42']
 
 Return the data in a structured JSON format.
@@ -1,58 +1,24 @@
 # agent.py
+import argparse
 import asyncio
-from datetime import date
-from enum import Enum
 import json
 import os
 import sys
 from langchain_openai import ChatOpenAI
 from browser_use import Agent, Browser, BrowserConfig
-from openai import OpenAI
-from pydantic import BaseModel, RootModel
+from pydantic import BaseModel
 from typing import List, Optional
+from browser_pool import BrowserContextPool
+from jsonl_store import JsonLinesWriter
+from llm_cache import llm_cache
+from resilience import resilience
+from resources import resources
+from tracing import tracer
 
-# class FundRaiseStages(Enum):
-#     SEED = "Seed"
-#     SERIES_A = "Series A"
-#     SERIES_B = "Series B"
-#     SERIES_C = "Series C"
-#     SERIES_D = "Series D"
-#     SERIES_E = "Series E"
-#     SERIES_F = "Series F"
-#     PRE_SEED = "Pre-Seed"
-#     GROWTH = "Growth"
-#     ANGEL = "Angel"
-#     DEBT = "Debt"
-#     NOT_AVAILABLE = "Not Available"
-
-#     def __str__(self):
-#         return self.value
-
-# class CombinedFundingDetails(BaseModel):
-#     company_name: str
-#     amount_raised_usd: Optional[float] = None
-#     investors: List[str] = []
-#     industry_sector: str
-#     funding_stage: FundRaiseStages
-#     valuation_usd: Optional[float] = None
-#     source: Optional[List[str]] = None
-#     website: Optional[str] = None
-#     linkedin: Optional[str] = None
-#     brief_summary: Optional[str] = None
-
-#     class Config:
-#         json_encoders = {FundRaiseStages: lambda v: v.value}
-
-# class FundingDataList(RootModel):
-#     root: List[CombinedFundingDetails]
-
-#     def __iter__(self):
-#         return iter(self.root)
-
-#     def __getitem__(self, item):
-#         return self.root[item]
-
+CHROME_INSTANCE_PATH = "/usr/bin/chromium-browser"
 
+# Response schema for the structuring call. Stricter than
+# models.FundingDetailsAdditionalFields, which also holds records reused from Turso.
 class FundingDetailsAdditionalFields(BaseModel):
     company_name: str
     website: str
@@ -65,51 +31,17 @@ class AdditionalFundingDetailsList(BaseModel):
     companies: list[FundingDetailsAdditionalFields]
 
 
-class JsonFileWriter:
-    def __init__(self, filename: str):
-        self.filename = filename
-        self.first_write = True
-
-    async def write_batch(
-        self, companies: list, is_first_batch: bool, is_last_batch: bool
-    ) -> None:
-        mode = "w" if is_first_batch else "a"
-
-        with open(self.filename, mode) as f:
-            if is_first_batch:
-                # Start the JSON structure
-                f.write("{\n")
-                f.write('\t"companies": [\n')
-
-            # Write each company
-            for idx, company in enumerate(companies):
-                # Proper indentation
-                f.write("\t\t")
-
-                # Dump the company data with proper indentation
-                json_str = json.dumps(company.model_dump(mode="json"), indent="\t")
-                # Fix the indentation of multi-line JSON
-                json_str = json_str.replace("\n", "\n\t\t")
-                f.write(json_str)
-
-                # Add comma if not the last company in the last batch
-                if not (is_last_batch and idx == len(companies) - 1):
-                    f.write(",")
-                f.write("\n")
-
-            # Close the JSON structure if it's the last batch
-            if is_last_batch:
-                f.write("\t]\n")
-                f.write("}")
-
-
 async def process_batch(
-    batch_data: list, is_last_batch: bool, is_first_batch: bool
-) -> str:
+    batch_data: list,
+    output_file: Optional[str] = None,
+    browser_context=None,
+) -> AdditionalFundingDetailsList:
     try:
-        custom_browser = Browser(
-            config=BrowserConfig(chrome_instance_path="/usr/bin/chromium-browser")
-        )
+        # A pooled context from the worker is reused; otherwise start a browser
+        if browser_context is None:
+            custom_browser = Browser(
+                config=BrowserConfig(chrome_instance_path=CHROME_INSTANCE_PATH)
+            )
         llm = ChatOpenAI(model="gpt-4o-mini")
 
         task = f"""
@@ -146,9 +78,14 @@ async def process_batch(
         - If stopped by any captcha, just wait.
         """
 
-        agent_instance = Agent(llm=llm, browser=custom_browser, task=task)
-        agent_result = (await agent_instance.run()).extracted_content()
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        if browser_context is None:
+            agent_instance = Agent(llm=llm, browser=custom_browser, task=task)
+        else:
+            agent_instance = Agent(llm=llm, browser_context=browser_context, task=task)
+        with tracer.span("agent_run", companies=len(batch_data)) as span:
+            agent_result = (await agent_instance.run()).extracted_content()
+            span.set(results=len(agent_result))
+        client = resources.openai()
 
         SYSTEM_PROMPT = """
          The data is coming unprocessed from a Browsing Agent, and you have to process it to have it in structured manner.
@@ -159,24 +96,17 @@ async def process_batch(
             "content": f"Here is the raw data:\n{('\n').join(agent_result)}",
         }
 
-        # Changed to use create instead of parse since we're handling the parsing ourselves
-        response = client.beta.chat.completions.parse(
+        response_text = await asyncio.to_thread(
+            llm_cache.parse,
+            client,
             model="gpt-4o-mini",
             messages=[{"role": "system", "content": SYSTEM_PROMPT}, user_message],
             response_format=AdditionalFundingDetailsList,
         )
-
-        response_text = response.choices[0].message.parsed
-        print(response_text)
         # parsed_response = AdditionalFundingDetailsList.model_validate_json(response_text)
 
-        if response_text and response_text.companies:
-            writer = JsonFileWriter(f'extended_funding_data_{date.today()}.json')
-            await writer.write_batch(
-                response_text.companies,
-                is_first_batch=is_first_batch,
-                is_last_batch=is_last_batch
-            )
+        if output_file and response_text and response_text.companies:
+            JsonLinesWriter(output_file).append(response_text.companies)
         
         return response_text
 
@@ -185,14 +115,127 @@ async def process_batch(
             await custom_browser.close()
 
 
+class InProcessAgent:
+    """Runs agent batches in this process on a pool of browser contexts.
+
+    Used directly by the in-process pipeline and behind the stdin/stdout
+    protocol of `agent.py --worker`.
+    """
+
+    def __init__(self, pool_size: int = 2, max_tasks_per_context: int = 10, max_rss_mb: Optional[float] = None):
+        self.browser = Browser(
+            config=BrowserConfig(chrome_instance_path=CHROME_INSTANCE_PATH)
+        )
+        self.pool = BrowserContextPool(
+            self.browser.new_context,
+            size=pool_size,
+            max_tasks_per_context=max_tasks_per_context,
+            max_rss_mb=max_rss_mb,
+        )
+
+    async def start(self) -> None:
+        await self.pool.start()
+
+    async def run_batch(self, batch: list) -> list:
+        async with self.pool.acquire() as browser_context:
+            result = await process_batch(batch, browser_context=browser_context)
+        return result.model_dump(mode="json")["companies"] if result else []
+
+    async def ping(self) -> list:
+        async with self.pool.acquire():
+            return []
+
+    async def close(self) -> None:
+        await self.pool.close()
+        await self.browser.close()
+
+    async def __aenter__(self) -> "InProcessAgent":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+async def run_worker(
+    pool_size: int, max_tasks_per_context: int, max_rss_mb: Optional[float]
+) -> None:
+    """Long-lived worker: one Chromium, a pool of contexts, batches over stdin.
+
+    Each stdin line is {"id": ..., "batch": [...]} (or {"id": ..., "ping": true}
+    to just check out a context); each result is written to stdout as one
+    JSON line carrying the same id. Batches run concurrently up to pool_size.
+    A line that isn't such a request gets an error with a null id.
+    """
+    agent = InProcessAgent(pool_size, max_tasks_per_context, max_rss_mb)
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    def respond(message: dict) -> None:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+    async def handle(request: dict) -> None:
+        try:
+            if request.get("ping"):
+                companies = await agent.ping()
+            else:
+                companies = await agent.run_batch(request["batch"])
+            respond({"id": request["id"], "companies": companies})
+        except Exception as e:
+            respond({"id": request["id"], "error": str(e)})
+
+    tasks = set()
+    try:
+        await agent.start()
+        respond({"ready": True})
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            if not isinstance(request, dict) or "id" not in request:
+                # A bad line fails on its own; the worker keeps serving
+                respond({"id": None, "error": f"Malformed request: {line[:200]!r}"})
+                continue
+            task = asyncio.create_task(handle(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        await agent.close()
+        resources.close()
+        tracer.flush()
+        # stdout carries the worker protocol
+        sys.stderr.write(llm_cache.summary() + "\n")
+        sys.stderr.write(resilience.summary() + "\n")
+
+
 async def main():
+    if "--worker" in sys.argv:
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--worker", action="store_true")
+        parser.add_argument("--pool-size", type=int, default=2)
+        parser.add_argument("--max-tasks-per-context", type=int, default=10)
+        parser.add_argument("--max-rss-mb", type=float, default=None)
+        args = parser.parse_args()
+        await run_worker(args.pool_size, args.max_tasks_per_context, args.max_rss_mb)
+        return
+
     input_data = sys.stdin.buffer.read().decode()
     batch_data = json.loads(input_data)
-    is_last_batch = sys.argv[1].lower() == "true" if len(sys.argv) > 1 else False
-    is_first_batch = sys.argv[2].lower() == "true" if len(sys.argv) > 2 else False
-    print(is_first_batch)
-    await process_batch(batch_data, is_last_batch, is_first_batch)
-    # sys.stdout.write(result)
+    # Batches may run concurrently, so the parent process writes the output
+    # file in order; the structured result goes to stdout as the last line.
+    result = await process_batch(batch_data)
+    companies = result.companies if result else []
+    tracer.flush()
+    print(llm_cache.summary())
+    print(resilience.summary())
+    sys.stdout.write("\n" + AdditionalFundingDetailsList(companies=companies).model_dump_json() + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,288 @@
+# backfill.py
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from jsonl_store import JsonLinesWriter, iter_json_lines
+from models import FinalFundingDataList, FinalFundingDetails, FundingDetailsList
+from resources import resources
+from sources import canonical_url, extractor_named_in, http_get, published_date
+from tracing import tracer
+
+# Date in a saved report's path, e.g. reports/2024-03-16/inc42.html
+PATH_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+# Date in a report URL, e.g. https://example.com/2024/03/16/weekly-funding/
+URL_DATE = re.compile(r"/(\d{4})/(\d{2})/(\d{2})/")
+
+DEFAULT_LEDGER = ".backfill_ledger.jsonl"
+
+
+class LedgerEntry(BaseModel):
+    """One processed week"""
+
+    snapshot_date: str
+    reports: List[str]
+    # done, partial (some companies failed to upload) or failed; only done
+    # weeks are skipped on resume
+    status: str
+    rounds: int = 0
+    failed_companies: List[str] = []
+    error: Optional[str] = None
+    finished_at: str
+
+
+@dataclass
+class Report:
+    # URL or file path the report came from; the ledger key
+    report_id: str
+    # URL used to pick the source extractor
+    url: str
+    html: str = ""
+    published: Optional[str] = None
+
+
+@dataclass
+class BackfillSummary:
+    weeks: int = 0
+    skipped_weeks: int = 0
+    failed_weeks: List[str] = field(default_factory=list)
+    partial_weeks: List[str] = field(default_factory=list)
+    rounds: int = 0
+    failed_companies: int = 0
+    unresolved_reports: List[str] = field(default_factory=list)
+
+    def __str__(self):
+        text = (
+            f"Backfilled {self.weeks} weeks ({self.rounds} rounds, {self.failed_companies} companies failed), "
+            f"{self.skipped_weeks} already in the ledger"
+        )
+        if self.failed_weeks:
+            text += f"; failed weeks: {', '.join(self.failed_weeks)}"
+        if self.partial_weeks:
+            text += f"; weeks to retry for failed companies: {', '.join(self.partial_weeks)}"
+        if self.unresolved_reports:
+            text += f"; {len(self.unresolved_reports)} reports without a date or source"
+        return text
+
+
+def load_ledger(filename: str) -> Dict[str, LedgerEntry]:
+    """Latest ledger entry per report id"""
+    entries = {}
+    if not os.path.exists(filename):
+        return entries
+    for entry in iter_json_lines(filename, LedgerEntry):
+        for report_id in entry.reports:
+            entries[report_id] = entry
+    return entries
+
+
+def week_of(snapshot_date: str) -> tuple:
+    return date.fromisoformat(snapshot_date).isocalendar()[:2]
+
+
+def in_range(day: str, start_date: Optional[str], end_date: Optional[str]) -> bool:
+    return not (start_date and day < start_date or end_date and day > end_date)
+
+
+def url_outside_range(
+    url: str, ledger: Dict[str, LedgerEntry], start_date: Optional[str], end_date: Optional[str]
+) -> bool:
+    """Whether a report URL is known to fall outside the date range before downloading it.
+
+    The date comes from the URL path or, for a URL seen in an earlier run,
+    from the week its ledger entry was filed under; unknown dates are kept.
+    """
+    if not (start_date or end_date):
+        return False
+    match = URL_DATE.search(url)
+    if match:
+        return not in_range("-".join(match.groups()), start_date, end_date)
+    entry = ledger.get(url)
+    if entry is None:
+        return False
+    # The report was published between the week's Monday and its snapshot_date
+    week_end = entry.snapshot_date
+    week_start = str(date.fromisoformat(week_end) - timedelta(days=date.fromisoformat(week_end).weekday()))
+    return bool(start_date and week_end < start_date or end_date and week_start > end_date)
+
+
+def read_html_dir(directory: str) -> List[Report]:
+    """Saved reports under `directory`.
+
+    The source comes from the page's canonical URL or, for saved report
+    fragments, from a source name in the file path; the date from the
+    page's publication date or a YYYY-MM-DD in the file path.
+    """
+    reports = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith((".html", ".htm")):
+                continue
+            path = os.path.join(root, name)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                html = f.read()
+            relative = os.path.relpath(path, directory)
+            url = canonical_url(html)
+            if url is None:
+                extractor = extractor_named_in(relative)
+                url = f"https://{extractor.domains[0]}/{relative}" if extractor else ""
+            path_date = PATH_DATE.search(relative)
+            reports.append(Report(
+                report_id=os.path.abspath(path),
+                url=url,
+                html=html,
+                published=published_date(html) or (path_date.group(1) if path_date else None),
+            ))
+    return sorted(reports, key=lambda report: report.report_id)
+
+
+async def fetch_report(url: str, timeout: float = 30) -> Report:
+    """Download a report page; the report element is picked out at extraction time"""
+    html = await asyncio.to_thread(http_get, url, timeout)
+    return Report(report_id=url, url=url, html=html, published=published_date(html))
+
+
+def group_by_week(reports: Iterable[Report]) -> Dict[str, List[Report]]:
+    """Reports per week, keyed by the latest publication date in the week"""
+    weeks = defaultdict(list)
+    for report in reports:
+        weeks[week_of(report.published)].append(report)
+    return {
+        max(report.published for report in week): week
+        for week in weeks.values()
+    }
+
+
+def to_final(funding_data: FundingDetailsList) -> FinalFundingDataList:
+    # Backfilled rounds are not enriched; insert_weekly_data keeps whatever
+    # enrichment the companies already have
+    return FinalFundingDataList(companies=[
+        FinalFundingDetails(**details.model_dump()) for details in funding_data.funding_companies_list
+    ])
+
+
+async def backfill(
+    reports: List[Report],
+    urls: List[str],
+    database_url: str,
+    auth_token: Optional[str] = None,
+    concurrency: int = 4,
+    ledger_file: str = DEFAULT_LEDGER,
+    resume: bool = True,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> BackfillSummary:
+    """Extract and upload every week in `reports` plus the pages at `urls`.
+
+    Up to `concurrency` reports are fetched and weeks extracted at once;
+    uploads go one week at a time so two weeks never race to insert the same
+    new company. A week is skipped when all its reports are marked done in
+    the ledger; a week where some companies failed to upload is marked
+    partial and redone on resume. URLs already done, or known to fall outside
+    start_date..end_date, are not downloaded.
+    """
+    from funding import ContentExtractor, extract_report, merge_funding_details
+    from validate_and_upload import create_turso_table, migrate_turso_schema, upload_week_delta
+
+    summary = BackfillSummary()
+    ledger = load_ledger(ledger_file) if resume else {}
+    done = {report_id for report_id, entry in ledger.items() if entry.status == "done"}
+    ledger_writer = JsonLinesWriter(ledger_file)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str) -> Optional[Report]:
+        async with semaphore:
+            try:
+                return await fetch_report(url)
+            except Exception as e:
+                print(f"Could not fetch {url}: {e}")
+                summary.unresolved_reports.append(url)
+                return None
+
+    fetched = await asyncio.gather(*(
+        fetch(url) for url in urls
+        if url not in done and not url_outside_range(url, ledger, start_date, end_date)
+    ))
+    resolved = []
+    for report in reports + [report for report in fetched if report]:
+        if not report.published or not report.url:
+            print(f"Skipping {report.report_id}: no publication date or source")
+            summary.unresolved_reports.append(report.report_id)
+            continue
+        if not in_range(report.published, start_date, end_date):
+            continue
+        resolved.append(report)
+
+    weeks = group_by_week(resolved)
+    pending = {}
+    for snapshot_date, week_reports in sorted(weeks.items()):
+        if all(report.report_id in done for report in week_reports):
+            summary.skipped_weeks += 1
+        else:
+            pending[snapshot_date] = week_reports
+    print(f"{len(pending)} weeks to backfill, {summary.skipped_weeks} already done")
+
+    client = resources.libsql(database_url, auth_token)
+    await create_turso_table(client)
+    await migrate_turso_schema(client)
+
+    extractor = ContentExtractor()
+    upload_lock = asyncio.Lock()
+
+    async def run_week(snapshot_date: str, week_reports: List[Report]) -> None:
+        report_ids = [report.report_id for report in week_reports]
+        entry = LedgerEntry(snapshot_date=snapshot_date, reports=report_ids, status="done", finished_at="")
+        with tracer.span("backfill_week", snapshot_date=snapshot_date, reports=len(week_reports)) as span:
+            try:
+                async with semaphore:
+                    extracted = await asyncio.gather(*(
+                        asyncio.to_thread(extract_report, extractor, report.url, report.html, snapshot_date)
+                        for report in week_reports
+                    ))
+                funding_data = to_final(merge_funding_details(*extracted))
+                async with upload_lock:
+                    entry.failed_companies, _ = await upload_week_delta(client, funding_data, snapshot_date)
+                entry.rounds = len(funding_data.companies)
+                if entry.failed_companies:
+                    # Not done: a resumed run extracts and uploads the week again
+                    entry.status = "partial"
+                span.set(rounds=entry.rounds)
+            except Exception as e:
+                entry.status = "failed"
+                entry.error = f"{type(e).__name__}: {e}"
+                summary.failed_weeks.append(snapshot_date)
+        entry.finished_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        ledger_writer.append([entry])
+        if entry.status in ("done", "partial"):
+            summary.weeks += 1
+            summary.rounds += entry.rounds
+            summary.failed_companies += len(entry.failed_companies)
+            print(f"{snapshot_date}: {entry.rounds} rounds from {len(week_reports)} reports")
+        if entry.status == "partial":
+            summary.partial_weeks.append(snapshot_date)
+            print(f"{snapshot_date}: {len(entry.failed_companies)} companies failed, the week stays pending")
+        elif entry.status == "failed":
+            print(f"{snapshot_date}: failed, {entry.error}")
+
+    try:
+        await asyncio.gather(*(run_week(snapshot_date, week) for snapshot_date, week in pending.items()))
+    finally:
+        extractor.close()
+    return summary
+
+
+def read_url_list(urls: List[str], urls_file: Optional[str] = None) -> List[str]:
+    """URLs given on the command line plus one per line in `urls_file` (# starts a comment)"""
+    urls = list(urls)
+    if urls_file:
+        with open(urls_file) as f:
+            urls += [line.split("#")[0].strip() for line in f]
+    return list(dict.fromkeys(url for url in urls if url))
@@ -0,0 +1,138 @@
+# browser_pool.py
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+def process_tree_rss_mb(root_pid: Optional[int] = None) -> float:
+    """Resident memory of a process and all its descendants (Linux /proc only).
+
+    Chromium runs as child processes of the Python worker, so this is what
+    grows when browser contexts leak memory. Returns 0 where /proc is missing.
+    """
+    root_pid = root_pid or os.getpid()
+    try:
+        page_kb = os.sysconf("SC_PAGE_SIZE") / 1024
+        children: Dict[int, List[int]] = {}
+        rss_pages: Dict[int, int] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces, so split after ')'
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            pid = int(entry)
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss_pages[pid] = int(fields[21])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+    total_pages = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_pages += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total_pages * page_kb / 1024
+
+
+@dataclass(eq=False)
+class PooledContext:
+    context: Any
+    tasks_run: int = 0
+
+
+class BrowserContextPool:
+    """Keeps `size` browser contexts alive across batches.
+
+    A context is recycled (closed and recreated) after `max_tasks_per_context`
+    tasks, or when the worker's process tree grows past `max_rss_mb`. `close`
+    closes every open context, including ones still checked out; those are
+    not returned to the pool when their batch finishes.
+    """
+
+    def __init__(
+        self,
+        create_context: Callable[[], Awaitable[Any]],
+        size: int = 2,
+        max_tasks_per_context: int = 10,
+        max_rss_mb: Optional[float] = None,
+        memory_probe: Callable[[], float] = process_tree_rss_mb,
+    ):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.create_context = create_context
+        self.size = size
+        self.max_tasks_per_context = max_tasks_per_context
+        self.max_rss_mb = max_rss_mb
+        self.memory_probe = memory_probe
+        self.available: asyncio.Queue = asyncio.Queue()
+        # Every context created and not yet closed, idle or checked out
+        self.open: Set[PooledContext] = set()
+        self.contexts_created = 0
+        self.contexts_recycled = 0
+        self.started = False
+
+    async def _new_context(self) -> PooledContext:
+        self.contexts_created += 1
+        pooled = PooledContext(context=await self.create_context())
+        self.open.add(pooled)
+        return pooled
+
+    async def start(self) -> None:
+        """Create every context up front so the first batch pays no cold start"""
+        if self.started:
+            return
+        self.started = True
+        for _ in range(self.size):
+            try:
+                self.available.put_nowait(await self._new_context())
+            except Exception as e:
+                # Leave an empty slot; acquire() retries creating it
+                print(f"Error creating browser context: {e}")
+                self.available.put_nowait(None)
+
+    def _needs_recycle(self, pooled: PooledContext) -> bool:
+        if pooled.tasks_run >= self.max_tasks_per_context:
+            return True
+        return self.max_rss_mb is not None and self.memory_probe() > self.max_rss_mb
+
+    @asynccontextmanager
+    async def acquire(self):
+        await self.start()
+        pooled = await self.available.get()
+        try:
+            # An empty slot means the previous context was recycled
+            if pooled is None:
+                pooled = await self._new_context()
+            yield pooled.context
+        finally:
+            if pooled is not None:
+                if pooled not in self.open:
+                    # Closed by close() while checked out; its slot is gone
+                    return
+                pooled.tasks_run += 1
+                if self._needs_recycle(pooled):
+                    self.contexts_recycled += 1
+                    await self._close_context(pooled)
+                    pooled = None
+            self.available.put_nowait(pooled)
+
+    async def _close_context(self, pooled: PooledContext) -> None:
+        self.open.discard(pooled)
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            print(f"Error closing browser context: {e}")
+
+    async def close(self) -> None:
+        while not self.available.empty():
+            self.available.get_nowait()
+        for pooled in list(self.open):
+            await self._close_context(pooled)
+        self.started = False
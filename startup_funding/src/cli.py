@@ -0,0 +1,380 @@
+# cli.py
+"""Single entry point for the startup_funding scripts: python3 cli.py <command>.
+
+Commands import what they use when they run, so `--help`, `validate` and
+`query` never load selenium, browser_use, langchain or openai.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date
+
+# This week's reports
+INC42_URL = "https://inc42.com/buzz/from-tonetag-to-borderplus-indian-startups-raised-270-mn-this-week/"
+ENTRACKR_URL = "https://entrackr.com/report/weekly-funding-report/funding-and-acquisitions-in-indian-startup-this-week-feb-10-feb-15-8723898"
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    add_report_arguments(parser)
+    parser.add_argument("--run-id", default=str(date.today()), help="checkpoint namespace; reuse it to resume a run")
+    parser.add_argument("--checkpoint-dir", default=".pipeline_runs")
+    parser.add_argument("--no-checkpoint", action="store_true")
+    parser.add_argument("--no-resume", action="store_true", help="re-run every stage even if checkpointed")
+    add_batch_arguments(parser)
+
+
+def add_report_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--inc42-url", default=INC42_URL)
+    parser.add_argument("--entrackr-url", default=ENTRACKR_URL)
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--batch-size", type=int, default=5, help="initial batch size, adapted as batches finish")
+    parser.add_argument("--max-batch-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=2)
+
+
+def add_date_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--start-date", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--end-date", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--limit", type=int, default=50)
+
+
+def run(args):
+    from main import run_pipeline
+
+    asyncio.run(run_pipeline(args))
+
+
+def scrape(args):
+    from funding import scrape_reports
+
+    funding_data = scrape_reports(args.inc42_url, args.entrackr_url)
+    print(f"Saved {len(funding_data.funding_companies_list)} funding rounds")
+
+
+def enrich(args):
+    from main import enrich_companies, enrichment_inputs
+    from resources import resources
+    from validate_and_upload import load_and_validate_funding
+
+    funding_data = load_and_validate_funding(args.funding_file)
+    if not funding_data:
+        return 1
+
+    async def enrich_all():
+        try:
+            await enrich_companies(
+                enrichment_inputs(funding_data),
+                max_age_days=args.max_age_days,
+                batch_size=args.batch_size,
+                max_batch_size=args.max_batch_size,
+                concurrency=args.concurrency,
+            )
+        finally:
+            await resources.aclose()
+
+    asyncio.run(enrich_all())
+
+
+def validate(args):
+    from validate_and_upload import combine_funding_data, load_and_validate_companies, load_and_validate_funding
+
+    funding_data = load_and_validate_funding(args.funding_file)
+    if not funding_data:
+        return 1
+    additional_data = load_and_validate_companies(args.enrichment_file)
+    if not additional_data:
+        return 1
+
+    combined = combine_funding_data(funding_data, additional_data)
+    for company in combined.companies:
+        amount = f"${company.amount_raised_usd:,.0f}" if company.amount_raised_usd else "undisclosed"
+        enriched = "enriched" if company.website else "not enriched"
+        print(f"{company.company_name:<32} {str(company.funding_stage):<14} {amount:>16}  {enriched}")
+    missing = sum(1 for company in combined.companies if not company.website)
+    print(f"\n{len(combined.companies)} rounds, {missing} without enrichment (dry run, nothing uploaded)")
+
+
+def upload(args):
+    from validate_and_upload import main
+
+    asyncio.run(main())
+
+
+def backfill(args):
+    from backfill import backfill as run_backfill, read_html_dir, read_url_list
+    from resources import resources
+    from validate_and_upload import TURSO_AUTH_TOKEN, TURSO_URL
+
+    urls = read_url_list(args.urls, args.urls_file)
+    reports = read_html_dir(args.html_dir) if args.html_dir else []
+    if not urls and not reports:
+        print("Nothing to backfill: pass report URLs, --urls-file or --html-dir")
+        return 1
+
+    async def run_all():
+        try:
+            return await run_backfill(
+                reports,
+                urls,
+                database_url=args.database_url or TURSO_URL,
+                auth_token=None if args.database_url else TURSO_AUTH_TOKEN,
+                concurrency=args.concurrency,
+                ledger_file=args.ledger,
+                resume=not args.no_resume,
+                start_date=args.start_date,
+                end_date=args.end_date,
+            )
+        finally:
+            await resources.aclose()
+            resources.close()
+
+    summary = asyncio.run(run_all())
+    print(summary)
+    return 1 if summary.failed_weeks else 0
+
+
+def sync(args):
+    from replica import ReplicaClient
+    from resources import resources
+    from validate_and_upload import TURSO_AUTH_TOKEN, TURSO_URL
+
+    replica_path = args.replica or resources.replica_path
+    if not replica_path:
+        print("No replica to sync: pass --replica or set TURSO_REPLICA_PATH")
+        return 1
+
+    async def run_sync():
+        import libsql_client
+
+        client = ReplicaClient(
+            libsql_client.create_client(url=f"file:{replica_path}"),
+            remote_url=args.database_url or TURSO_URL,
+            auth_token=None if args.database_url else TURSO_AUTH_TOKEN,
+        )
+        try:
+            result = await (client.push() if args.push_only else client.sync())
+            result.queued = await client.queued()
+            return result
+        finally:
+            await client.close()
+
+    result = asyncio.run(run_sync())
+    print(result)
+    return 1 if result.queued else 0
+
+
+def export(args):
+    from columnar import export_rounds
+    from resources import resources
+    from validate_and_upload import TURSO_AUTH_TOKEN, TURSO_URL
+
+    async def run_export():
+        client = resources.libsql(args.database_url or TURSO_URL, None if args.database_url else TURSO_AUTH_TOKEN)
+        try:
+            return await export_rounds(client, args.directory, file_format=args.format, full=args.full)
+        finally:
+            await resources.aclose()
+
+    print(asyncio.run(run_export()))
+
+
+def recompute_usd(args):
+    from fx import FxTable, fx_table
+    from resources import resources
+    from validate_and_upload import TURSO_AUTH_TOKEN, TURSO_URL, migrate_turso_schema, recompute_usd_amounts
+
+    table = FxTable.load(args.rates) if args.rates else fx_table()
+
+    async def run_recompute():
+        client = resources.libsql(args.database_url or TURSO_URL, None if args.database_url else TURSO_AUTH_TOKEN)
+        try:
+            await migrate_turso_schema(client)
+            return await recompute_usd_amounts(client, table, dry_run=args.dry_run)
+        finally:
+            await resources.aclose()
+
+    checked, changed = asyncio.run(run_recompute())
+    action = "would change" if args.dry_run else "changed"
+    print(f"Checked {checked} rounds with raw amounts, {action} {changed}")
+
+
+def stats(args):
+    from stats import RoundArrays, format_report, load_round_arrays
+
+    if args.from_export:
+        from columnar import load_rounds
+
+        rounds = RoundArrays.from_arrow(load_rounds(args.from_export, args.start_date, args.end_date))
+    else:
+        from resources import resources
+        from validate_and_upload import TURSO_AUTH_TOKEN, TURSO_URL
+
+        async def load():
+            try:
+                client = resources.libsql(TURSO_URL, TURSO_AUTH_TOKEN)
+                return await load_round_arrays(client, args.start_date, args.end_date)
+            finally:
+                await resources.aclose()
+
+        rounds = asyncio.run(load())
+    print(format_report(rounds, weeks=args.weeks, top=args.limit))
+
+
+def worker(args):
+    from agent import run_worker
+
+    asyncio.run(run_worker(args.pool_size, args.max_tasks_per_context, args.max_rss_mb))
+
+
+def query(args):
+    from resources import resources
+    from validate_and_upload import (
+        TURSO_AUTH_TOKEN,
+        TURSO_URL,
+        print_latest_rounds,
+        query_latest_rounds,
+        query_rounds_by_investor,
+        query_top_investors,
+    )
+
+    async def run_query():
+        client = resources.libsql(TURSO_URL, TURSO_AUTH_TOKEN)
+        try:
+            if args.query == "latest":
+                print_latest_rounds(await query_latest_rounds(
+                    client, stage=args.stage, sector=args.sector,
+                    start_date=args.start_date, end_date=args.end_date, limit=args.limit,
+                ))
+            elif args.query == "investor":
+                print_latest_rounds(await query_rounds_by_investor(
+                    client, args.investor_name,
+                    start_date=args.start_date, end_date=args.end_date, limit=args.limit,
+                ))
+            else:
+                for name, rounds, total in await query_top_investors(
+                    client, start_date=args.start_date, end_date=args.end_date, limit=args.limit
+                ):
+                    print(f"{name:<40} {rounds:>5} rounds  ${total or 0:,.0f}")
+        finally:
+            await resources.aclose()
+
+    asyncio.run(run_query())
+
+
+def trace(args):
+    from tracing import load_trace, summarize_trace
+
+    entries = load_trace(args.trace_file, args.run_id)
+    if not entries:
+        print(f"No spans in {args.trace_file}")
+        return 1
+    print(f"Run {entries[0].run_id}: {len(entries)} spans")
+    print(summarize_trace(entries))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("run", help="scrape, extract, enrich, merge and upload in one process")
+    add_pipeline_arguments(command)
+    command.set_defaults(handler=run)
+
+    command = commands.add_parser("scrape", help="extract this week's rounds to basic_funding_data_<date>.json")
+    add_report_arguments(command)
+    command.set_defaults(handler=scrape)
+
+    command = commands.add_parser("enrich", help="run the browser agent over the scraped rounds")
+    command.add_argument("--funding-file")
+    command.add_argument("--max-age-days", type=float, default=90)
+    add_batch_arguments(command)
+    command.set_defaults(handler=enrich)
+
+    command = commands.add_parser("validate", help="dry run: validate and join this week's files without uploading")
+    command.add_argument("--funding-file")
+    command.add_argument("--enrichment-file")
+    command.set_defaults(handler=validate)
+
+    command = commands.add_parser("upload", help="upload this week's files to Turso")
+    command.set_defaults(handler=upload)
+
+    command = commands.add_parser("backfill", help="load archived weekly reports, one snapshot_date per week")
+    command.add_argument("urls", nargs="*", help="report URLs")
+    command.add_argument("--urls-file", help="file with one report URL per line")
+    command.add_argument("--html-dir", help="directory of saved report HTML")
+    command.add_argument("--start-date", help="YYYY-MM-DD, skip reports published before")
+    command.add_argument("--end-date", help="YYYY-MM-DD, skip reports published after")
+    command.add_argument("--concurrency", type=int, default=4)
+    command.add_argument("--ledger", default=".backfill_ledger.jsonl", help="progress ledger; done weeks are skipped")
+    command.add_argument("--no-resume", action="store_true", help="ignore the ledger and redo every week")
+    command.add_argument("--database-url", help="defaults to TURSO_DATABASE_URL, e.g. file:backfill.db for a local file")
+    command.set_defaults(handler=backfill)
+
+    command = commands.add_parser("sync", help="push writes queued in the local replica, then refresh it from Turso")
+    command.add_argument("--replica", help="replica file, defaults to TURSO_REPLICA_PATH")
+    command.add_argument("--database-url", help="defaults to TURSO_DATABASE_URL")
+    command.add_argument("--push-only", action="store_true", help="push queued writes without pulling")
+    command.set_defaults(handler=sync)
+
+    command = commands.add_parser("export", help="write funding rounds as Parquet/Arrow files, one per snapshot_date")
+    command.add_argument("directory", nargs="?", default="funding_export")
+    command.add_argument("--format", choices=["parquet", "arrow"], default="parquet", help="arrow writes Arrow IPC files")
+    command.add_argument("--full", action="store_true", help="rewrite every week, not just new and changed ones")
+    command.add_argument("--database-url", help="defaults to TURSO_DATABASE_URL")
+    command.set_defaults(handler=export)
+
+    command = commands.add_parser("recompute-usd", help="re-price stored rounds from their raw amounts after FX rates change")
+    command.add_argument("--rates", help="date,currency,per_usd CSV, defaults to FX_RATES_FILE or src/fx_rates.csv")
+    command.add_argument("--dry-run", action="store_true", help="count the rounds that would change without updating them")
+    command.add_argument("--database-url", help="defaults to TURSO_DATABASE_URL")
+    command.set_defaults(handler=recompute_usd)
+
+    command = commands.add_parser("stats", help="weekly totals, stage and sector rollups and top investors")
+    command.add_argument("--start-date", help="YYYY-MM-DD, inclusive")
+    command.add_argument("--end-date", help="YYYY-MM-DD, inclusive")
+    command.add_argument("--weeks", type=int, default=8, help="recent weeks to list")
+    command.add_argument("--limit", type=int, default=10, help="stages, sectors and investors to list")
+    command.add_argument("--from-export", help="read a `cli.py export` directory instead of the database")
+    command.set_defaults(handler=stats)
+
+    command = commands.add_parser("worker", help="long-lived agent worker speaking JSON lines on stdin/stdout")
+    command.add_argument("--pool-size", type=int, default=2)
+    command.add_argument("--max-tasks-per-context", type=int, default=10)
+    command.add_argument("--max-rss-mb", type=float, default=None)
+    command.set_defaults(handler=worker)
+
+    command = commands.add_parser("query", help="read funding rounds back from Turso")
+    queries = command.add_subparsers(dest="query", required=True)
+    latest = queries.add_parser("latest", help="latest round per company")
+    latest.add_argument("--stage")
+    latest.add_argument("--sector")
+    add_date_arguments(latest)
+    investor = queries.add_parser("investor", help="rounds an investor took part in")
+    investor.add_argument("investor_name")
+    add_date_arguments(investor)
+    top = queries.add_parser("top-investors", help="most active investors")
+    add_date_arguments(top)
+    command.set_defaults(handler=query)
+
+    command = commands.add_parser("trace", help="p50/p95 per span and token totals from a TRACE_FILE")
+    command.add_argument("trace_file")
+    command.add_argument("--run-id", help="defaults to the last run in the file")
+    command.set_defaults(handler=trace)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args) or 0
+    finally:
+        # Only commands that ran instrumented code have loaded the tracer
+        if "tracing" in sys.modules:
+            sys.modules["tracing"].tracer.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
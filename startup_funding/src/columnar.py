@@ -0,0 +1,249 @@
+# columnar.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    # pyarrow is only needed by the export command and analytics readers
+    import pyarrow as pa
+    from libsql_client import Client
+
+FORMATS = {"parquet": "parquet", "arrow": "arrow"}
+MANIFEST = "_manifest.json"
+
+# Rounds joined with their company, one row per funding_rounds row
+ROUND_COLUMNS = [
+    "round_id",
+    "company_id",
+    "company_name",
+    "industry_sector",
+    "funding_stage",
+    "amount_raised_usd",
+    "valuation_usd",
+    "investors",
+    "sources",
+    "snapshot_date",
+]
+ROUNDS_QUERY = '''
+    SELECT fr.round_id, fr.company_id, c.company_name, c.industry_sector, fr.funding_stage,
+           fr.amount_raised_usd, fr.valuation_usd, fr.investors, fr.sources, fr.snapshot_date
+    FROM funding_rounds fr
+    JOIN companies c ON c.company_id = fr.company_id
+    WHERE fr.snapshot_date IN ({placeholders})
+    ORDER BY fr.snapshot_date, fr.round_id
+'''
+# Changes to a week's rounds, or to the company columns exported with them,
+# show up as a different count or signature list
+PARTITION_SIGNATURES_QUERY = '''
+    SELECT snapshot_date, COUNT(*), group_concat(round_signature, ',')
+    FROM (
+        SELECT fr.snapshot_date,
+               COALESCE(fr.fingerprint, fr.round_id) || '|' || COALESCE(c.company_name, '')
+                   || '|' || COALESCE(c.industry_sector, '') AS round_signature
+        FROM funding_rounds fr
+        JOIN companies c ON c.company_id = fr.company_id
+        ORDER BY fr.snapshot_date, fr.round_id
+    )
+    GROUP BY snapshot_date
+'''
+
+
+def round_schema() -> pa.Schema:
+    """Columns of an exported partition; snapshot_date lives in the directory name"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("round_id", pa.string()),
+        ("company_id", pa.string()),
+        ("company_name", pa.string()),
+        # Few distinct values, so stored and loaded dictionary-encoded
+        ("industry_sector", pa.dictionary(pa.int32(), pa.string())),
+        ("funding_stage", pa.dictionary(pa.int32(), pa.string())),
+        ("amount_raised_usd", pa.float64()),
+        ("valuation_usd", pa.float64()),
+        ("investors", pa.string()),
+        ("sources", pa.string()),
+    ])
+
+
+@dataclass
+class ExportSummary:
+    written: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    rows: int = 0
+
+    def __str__(self):
+        return (
+            f"Exported {len(self.written)} weeks ({self.rows} rounds), "
+            f"{self.unchanged} unchanged, {len(self.removed)} removed"
+        )
+
+
+def partition_dir(directory: str, snapshot_date: str) -> str:
+    return os.path.join(directory, f"snapshot_date={snapshot_date}")
+
+
+def load_manifest(directory: str) -> Dict[str, str]:
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(directory: str, manifest: Dict[str, str]) -> None:
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def write_partition(directory: str, snapshot_date: str, rows: List[tuple], file_format: str) -> None:
+    """Replace one week's file; written beside it first so readers never see half a file"""
+    import pyarrow as pa
+
+    schema = round_schema()
+    columns = list(zip(*rows)) if rows else [[] for _ in ROUND_COLUMNS]
+    table = pa.table(
+        {name: pa.array(columns[i], type=schema.field(name).type) for i, name in enumerate(ROUND_COLUMNS[:-1])},
+        schema=schema,
+    )
+    target = partition_dir(directory, snapshot_date)
+    os.makedirs(target, exist_ok=True)
+    path = os.path.join(target, f"part-0.{FORMATS[file_format]}")
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path + ".tmp", compression="zstd")
+    else:
+        import pyarrow.ipc as ipc
+
+        with ipc.new_file(path + ".tmp", schema, options=ipc.IpcWriteOptions(compression="zstd")) as writer:
+            writer.write_table(table)
+    os.replace(path + ".tmp", path)
+    for name in os.listdir(target):
+        # Left over from an export in the other format
+        if name != os.path.basename(path):
+            os.remove(os.path.join(target, name))
+
+
+async def export_rounds(
+    client: Client,
+    directory: str,
+    file_format: str = "parquet",
+    full: bool = False,
+    dates_per_query: int = 50,
+) -> ExportSummary:
+    """Write funding rounds as one file per snapshot_date under `directory`.
+
+    Files go to snapshot_date=YYYY-MM-DD/ (hive-style partitions). Unless
+    `full`, only weeks that are new or whose rounds changed since the last
+    export are fetched and rewritten, so a weekly run appends one partition;
+    weeks no longer in the database are removed.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format {file_format!r}, expected one of {', '.join(FORMATS)}")
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    if full or manifest.get("_format", file_format) != file_format:
+        # Switching formats rewrites every week
+        manifest = {}
+
+    result = await client.execute(PARTITION_SIGNATURES_QUERY)
+    signatures = {
+        snapshot_date: hashlib.sha256(f"{count}|{fingerprints}".encode()).hexdigest()[:32]
+        for snapshot_date, count, fingerprints in result.rows
+    }
+    summary = ExportSummary()
+    changed = sorted(date for date, signature in signatures.items() if manifest.get(date) != signature)
+    summary.unchanged = len(signatures) - len(changed)
+
+    for start in range(0, len(changed), dates_per_query):
+        dates = changed[start:start + dates_per_query]
+        placeholders = ", ".join("?" for _ in dates)
+        result = await client.execute(ROUNDS_QUERY.format(placeholders=placeholders), dates)
+        by_date = {date: [] for date in dates}
+        for row in result.rows:
+            by_date[row[-1]].append(tuple(row)[:-1])
+        for snapshot_date, rows in by_date.items():
+            write_partition(directory, snapshot_date, rows, file_format)
+            manifest[snapshot_date] = signatures[snapshot_date]
+            summary.written.append(snapshot_date)
+            summary.rows += len(rows)
+
+    for name in os.listdir(directory):
+        snapshot_date = name.partition("=")[2]
+        if name.startswith("snapshot_date=") and snapshot_date not in signatures:
+            shutil.rmtree(os.path.join(directory, name))
+            manifest.pop(snapshot_date, None)
+            summary.removed.append(snapshot_date)
+
+    manifest["_format"] = file_format
+    save_manifest(directory, manifest)
+    return summary
+
+
+def load_rounds(
+    directory: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> pa.Table:
+    """Exported rounds as one Arrow table, reading only the weeks in range"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    file_format = load_manifest(directory).get("_format", "parquet")
+    dataset = ds.dataset(
+        directory,
+        format="ipc" if file_format == "arrow" else "parquet",
+        partitioning=ds.partitioning(pa.schema([("snapshot_date", pa.string())]), flavor="hive"),
+        ignore_prefixes=["_", "."],
+    )
+    condition = None
+    if start_date:
+        condition = ds.field("snapshot_date") >= start_date
+    if end_date:
+        upper = ds.field("snapshot_date") <= end_date
+        condition = upper if condition is None else condition & upper
+    # Each week's file has its own dictionaries; group_by needs one per column
+    return dataset.to_table(columns=columns, filter=condition).unify_dictionaries()
+
+
+def raised_by_sector_month(rounds: pa.Table) -> pa.Table:
+    """Total and count of disclosed rounds per (industry_sector, YYYY-MM), largest first"""
+    import pyarrow.compute as pc
+
+    rounds = rounds.append_column("month", pc.utf8_slice_codeunits(rounds["snapshot_date"], 0, 7))
+    return (
+        rounds.group_by(["industry_sector", "month"])
+        .aggregate([("amount_raised_usd", "sum"), ("amount_raised_usd", "count")])
+        .sort_by([("month", "ascending"), ("amount_raised_usd_sum", "descending")])
+    )
+
+
+def stage_distribution(rounds: pa.Table) -> pa.Table:
+    """Rounds, share of rounds and total raised per funding_stage"""
+    import pyarrow.compute as pc
+
+    table = rounds.group_by("funding_stage").aggregate([
+        ("funding_stage", "count"),
+        ("amount_raised_usd", "sum"),
+    ])
+    share = pc.divide(pc.cast(table["funding_stage_count"], "float64"), float(max(rounds.num_rows, 1)))
+    return table.append_column("share", share).sort_by([("funding_stage_count", "descending")])
+
+
+def weekly_totals(rounds: pa.Table) -> pa.Table:
+    """Rounds and total raised per snapshot_date"""
+    return (
+        rounds.group_by("snapshot_date")
+        .aggregate([("amount_raised_usd", "sum"), ("round_id", "count")])
+        .sort_by("snapshot_date")
+    )
@@ -1,68 +1,37 @@
 # funding.py
 # from datetime import date
+import asyncio
 from datetime import date
 import json
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from openai import OpenAI
 import os
-from enum import Enum
-from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
+from html_reduce import SERIES_WISE_DEALS_MARKER, chunk_text, reduce_html
+from inc42_parser import MIN_CONFIDENCE, parse_inc42_table
+from llm_cache import llm_cache
+from fx import normalize_amounts
+from models import ExtractedRoundList, FundingDetails, FundingDetailsList, FundRaiseStages
+from name_index import name_key
+from normalize import normalize_currency
+from resilience import resilience
+from resources import resources
+from tracing import tracer
+from sources import SourceExtractor, SourceFetcher, extractor_for_url
 
 
-class FundRaiseStages(Enum):
-    SEED = "Seed"
-    SERIES_A = "Series A"
-    SERIES_B = "Series B"
-    SERIES_C = "Series C"
-    SERIES_D = "Series D"
-    SERIES_E = "Series E"
-    SERIES_F = "Series F"
-    PRE_SEED = "Pre-Seed"
-    GROWTH = "Growth"
-    ANGEL = "Angel"
-    DEBT = "Debt"
-    NOT_AVAILABLE = "Not Available"
-
-    def __str__(self):
-        return self.value
-
-
-class FundingDetails(BaseModel):
-    company_name: str
-    amount_raised_usd: Optional[float]
-    investors: List[str]
-    industry_sector: str
-    funding_stage: FundRaiseStages
-    # valuation_usd: Optional[float]
-    source: Optional[List[str]]
-
-    class Config:
-        json_encoders = {FundRaiseStages: lambda v: v.value}
-
-
-class FundingDetailsList(BaseModel):
-    funding_companies_list: List[FundingDetails]
-
-    # def __iter__(self):
-    #     return iter(self.root)
-
-    # def __getitem__(self, item):
-    #     return self.root[item]
-
-    class Config:
-        json_encoders = {FundRaiseStages: lambda v: v.value}
+FIREFOX_PATH = "/usr/bin/firefox"
+FIREFOX_PROFILE_PATH = "~/.mozilla/firefox/as2wzq75.default-release"
 
+# Reduced report text per extraction call (~3k tokens): small enough that the
+# model's answer is never cut off, so no company is silently dropped
+EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", 12_000))
+# Chunks extracted at once
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", 4))
 
 SYSTEM_PROMPT = """
-        You are an expert at extracting structured data from HTML content. Extract the following details from the provided HTML:
+        You are an expert at extracting structured data from funding reports. The content is extracted from HTML pages: table rows are tab-separated lines (the first row is the header) and articles are plain paragraphs. Extract the following details from the provided content:
         1. Company name (combine data from both sources and construct a unique list (list of dicts)).
-        2. Amount raised (convert to USD if in INR; 1 USD = 86.8 INR, and please don't write like 0.75 etc. write the value for example for $750K write 750000).
+        2. Amount raised exactly as written, without converting it: the number, the currency code (USD or INR) and the unit after the number (K, Lakh, Mn, Cr or Bn; null if there is none). For example $750K is 750, USD, K and INR 4.5 Cr is 4.5, INR, Cr. Use null for all three if the amount is undisclosed.
         3. Investors list.
         4. Industry/Sector.
         5. Funding stage (choose from: Seed, Series A, Series B, Series C, Series D, Series E, Series F, Pre-Seed, Angel, Debt).
@@ -73,85 +42,259 @@ SYSTEM_PROMPT = """
 
 
 class ContentExtractor:
-    def __init__(self, firefox_binary_path=None, profile_path=None):
+    def __init__(self, firefox_binary_path=None, profile_path=None, max_drivers: int = 2):
+        self.firefox_binary_path = firefox_binary_path
+        self.profile_path = profile_path
+        self._driver = None
+        # Static pages come over plain HTTP; JS pages use a pool of headless drivers
+        self.fetcher = SourceFetcher(driver_factory=self._new_headless_driver, max_drivers=max_drivers)
+
+    def _new_driver(self, headless: bool = False, use_profile: bool = True):
+        from selenium import webdriver
+        from selenium.webdriver.firefox.options import Options
+
         options = Options()
-        if firefox_binary_path:
-            options.binary_location = firefox_binary_path
+        if self.firefox_binary_path:
+            options.binary_location = self.firefox_binary_path
         options.add_argument("-no-remote")
-        if profile_path:
-            options.profile = os.path.expanduser(profile_path)
-        self.driver = webdriver.Firefox(options=options)
+        if headless:
+            options.add_argument("-headless")
+        if use_profile and self.profile_path:
+            options.profile = os.path.expanduser(self.profile_path)
+        return webdriver.Firefox(options=options)
 
-    def extract_content(self, url: str) -> str:
+    def _new_headless_driver(self):
+        # Pooled drivers run side by side, so they can't share the profile lock
+        return self._new_driver(headless=True, use_profile=False)
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self._new_driver()
+        return self._driver
+
+    def extract_content(self, url: str, reduce: bool = True) -> str:
+        """Return the report element of `url`, reduced to compact text unless reduce=False"""
         try:
-            self.driver.get(url)
-            if "inc42.com" in url:
-                element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "table"))
-                )
-            elif "entrackr.com" in url:
-                element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, "div#post-container, div#postContent")
-                    )
-                )
-            else:
-                raise ValueError("Unsupported URL type")
-
-            element_html = element.get_attribute("outerHTML")
-
-            if "entrackr.com" in url:
-                series_wise_deals_index = element_html.find("[Series-wise deals]")
-                if series_wise_deals_index != -1:
-                    element_html = element_html[
-                        : series_wise_deals_index + len("[Series-wise deals]")
-                    ]
-
-            return element_html
+            source = extractor_for_url(url)
+            element_html = source.extract_with_driver(self.driver, url)
+            return self.prepare_content(url, source, element_html, reduce)
         except Exception as e:
             print(f"Error extracting content: {e}")
             raise e
 
+    def prepare_content(self, url: str, source: SourceExtractor, element_html: str, reduce: bool = True) -> str:
+        if reduce:
+            reduced_text, stats = reduce_html(element_html, source=url, stop_marker=source.stop_marker)
+            print(stats)
+            return reduced_text
+
+        if source.stop_marker:
+            stop_index = element_html.find(source.stop_marker)
+            if stop_index != -1:
+                element_html = element_html[: stop_index + len(source.stop_marker)]
+
+        return element_html
+
+    def fetch_sources(self, urls: List[str], reduce: bool = True) -> List[str]:
+        """Fetch every report URL concurrently; contents are returned in input order"""
+        pages = asyncio.run(self.fetcher.fetch_all(urls))
+        for page in pages:
+            print(f"Fetched {page.extractor.name} via {page.fetched_with}")
+        return [
+            self.prepare_content(page.url, page.extractor, page.html, reduce)
+            for page in pages
+        ]
+
     def extract_funding_details(self, html_content: str) -> FundingDetailsList:
+        """Rounds in `html_content` with raw amounts; amount_raised_usd is left to normalize_amounts"""
         load_dotenv()
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        client = resources.openai()
         user_message = {
             "role": "user",
-            "content": f"Extract funding details from the following HTML content:\n\n{html_content}",
+            "content": f"Extract funding details from the following content:\n\n{html_content}",
         }
-        response = client.beta.chat.completions.parse(
+        extracted = llm_cache.parse(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 user_message,
             ],
-            response_format=FundingDetailsList,
+            response_format=ExtractedRoundList,
         )
-        return response.choices[0].message.parsed
+        if extracted is None:
+            # A refusal or content-filter answer; the rest of the report still counts
+            print(f"Model returned no rounds for {len(html_content):,} chars of content "
+                  f"starting {html_content[:60]!r} (refused or filtered)")
+            return FundingDetailsList(funding_companies_list=[])
+        return FundingDetailsList(funding_companies_list=[
+            FundingDetails(
+                company_name=details.company_name,
+                amount_raised_usd=None,
+                investors=details.investors,
+                industry_sector=details.industry_sector,
+                funding_stage=details.funding_stage,
+                source=details.source,
+                **raw_amount_fields(details.amount, details.currency, details.amount_unit),
+            )
+            for details in extracted.funding_companies_list
+        ])
+
+    def extract_funding_details_chunked(
+        self,
+        sections: List[Tuple[str, str]],
+        max_chars: int = EXTRACTION_CHUNK_CHARS,
+        concurrency: int = EXTRACTION_CONCURRENCY,
+    ) -> FundingDetailsList:
+        """Extract rounds from (title, reduced text) sections.
+
+        Each section is split into chunks that are extracted concurrently,
+        each prefixed with its section title so the model attributes the
+        source. The results are merged in section order, one entry per company.
+        """
+        chunks = [
+            f"{title}\n{chunk}"
+            for title, text in sections
+            for chunk in chunk_text(text, max_chars)
+        ]
+        print(f"Extracting {len(chunks)} chunks, {concurrency} at a time")
+
+        async def extract_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def extract(chunk):
+                async with semaphore:
+                    return await asyncio.to_thread(self.extract_funding_details, chunk)
+
+            return await asyncio.gather(*(extract(chunk) for chunk in chunks))
+
+        with tracer.span("extract_chunks", chunks=len(chunks)):
+            return merge_funding_details(*asyncio.run(extract_all()))
 
     def close(self):
-        self.driver.quit()
+        self.fetcher.close()
+        if self._driver is not None:
+            self._driver.quit()
 
 
-def main():
-    try:
-        # Read input JSON from stdin
-        input_json = json.loads(input())
-        inc42_url = input_json["inc42_url"]
-        entrackr_url = input_json["entrackr_url"]
+def raw_amount_fields(amount: Optional[float], currency: Optional[str], unit: Optional[str]) -> dict:
+    """FundingDetails raw amount fields for an amount the model read; lakh and crore imply rupees"""
+    if amount is None:
+        return {}
+    return {
+        "amount_raw": amount,
+        "amount_currency": normalize_currency(currency) or ("INR" if unit in ("Lakh", "Cr") else "USD"),
+        "amount_unit": unit,
+    }
+
+
+def merge_funding_details(*funding_lists: FundingDetailsList) -> FundingDetailsList:
+    """Merge lists from different sources, one entry per company.
+
+    Companies are keyed by name_index.name_key, the same key the upload
+    matches stored names on, so "Nua" and "Nua.in" merge here too.
+
+    Earlier lists win for conflicting fields; missing amounts (raw and USD
+    together) and investors are filled from later ones and the source lists
+    are combined.
+    """
+    merged = {}
+    for funding_list in funding_lists:
+        if not funding_list:
+            continue
+        for details in funding_list.funding_companies_list:
+            key = name_key(details.company_name)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = details.model_copy(deep=True)
+                continue
+            if existing.amount_raised_usd is None and existing.amount_raw is None:
+                existing.amount_raised_usd = details.amount_raised_usd
+                existing.amount_raw = details.amount_raw
+                existing.amount_currency = details.amount_currency
+                existing.amount_unit = details.amount_unit
+                existing.fx_rate = details.fx_rate
+            if not existing.investors:
+                existing.investors = details.investors
+            if existing.funding_stage == FundRaiseStages.NOT_AVAILABLE:
+                existing.funding_stage = details.funding_stage
+            existing.source = list(dict.fromkeys((existing.source or []) + (details.source or [])))
+    return FundingDetailsList(funding_companies_list=list(merged.values()))
+
+
+def inc42_rounds(inc42_html: str) -> Optional[FundingDetailsList]:
+    """Rounds from the Inc42 table parser, or None when it is unsure and the LLM should read the report"""
+    inc42_table = parse_inc42_table(inc42_html)
+    if inc42_table.confidence >= MIN_CONFIDENCE:
+        return FundingDetailsList(funding_companies_list=inc42_table.rows)
+    print(f"Inc42 table parse confidence {inc42_table.confidence:.0%}, using LLM: {inc42_table.problems}")
+    return None
+
 
-        firefox_path = "/usr/bin/firefox"
-        profile_path = "~/.mozilla/firefox/as2wzq75.default-release"
+def extract_report(
+    extractor: ContentExtractor,
+    url: str,
+    html: str,
+    snapshot_date: Optional[str] = None,
+) -> FundingDetailsList:
+    """Funding rounds from one report, given as the whole page or just its report element.
 
-        extractor = ContentExtractor(firefox_path, profile_path)
-        inc42_content = "Extracted Content from Inc42\n" + extractor.extract_content(
-            inc42_url
+    Amounts are converted to USD at the rate in effect on snapshot_date (today by default).
+    """
+    source = extractor_for_url(url)
+    html = source.extract(html) or html
+    funding_data = inc42_rounds(html) if source.name == "Inc42" else None
+    if funding_data is None:
+        text, stats = reduce_html(html, source=url, stop_marker=source.stop_marker)
+        print(stats)
+        funding_data = extractor.extract_funding_details_chunked([(f"Extracted Content from {source.name}", text)])
+    normalize_amounts(funding_data.funding_companies_list, snapshot_date)
+    return funding_data
+
+
+def extract_funding_data(
+    extractor: ContentExtractor,
+    inc42_url: str,
+    inc42_html: str,
+    entrackr_url: str,
+    entrackr_html: str,
+    snapshot_date: Optional[str] = None,
+) -> FundingDetailsList:
+    """Funding rounds from the raw Inc42 and Entrackr report HTML.
+
+    Amounts are converted to USD at the rate in effect on snapshot_date (today by default).
+    """
+    entrackr_text, stats = reduce_html(
+        entrackr_html, source=entrackr_url, stop_marker=SERIES_WISE_DEALS_MARKER
+    )
+    print(stats)
+    entrackr_section = ("Extracted Content from Entrackr", entrackr_text)
+
+    # The Inc42 report is a plain table; only fall back to the LLM for it
+    # when the deterministic parser is unsure.
+    inc42_data = inc42_rounds(inc42_html)
+    if inc42_data is not None:
+        entrackr_data = extractor.extract_funding_details_chunked([entrackr_section])
+        funding_data = merge_funding_details(inc42_data, entrackr_data)
+    else:
+        inc42_text, stats = reduce_html(inc42_html, source=inc42_url)
+        print(stats)
+        funding_data = extractor.extract_funding_details_chunked(
+            [("Extracted Content from Inc42", inc42_text), entrackr_section]
         )
-        entrackr_content = "HTML Content from Entrackr\n" + extractor.extract_content(
-            entrackr_url
+    normalize_amounts(funding_data.funding_companies_list, snapshot_date)
+    return funding_data
+
+
+def scrape_reports(inc42_url: str, entrackr_url: str) -> FundingDetailsList:
+    """Fetch both reports, extract the rounds and write basic_funding_data_<date>.json"""
+    try:
+        extractor = ContentExtractor(FIREFOX_PATH, FIREFOX_PROFILE_PATH)
+        inc42_html, entrackr_html = extractor.fetch_sources([inc42_url, entrackr_url], reduce=False)
+        funding_data = extract_funding_data(
+            extractor, inc42_url, inc42_html, entrackr_url, entrackr_html
         )
-        final_content = inc42_content + "\n" + entrackr_content
-        funding_data = extractor.extract_funding_details(final_content)
 
         # Print the funding data to stdout as JSON
         # print(funding_data.model_dump_json())
@@ -163,6 +306,16 @@ def main():
     finally:
         if "extractor" in locals():
             extractor.close()
+        resources.close()
+        tracer.flush()
+        print(llm_cache.summary())
+        print(resilience.summary())
+
+
+def main():
+    # Read input JSON from stdin
+    input_json = json.loads(input())
+    return scrape_reports(input_json["inc42_url"], input_json["entrackr_url"])
 
 
 if __name__ == "__main__":
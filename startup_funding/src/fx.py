@@ -0,0 +1,159 @@
+# fx.py
+"""Dated exchange rates and the normalizer that turns raw report amounts into USD.
+
+The extractor keeps amounts as written (4.5, "INR", "Cr"); converting them
+happens here, at the rate in effect on the round's snapshot_date, so a
+backfilled week is priced at its own rate and corrected rates can be
+re-applied to stored history (validate_and_upload.recompute_usd_amounts).
+"""
+from __future__ import annotations
+
+import csv
+import os
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from normalize import INR_PER_USD, UNIT_VALUES
+
+if TYPE_CHECKING:
+    # numpy is only imported once a week's amounts are converted
+    import numpy as np
+
+    from models import FinalFundingDetails, FundingDetails
+
+DEFAULT_FX_RATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fx_rates.csv")
+
+
+class FxTable:
+    """Units of each currency per USD, by the date a rate takes effect.
+
+    A rate applies from its date until the next one for the same currency;
+    dates before a currency's first rate use that first rate. USD is always
+    1 and INR falls back to INR_PER_USD when the table has no rupee rates.
+    """
+
+    def __init__(self, rates: Iterable[Tuple[str, str, float]]):
+        by_currency: Dict[str, List[Tuple[str, float]]] = {}
+        for effective, currency, per_usd in rates:
+            by_currency.setdefault(currency.upper(), []).append((str(effective), float(per_usd)))
+        self._rates = {currency: sorted(rows) for currency, rows in by_currency.items()}
+        self._arrays = None
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_FX_RATES_FILE) -> "FxTable":
+        """Read a date,currency,per_usd CSV; lines starting with # are comments"""
+        with open(path, newline="") as f:
+            rows = csv.DictReader(line for line in f if line.strip() and not line.startswith("#"))
+            return cls((row["date"], row["currency"], row["per_usd"]) for row in rows)
+
+    @classmethod
+    def from_env(cls) -> "FxTable":
+        return cls.load(os.getenv("FX_RATES_FILE", DEFAULT_FX_RATES_FILE))
+
+    @property
+    def currencies(self) -> List[str]:
+        return sorted(set(self._rates) | {"USD"})
+
+    def arrays(self) -> Dict[str, tuple]:
+        """currency -> (effective dates as datetime64[D], rates), built once"""
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = {
+                currency: (
+                    np.array([effective for effective, _ in rows], dtype="datetime64[D]"),
+                    np.array([per_usd for _, per_usd in rows]),
+                )
+                for currency, rows in self._rates.items()
+            }
+        return self._arrays
+
+    def rates(self, currencies: Sequence[Optional[str]], dates: Sequence[str]) -> np.ndarray:
+        """Rate for each (currency, YYYY-MM-DD date) pair; NaN for unknown currencies.
+
+        One searchsorted per currency, so pricing a week or all of history
+        costs the same handful of array operations.
+        """
+        import numpy as np
+
+        currencies = np.array([currency or "USD" for currency in currencies], dtype=object)
+        days = np.array(dates, dtype="datetime64[D]")
+        result = np.full(len(currencies), np.nan)
+        result[currencies == "USD"] = 1.0
+        tables = self.arrays()
+        for currency in set(currencies.tolist()) - {"USD"}:
+            mask = currencies == currency
+            if currency in tables:
+                effective, per_usd = tables[currency]
+                index = np.searchsorted(effective, days[mask], side="right") - 1
+                result[mask] = per_usd[np.maximum(index, 0)]
+            elif currency == "INR":
+                result[mask] = INR_PER_USD
+        return result
+
+    def rate(self, currency: Optional[str], on: str) -> Optional[float]:
+        rate = float(self.rates([currency], [on])[0])
+        return None if rate != rate else rate
+
+
+_fx_table: Optional[FxTable] = None
+
+
+def fx_table() -> FxTable:
+    """The FxTable from FX_RATES_FILE (default src/fx_rates.csv), read on first use"""
+    global _fx_table
+    if _fx_table is None:
+        _fx_table = FxTable.from_env()
+    return _fx_table
+
+
+def usd_amounts(
+    amounts: Sequence[float],
+    units: Sequence[Optional[str]],
+    currencies: Sequence[Optional[str]],
+    dates: Sequence[str],
+    table: Optional[FxTable] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """USD values (rounded to cents) and the rates used, NaN where a currency has no rate"""
+    import numpy as np
+
+    table = table or fx_table()
+    multipliers = np.array([UNIT_VALUES.get(unit, 1.0) for unit in units])
+    rates = table.rates(currencies, dates)
+    return np.round(np.asarray(amounts, dtype=float) * multipliers / rates, 2), rates
+
+
+def normalize_amounts(
+    companies: Sequence[FundingDetails | FinalFundingDetails],
+    snapshot_date: Optional[str] = None,
+    table: Optional[FxTable] = None,
+) -> int:
+    """Set amount_raised_usd and fx_rate from the raw amount fields, in place.
+
+    The whole week is converted in one pass at the rate in effect on
+    `snapshot_date` (today by default). Records without a raw amount keep
+    whatever amount_raised_usd they have. Returns how many records have a
+    raw amount in a currency the table can't price; those are left without
+    a USD amount.
+    """
+    raw = [company for company in companies if company.amount_raw is not None]
+    if not raw:
+        return 0
+    snapshot_date = snapshot_date or str(date.today())
+    usd, rates = usd_amounts(
+        [company.amount_raw for company in raw],
+        [company.amount_unit for company in raw],
+        [company.amount_currency for company in raw],
+        [snapshot_date] * len(raw),
+        table,
+    )
+    unpriced = 0
+    for company, amount, rate in zip(raw, usd.tolist(), rates.tolist()):
+        if rate != rate:
+            print(f"No {company.amount_currency} rate for {company.company_name} on {snapshot_date}")
+            company.amount_raised_usd = company.fx_rate = None
+            unpriced += 1
+        else:
+            company.amount_raised_usd = amount
+            company.fx_rate = rate
+    return unpriced
@@ -0,0 +1,188 @@
+# html_reduce.py
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional
+
+SERIES_WISE_DEALS_MARKER = "[Series-wise deals]"
+
+# Tags whose text never carries funding information
+SKIPPED_TAGS = {"script", "style", "noscript", "svg", "iframe", "button", "form", "template"}
+# Tags that start a new paragraph in the reduced text
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "li", "ul", "ol", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "figcaption",
+}
+
+WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class ReductionStats:
+    source: str
+    bytes_in: int
+    bytes_out: int
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    @property
+    def approx_tokens_saved(self) -> int:
+        # Roughly 4 bytes per token for English text and markup
+        return (self.bytes_in - self.bytes_out) // 4
+
+    def __str__(self):
+        return (
+            f"{self.source}: {self.bytes_in:,} -> {self.bytes_out:,} bytes "
+            f"({self.ratio:.1%} kept, ~{self.approx_tokens_saved:,} tokens saved)"
+        )
+
+
+class HTMLReducer(HTMLParser):
+    """Streaming HTML -> compact text reducer.
+
+    Drops attributes, scripts and styles. Table rows become tab-separated
+    lines, everything else becomes plain paragraphs. When `stop_marker` is
+    given, text after its first occurrence is discarded (the marker itself
+    is kept), also when the marker is split across feed() chunks or inline
+    tags. Feed chunks with feed() and read the result from text().
+    """
+
+    def __init__(self, stop_marker: Optional[str] = None):
+        super().__init__(convert_charrefs=True)
+        self.stop_marker = stop_marker
+        self.stopped = False
+        # Last len(stop_marker) - 1 characters of text, to find a marker
+        # that straddles handle_data() calls
+        self.marker_tail = ""
+        self.skip_depth = 0
+        self.lines: List[str] = []
+        self.paragraph: List[str] = []
+        self.row: Optional[List[str]] = None
+        self.cell: Optional[List[str]] = None
+
+    def _flush_paragraph(self) -> None:
+        text = WHITESPACE.sub(" ", "".join(self.paragraph)).strip()
+        if text:
+            self.lines.append(text)
+        self.paragraph = []
+
+    def _flush_cell(self) -> None:
+        if self.cell is not None and self.row is not None:
+            self.row.append(WHITESPACE.sub(" ", "".join(self.cell)).strip())
+        self.cell = None
+
+    def _flush_row(self) -> None:
+        self._flush_cell()
+        if self.row and any(self.row):
+            self.lines.append("\t".join(self.row))
+        self.row = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.stopped:
+            return
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == "tr":
+            self._flush_paragraph()
+            self._flush_row()
+            self.row = []
+        elif tag in ("td", "th"):
+            self._flush_cell()
+            if self.row is None:
+                self.row = []
+            self.cell = []
+        elif tag in BLOCK_TAGS and self.cell is None:
+            self._flush_paragraph()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br":
+            if self.cell is not None:
+                self.cell.append(" ")
+            elif not self.stopped:
+                self._flush_paragraph()
+
+    def handle_endtag(self, tag):
+        if self.stopped:
+            return
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in ("td", "th"):
+            self._flush_cell()
+        elif tag in ("tr", "table"):
+            self._flush_row()
+        elif tag in BLOCK_TAGS and self.cell is None:
+            self._flush_paragraph()
+
+    def handle_data(self, data):
+        if self.stopped or self.skip_depth:
+            return
+        if self.stop_marker:
+            window = self.marker_tail + data
+            index = window.find(self.stop_marker)
+            if index != -1:
+                data = data[: index + len(self.stop_marker) - len(self.marker_tail)]
+                self.stopped = True
+            else:
+                self.marker_tail = window[max(0, len(window) - len(self.stop_marker) + 1) :]
+        (self.cell if self.cell is not None else self.paragraph).append(data)
+        if self.stopped:
+            self._flush_row()
+            self._flush_paragraph()
+
+    def text(self) -> str:
+        if not self.stopped:
+            self._flush_row()
+            self._flush_paragraph()
+        return "\n".join(self.lines)
+
+
+def reduce_html(html: str, source: str = "", stop_marker: Optional[str] = None, chunk_size: int = 64 * 1024):
+    """Reduce an HTML fragment to compact text; returns (text, ReductionStats)"""
+    reducer = HTMLReducer(stop_marker=stop_marker)
+    for start in range(0, len(html), chunk_size):
+        reducer.feed(html[start : start + chunk_size])
+        if reducer.stopped:
+            break
+    reducer.close()
+    text = reducer.text()
+    stats = ReductionStats(
+        source=source,
+        bytes_in=len(html.encode()),
+        bytes_out=len(text.encode()),
+    )
+    return text, stats
+
+
+def chunk_text(text: str, max_chars: int = 12_000, overlap_lines: int = 1) -> List[str]:
+    """Split reduced text into chunks of about `max_chars` on line boundaries.
+
+    Lines are table rows or paragraphs, so a row is never cut in half. A
+    leading table header row (a tab-separated first line) is repeated at
+    the top of every chunk. The last `overlap_lines` lines of a chunk start
+    the next one, so a deal whose heading and paragraph straddle the
+    boundary is seen whole at least once; the duplicates are merged later.
+    """
+    lines = [line for line in text.split("\n") if line.strip()]
+    if not lines:
+        return []
+    header = lines.pop(0) if "\t" in lines[0] else None
+    budget = max_chars - (len(header) + 1 if header else 0)
+
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    # Lines at the start of `current` repeated from the previous chunk
+    carried = 0
+    size = 0
+    for line in lines:
+        if len(current) > carried and size + len(line) + 1 > budget:
+            chunks.append(current)
+            current = current[-overlap_lines:] if overlap_lines else []
+            carried = len(current)
+            size = sum(len(kept) + 1 for kept in current)
+        current.append(line)
+        size += len(line) + 1
+    if len(current) > carried:
+        chunks.append(current)
+    return ["\n".join(([header] if header else []) + chunk) for chunk in chunks]
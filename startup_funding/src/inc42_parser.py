@@ -0,0 +1,116 @@
+# inc42_parser.py
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from html_reduce import reduce_html
+from normalize import is_undisclosed, normalize_stage, parse_raw_amount
+
+# Header keywords -> FundingDetails field, checked in order
+COLUMN_KEYWORDS = [
+    ("company_name", ("name", "startup", "company")),
+    ("industry_sector", ("sector", "industry")),
+    ("amount", ("round size", "amount", "funding size")),
+    ("funding_stage", ("round type", "stage", "round")),
+    ("investors", ("investors",)),
+]
+# Columns that only look like the ones above
+IGNORED_HEADERS = ("subsector", "lead investor", "business model")
+
+INVESTOR_SEPARATOR = re.compile(r",|;|\band\b|&(?![^()]*\))")
+
+MIN_CONFIDENCE = 0.9
+
+
+@dataclass
+class ParsedTable:
+    rows: List[dict] = field(default_factory=list)
+    # Fraction of rows whose required fields parsed cleanly (0 if no header)
+    confidence: float = 0.0
+    problems: List[str] = field(default_factory=list)
+
+
+def map_columns(header: List[str]) -> Dict[str, int]:
+    columns: Dict[str, int] = {}
+    for index, cell in enumerate(header):
+        label = cell.lower().strip()
+        if any(label.startswith(ignored) for ignored in IGNORED_HEADERS):
+            continue
+        for column, keywords in COLUMN_KEYWORDS:
+            if column not in columns and any(keyword in label for keyword in keywords):
+                columns[column] = index
+                break
+    return columns
+
+
+def split_investors(text: str) -> List[str]:
+    if is_undisclosed(text):
+        return []
+    investors = [part.strip(" .") for part in INVESTOR_SEPARATOR.split(text)]
+    return [investor for investor in investors if investor and not is_undisclosed(investor)]
+
+
+def parse_inc42_table(html: str) -> ParsedTable:
+    """Parse the Inc42 weekly funding table into FundingDetails-shaped dicts.
+
+    Amounts are kept as written; fx.normalize_amounts converts them to USD.
+    """
+    text, _ = reduce_html(html)
+    lines = [line.split("\t") for line in text.splitlines() if "\t" in line]
+
+    parsed = ParsedTable()
+    header_index = next(
+        (i for i, cells in enumerate(lines) if {"company_name", "amount"} <= map_columns(cells).keys()),
+        None,
+    )
+    if header_index is None:
+        parsed.problems.append("no header row with name and amount columns")
+        return parsed
+
+    columns = map_columns(lines[header_index])
+    clean_rows = 0
+    body = [cells for cells in lines[header_index + 1 :] if len(cells) == len(lines[header_index])]
+    for cells in body:
+        def cell(column: str) -> str:
+            return cells[columns[column]].strip() if column in columns else ""
+
+        company_name = cell("company_name")
+        if is_undisclosed(company_name):
+            parsed.problems.append(f"row without company name: {cells}")
+            continue
+
+        clean = True
+        amount_text = cell("amount")
+        amount = parse_raw_amount(amount_text)
+        if amount is None and not is_undisclosed(amount_text):
+            parsed.problems.append(f"{company_name}: unparsed amount {amount_text!r}")
+            clean = False
+
+        stage = normalize_stage(cell("funding_stage"))
+        if stage is None:
+            parsed.problems.append(f"{company_name}: unknown stage {cell('funding_stage')!r}")
+            stage = "Not Available"
+            clean = False
+
+        sector = cell("industry_sector")
+        if is_undisclosed(sector):
+            clean = False
+
+        parsed.rows.append({
+            "company_name": company_name,
+            "amount_raised_usd": None,
+            "amount_raw": amount[0] if amount else None,
+            "amount_currency": amount[1] if amount else None,
+            "amount_unit": amount[2] if amount else None,
+            "investors": split_investors(cell("investors")),
+            "industry_sector": sector or "Not Available",
+            "funding_stage": stage,
+            "source": ["Inc42"],
+        })
+        clean_rows += clean
+
+    if "industry_sector" not in columns or "funding_stage" not in columns:
+        parsed.problems.append("missing sector or stage column")
+    elif body:
+        parsed.confidence = clean_rows / len(body)
+    return parsed
@@ -0,0 +1,70 @@
+# jsonl_store.py
+import json
+import os
+from typing import Iterable, Iterator, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked
+    fcntl = None
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class JsonLinesWriter:
+    """Append-only JSON Lines file, safe across processes and crashes.
+
+    Each append takes an exclusive lock on the file, writes whole lines and
+    fsyncs before releasing, so concurrent batch workers never interleave
+    records and a crash can at worst leave one partial trailing line. The
+    next append ends that line first, so only the torn record is lost.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def truncate(self) -> None:
+        with open(self.filename, "w"):
+            pass
+
+    def append(self, records: Iterable) -> int:
+        lines = []
+        for record in records:
+            if isinstance(record, BaseModel):
+                record = record.model_dump(mode="json")
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if not lines:
+            return 0
+        data = "".join(lines).encode("utf-8")
+
+        with open(self.filename, "ab+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Don't glue the first record onto a line left partial by a crash
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return len(lines)
+
+
+def iter_json_lines(filename: str, model: Type[T]) -> Iterator[T]:
+    """Yield validated records one line at a time, skipping bad lines"""
+    with open(filename, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield model.model_validate_json(line)
+            except ValidationError as e:
+                print(f"Skipping invalid record on line {line_number} of {filename}: {e}")
@@ -0,0 +1,202 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from resilience import resilience
+from tracing import tracer
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LLMCache:
+    """On-disk cache for structured LLM calls.
+
+    Entries are keyed by a hash of the model, the messages (system prompt and
+    input content) and the response schema, and hold the parsed response.
+    Entries older than `ttl_seconds` are ignored; once the cache grows past
+    `max_size_mb` the least recently used entries are deleted, down to 90% of
+    it so the next writes don't have to evict again. The size is
+    tracked as entries are written and re-measured from disk every
+    `rescan_every` writes, so other processes sharing the directory are
+    eventually counted. With `bypass` set, lookups are skipped but fresh
+    responses are still stored. A failed write only costs the cache entry.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".llm_cache",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_size_mb: float = 100,
+        bypass: bool = False,
+        rescan_every: int = 1000,
+    ):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_size_mb = max_size_mb
+        self.bypass = bypass
+        self.rescan_every = rescan_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        # Bytes on disk as of the last scan plus what has been written since;
+        # None until the directory is first scanned
+        self._size: Optional[int] = None
+        self._writes_since_scan = 0
+        self._size_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        return cls(
+            directory=os.getenv("LLM_CACHE_DIR", ".llm_cache"),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+            max_size_mb=float(os.getenv("LLM_CACHE_MAX_SIZE_MB", 100)),
+            bypass=os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes"),
+        )
+
+    @staticmethod
+    def make_key(model: str, messages: List[dict], response_format: Type[BaseModel]) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "schema": response_format.model_json_schema(),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str, response_format: Type[T]) -> Optional[T]:
+        if self.bypass:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                os.remove(path)
+                self.misses += 1
+                return None
+            value = response_format.model_validate(entry["value"])
+        except (OSError, ValueError, KeyError, ValidationError):
+            self.misses += 1
+            return None
+        # Touch the file so eviction is least-recently-used; another process
+        # may have evicted it since the read, which doesn't spoil the hit
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: BaseModel) -> None:
+        path = self._path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            # A unique name per write: concurrent sets of the same key (threads
+            # or processes) never share a temp file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{key}.", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"created_at": time.time(), "value": value.model_dump(mode="json")}, f)
+                written = f.tell()
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not write LLM cache entry {key[:12]}: {e}")
+            self.write_errors += 1
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        self._track_write(written - replaced)
+
+    def _track_write(self, added: int) -> None:
+        with self._size_lock:
+            self._writes_since_scan += 1
+            if self._size is not None:
+                self._size += added
+            over = self._size is not None and self._size > self.max_size_mb * 1024 * 1024
+            if self._size is None or over or self._writes_since_scan >= self.rescan_every:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Measure the directory and, past max_size_mb, delete least recently used entries"""
+        entries = []
+        total_size = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        max_size = self.max_size_mb * 1024 * 1024
+        target_size = max_size * 0.9 if total_size > max_size else max_size
+        for _, size, path in sorted(entries):
+            if total_size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            self.evictions += 1
+        self._size = total_size
+        self._writes_since_scan = 0
+
+    def parse(self, client, *, model: str, messages: List[dict], response_format: Type[T]) -> Optional[T]:
+        """Cached wrapper around client.beta.chat.completions.parse, retried on 429/5xx"""
+        key = self.make_key(model, messages, response_format)
+        cached = self.get(key, response_format)
+        if cached is not None:
+            return cached
+
+        def request():
+            with tracer.span("llm_call", model=model, schema=response_format.__name__) as span:
+                response = client.beta.chat.completions.parse(
+                    model=model, messages=messages, response_format=response_format
+                )
+                if response.usage is not None:
+                    span.set(
+                        prompt_tokens=response.usage.prompt_tokens,
+                        completion_tokens=response.usage.completion_tokens,
+                    )
+                return response
+
+        response = resilience.call("llm", request)
+        parsed = response.choices[0].message.parsed
+        if parsed is not None:
+            self.set(key, parsed)
+        return parsed
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (
+            f"LLM cache: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.0f}% hit rate), {self.evictions} evictions"
+        )
+
+
+llm_cache = LLMCache.from_env()
@@ -1,168 +1,481 @@
 # main.py
+import argparse
 import asyncio
-from enum import Enum
 import json
 from datetime import date
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Optional
 from pydantic import BaseModel
-from typing import List, Optional
-
-class FundRaiseStages(Enum):
-    SEED = "Seed"
-    SERIES_A = "Series A"
-    SERIES_B = "Series B"
-    SERIES_C = "Series C"
-    SERIES_D = "Series D"
-    SERIES_E = "Series E"
-    SERIES_F = "Series F"
-    PRE_SEED = "Pre-Seed"
-    GROWTH = "Growth"
-    ANGEL = "Angel"
-    DEBT = "Debt"
-    NOT_AVAILABLE = "Not Available"
-
-    def __str__(self):
-        return self.value
-
-
-class FundingDetails(BaseModel):
-    company_name: str
-    amount_raised_usd: Optional[float]
-    investors: List[str]
-    industry_sector: str
-    funding_stage: FundRaiseStages
-    # valuation_usd: Optional[float]
-    source: Optional[List[str]]
-
-    class Config:
-        json_encoders = {FundRaiseStages: lambda v: v.value}
-
-
-class FundingDetailsList(BaseModel):
-    funding_companies_list: List[FundingDetails]
-
-    # def __iter__(self):
-    #     return iter(self.root)
-
-    # def __getitem__(self, item):
-    #     return self.root[item]
-
-    class Config:
-        json_encoders = {FundRaiseStages: lambda v: v.value}
-
-
-async def run_selenium_scraper(inc42_url: str, entrackr_url: str):
-    print("Starting Selenium scraper...")
-    try:
-        # Run funding.py as a subprocess
-        process = await asyncio.create_subprocess_exec(
+from jsonl_store import JsonLinesWriter
+from cli import add_pipeline_arguments
+from llm_cache import llm_cache
+from pipeline import Pipeline, Stage, StageError
+from resilience import resilience
+from resources import resources
+from tracing import tracer
+from models import AdditionalFundingDetailsList, FinalFundingDataList, FundingDetailsList
+from validate_and_upload import (
+    TURSO_AUTH_TOKEN,
+    TURSO_URL,
+    combine_funding_data,
+    fetch_enriched_companies,
+    insert_weekly_data,
+    migrate_turso_schema,
+)
+from week_diff import RoundDelta, diff_week
+from name_index import CompanyNameIndex
+from scheduler import AdaptiveBatchScheduler, BatchResult, BatchSizeController, SchedulerProgress, TokenBucket
+
+# Batch starts allowed per minute for each host the browser agent hits.
+# The agent is mostly throttled by Google search captchas.
+AGENT_RATE_LIMITS = {"www.google.com": 2.0}
+
+
+async def run_agent_batch(batch: List[List[str]]) -> list:
+    """Run agent.py for one batch and return the enriched companies"""
+    process = await asyncio.create_subprocess_exec(
+        "python3",
+        "agent.py",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    batch_json = json.dumps(batch) + "\n"
+    stdout, stderr = await process.communicate(batch_json.encode())
+
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode().strip() or f"agent.py exited with {process.returncode}")
+
+    # agent.py prints the structured result as its last line
+    output_lines = stdout.decode().strip().splitlines()
+    if not output_lines:
+        return []
+    return json.loads(output_lines[-1]).get("companies", [])
+
+
+class AgentWorkerClient:
+    """Talks to a long-lived `agent.py --worker` process over its stdin/stdout.
+
+    The worker keeps one Chromium and a pool of browser contexts warm, so
+    batches no longer pay for an interpreter start, imports and a browser
+    cold start each. If the worker dies, the batches in flight fail and the
+    next request starts a new one.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        max_tasks_per_context: int = 10,
+        max_rss_mb: Optional[float] = None,
+        close_timeout: float = 30,
+    ):
+        self.pool_size = pool_size
+        self.max_tasks_per_context = max_tasks_per_context
+        self.max_rss_mb = max_rss_mb
+        self.close_timeout = close_timeout
+        self.process = None
+        self.reader_task = None
+        self.ready = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.next_id = 0
+        self.start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        args = [
+            "agent.py", "--worker",
+            "--pool-size", str(self.pool_size),
+            "--max-tasks-per-context", str(self.max_tasks_per_context),
+        ]
+        if self.max_rss_mb is not None:
+            args += ["--max-rss-mb", str(self.max_rss_mb)]
+        self.process = await asyncio.create_subprocess_exec(
             "python3",
-            "funding.py",
+            *args,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+            limit=2**20,
         )
+        self.ready = asyncio.get_running_loop().create_future()
+        self.reader_task = asyncio.create_task(self._read_responses())
+        await self.ready
+
+    async def _read_responses(self) -> None:
+        process = self.process
+        try:
+            while line := await process.stdout.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    # Anything else on stdout is worker logging
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                if message.get("ready") and not self.ready.done():
+                    self.ready.set_result(True)
+                future = self.pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message.get("companies", []))
+        finally:
+            error = RuntimeError("agent worker exited")
+            if not self.ready.done():
+                self.ready.set_exception(error)
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+            # The next request starts a fresh worker
+            if self.process is process:
+                self.process = None
+
+    async def run_batch(self, batch: List[List[str]]) -> list:
+        return await self._request({"batch": batch})
+
+    async def ping(self) -> list:
+        return await self._request({"ping": True})
+
+    async def _request(self, request: dict) -> list:
+        async with self.start_lock:
+            if self.process is not None and self.process.returncode is not None:
+                # Let the old reader fail its batches before starting over
+                await self.reader_task
+            if self.process is None:
+                await self.start()
+            process = self.process
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            process.stdin.write((json.dumps({"id": request_id, **request}) + "\n").encode())
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.pending.pop(request_id, None)
+            raise RuntimeError("agent worker exited") from e
+        return await future
+
+    async def close(self) -> None:
+        process = self.process
+        if process is None:
+            return
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), self.close_timeout)
+        except asyncio.TimeoutError:
+            print(f"Agent worker did not exit within {self.close_timeout:.0f}s, killing it")
+            process.kill()
+            await process.wait()
+        await self.reader_task
+        self.process = None
+
+
+def returned_companies(batch: List[List[str]], result: list) -> List[List[str]]:
+    """Companies of `batch` the agent returned, matching names loosely"""
+    index = CompanyNameIndex(company[0] for company in batch)
+    returned = set()
+    for company in result or []:
+        name = company.get("company_name") if isinstance(company, dict) else None
+        if name:
+            match = index.match(name)
+            if match.name is not None and not match.ambiguous:
+                returned.add(match.name)
+    return [company for company in batch if company[0] in returned]
+
+
+async def execute_batches(
+    company_list: List[List[str]],
+    batch_size: int = 5,
+    concurrency: int = 2,
+    rate_limits: Optional[Dict[str, float]] = None,
+    run_batch: Optional[Callable[[List[List[str]]], Awaitable[list]]] = None,
+    output_file: Optional[str] = None,
+    results: Optional[list] = None,
+    min_batch_size: int = 1,
+    max_batch_size: int = 20,
+    max_attempts: int = 3,
+) -> SchedulerProgress:
+    """Enrich companies in batches through a bounded pool of agent workers.
+
+    Batches start at `batch_size` companies and a BatchSizeController grows
+    or shrinks them within [min_batch_size, max_batch_size] depending on how
+    many requested companies the agent returns. Companies missing from a
+    batch's result are queued again, up to `max_attempts` tries each.
+    `rate_limits` maps host -> batch starts per minute. Results are appended
+    to the `output_file` JSON Lines file, and to `results` when given, in
+    batch order; a requeued company is written with the batch that retried it.
+    Without `run_batch`, batches go to a persistent agent worker whose
+    browser context pool has one context per concurrent batch; pass
+    `run_agent_batch` for the old process-per-batch model.
+    """
+    if rate_limits is None:
+        rate_limits = AGENT_RATE_LIMITS
+    if output_file is None:
+        output_file = f"extended_funding_data_{date.today()}.jsonl"
+    writer = JsonLinesWriter(output_file)
+    writer.truncate()
+
+    controller = BatchSizeController(initial=batch_size, minimum=min_batch_size, maximum=max_batch_size)
+
+    async def on_result(outcome: BatchResult, is_last_batch: bool) -> None:
+        if outcome.ok:
+            returned = len(outcome.batch) - len(outcome.missing)
+            print(
+                f"\nCompleted batch {outcome.index + 1} in {outcome.elapsed:.1f}s: "
+                f"{returned}/{len(outcome.batch)} companies, next batch size {controller.size}"
+            )
+            writer.append(outcome.result)
+            if results is not None:
+                results.extend(outcome.result)
+        else:
+            print(f"Error in batch {outcome.index + 1}:", outcome.error)
+
+    worker = None
+    if run_batch is None:
+        worker = AgentWorkerClient(pool_size=concurrency)
+        run_batch = worker.run_batch
+
+    scheduler = AdaptiveBatchScheduler(
+        run_batch=run_batch,
+        match_returned=returned_companies,
+        controller=controller,
+        max_attempts=max_attempts,
+        concurrency=concurrency,
+        rate_limits={
+            host: TokenBucket(rate=per_minute / 60, capacity=1)
+            for host, per_minute in rate_limits.items()
+        },
+        on_result=on_result,
+        on_progress=lambda progress: print(f"Progress: {progress}"),
+    )
 
-        # Prepare input data
-        input_data = (
-            json.dumps({"inc42_url": inc42_url, "entrackr_url": entrackr_url}) + "\n"
-        )  # Add newline for proper input reading
-
-        # Send URLs to the subprocess
-        stdout, stderr = await process.communicate(input_data.encode())
-
-        if stderr:
-            print("Error in selenium scraper:", stderr.decode())
-            return None
+    try:
+        await scheduler.run(company_list)
+    except Exception as e:
+        print(f"An Error Occurred While Processing Startup Data: {e}")
+    finally:
+        if worker:
+            await worker.close()
+        if scheduler.dropped:
+            print(f"Gave up on {len(scheduler.dropped)} companies after {max_attempts} attempts: "
+                  f"{', '.join(company[0] for company in scheduler.dropped)}")
+        print("\nAll batches completed. Results saved.\n")
+    return scheduler.progress
 
-        if stdout:
-            return json.loads(stdout.decode())
 
-    except Exception as e:
-        print(f"Error running selenium scraper: {e}")
-        return None
+# Used to estimate agent time saved when nothing was enriched this run
+DEFAULT_AGENT_SECONDS_PER_COMPANY = 60.0
 
 
-async def execute_batches(company_list: List[List[str]], batch_size: int = 5):
-    # filename = f"funding-report-{date.today().isoformat()}.json"
+async def enrich_companies(
+    company_list: List[List[str]],
+    max_age_days: float = 90,
+    output_file: Optional[str] = None,
+    results: Optional[list] = None,
+    **batch_options,
+) -> SchedulerProgress:
+    """Enrich only companies that are missing or stale in Turso.
 
-    # # Initialize output file
-    # with open(filename, "w") as f:
-    #     f.write("[\n")
+    Companies enriched within `max_age_days` are taken from the companies
+    table and appended to the output file next to the agent's results, so
+    validate_and_upload joins them the same way.
+    """
+    if output_file is None:
+        output_file = f"extended_funding_data_{date.today()}.jsonl"
 
+    enriched = {}
     try:
-        total_batches = (len(company_list) + batch_size - 1) // batch_size
-        for i in range(0, len(company_list), batch_size):
-            batch = company_list[i : i + batch_size]
-            is_last_batch = (i + batch_size) >= len(company_list)
-            is_first_batch = i == 0
-            print(f"\nProcessing batch {(i//batch_size) + 1}/{total_batches}")
-            print("-" * 50)  # Separator line
-
-            process = await asyncio.create_subprocess_exec(
-                "python3",
-                "agent.py",
-                str(is_last_batch),
-                str(is_first_batch),
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+        client = resources.libsql(TURSO_URL, TURSO_AUTH_TOKEN)
+        await migrate_turso_schema(client)
+        enriched = await fetch_enriched_companies(
+            client, [company[0] for company in company_list], max_age_days
+        )
+    except Exception as e:
+        print(f"Could not load enriched companies, enriching all: {e}")
+
+    pending = [company for company in company_list if company[0] not in enriched]
+    progress = await execute_batches(pending, output_file=output_file, results=results, **batch_options)
+    JsonLinesWriter(output_file).append(enriched.values())
+    if results is not None:
+        results.extend(company.model_dump(mode="json") for company in enriched.values())
+
+    if pending and progress.busy_seconds:
+        seconds_per_company = progress.busy_seconds / len(pending)
+    else:
+        seconds_per_company = DEFAULT_AGENT_SECONDS_PER_COMPANY
+    print(
+        f"Reused {len(enriched)}/{len(company_list)} enriched companies, "
+        f"~{len(enriched) * seconds_per_company:,.0f} agent-seconds saved "
+        f"({seconds_per_company:.1f}s per company)"
+    )
+    return progress
+
+
+def enrichment_inputs(funding_data: FundingDetailsList) -> List[List[str]]:
+    """[name, sector, stage] rows the agent enriches"""
+    return [
+        [company.company_name, company.industry_sector, company.funding_stage.value]
+        for company in funding_data.funding_companies_list
+    ]
+
+
+class ScrapedReports(BaseModel):
+    inc42_url: str
+    inc42_html: str
+    entrackr_url: str
+    entrackr_html: str
+    # The week the run is for, fixed when the reports are scraped so a run
+    # resumed on a later day still files its rounds under the same date
+    snapshot_date: Optional[str] = None
+
+
+class UploadResult(BaseModel):
+    snapshot_date: str
+    saved: int
+    # Rounds the diff stage found unchanged or already stored in an adjacent week
+    skipped: int = 0
+    failed_companies: List[str] = []
+
+
+def build_pipeline(
+    inc42_url: str,
+    entrackr_url: str,
+    snapshot_date: Optional[str] = None,
+    batch_size: int = 5,
+    concurrency: int = 2,
+    max_batch_size: int = 20,
+    checkpoint_dir: Optional[str] = None,
+) -> Pipeline:
+    """scrape -> extract -> enrich -> merge -> diff -> upload, all in this process.
+
+    snapshot_date (today by default) is saved with the scrape checkpoint;
+    a resumed run uses the date stored there.
+    """
+    if snapshot_date is None:
+        snapshot_date = str(date.today())
+
+    def run_date(scrape: ScrapedReports) -> str:
+        # Checkpoints written before snapshot_date was stored have none
+        return scrape.snapshot_date or snapshot_date
+
+    async def scrape() -> ScrapedReports:
+        from funding import FIREFOX_PATH, FIREFOX_PROFILE_PATH, ContentExtractor
+
+        extractor = ContentExtractor(FIREFOX_PATH, FIREFOX_PROFILE_PATH)
+        try:
+            pages = await extractor.fetcher.fetch_all([inc42_url, entrackr_url])
+            inc42_html, entrackr_html = [
+                extractor.prepare_content(page.url, page.extractor, page.html, reduce=False)
+                for page in pages
+            ]
+        finally:
+            await asyncio.to_thread(extractor.close)
+        return ScrapedReports(
+            inc42_url=inc42_url,
+            inc42_html=inc42_html,
+            entrackr_url=entrackr_url,
+            entrackr_html=entrackr_html,
+            snapshot_date=snapshot_date,
+        )
 
-            batch_json = json.dumps(batch) + "\n"
-            stdout, stderr = await process.communicate(batch_json.encode())
+    async def extract(scrape: ScrapedReports) -> FundingDetailsList:
+        from funding import ContentExtractor, extract_funding_data
+
+        return await asyncio.to_thread(
+            extract_funding_data,
+            ContentExtractor(),
+            scrape.inc42_url,
+            scrape.inc42_html,
+            scrape.entrackr_url,
+            scrape.entrackr_html,
+            run_date(scrape),
+        )
 
-            if stderr:
-                print(f"Error in batch {(i//batch_size) + 1}:", stderr.decode())
-                continue
+    async def enrich(extract: FundingDetailsList) -> AdditionalFundingDetailsList:
+        from agent import InProcessAgent
+
+        companies = []
+        async with InProcessAgent(pool_size=concurrency) as agent:
+            await enrich_companies(
+                enrichment_inputs(extract),
+                results=companies,
+                batch_size=batch_size,
+                max_batch_size=max_batch_size,
+                concurrency=concurrency,
+                run_batch=agent.run_batch,
+            )
+        return AdditionalFundingDetailsList(companies=companies)
+
+    async def merge(extract: FundingDetailsList, enrich: AdditionalFundingDetailsList) -> FinalFundingDataList:
+        return combine_funding_data(extract, enrich)
+
+    async def diff(scrape: ScrapedReports, merge: FinalFundingDataList) -> RoundDelta:
+        client = resources.libsql(TURSO_URL, TURSO_AUTH_TOKEN)
+        await migrate_turso_schema(client)
+        delta = await diff_week(client, merge, run_date(scrape))
+        print(delta.summary())
+        return delta
+
+    async def upload(diff: RoundDelta) -> UploadResult:
+        client = resources.libsql(TURSO_URL, TURSO_AUTH_TOKEN)
+        changed = diff.upload
+        failed_companies = await insert_weekly_data(client, changed, diff.snapshot_date)
+        if failed_companies:
+            print(f"Failed to save {len(failed_companies)} companies: {', '.join(failed_companies)}")
+        return UploadResult(
+            snapshot_date=diff.snapshot_date,
+            saved=len(changed.companies) - len(failed_companies),
+            skipped=len(diff.unchanged) + len(diff.duplicates),
+            failed_companies=failed_companies,
+        )
 
-            output_data = stdout.decode().strip()
-            print(output_data)
-            print(f"\nCompleted batch {(i//batch_size) + 1}")
-            print(f"Waiting 10 seconds before next batch...")
-            await asyncio.sleep(30)
-    except Exception as e:
-        print(f"An Error Occurred While Processing Startup Data: {e}")
+    return Pipeline(
+        [
+            Stage("scrape", scrape, ScrapedReports),
+            Stage("extract", extract, FundingDetailsList, depends_on=("scrape",)),
+            Stage("enrich", enrich, AdditionalFundingDetailsList, depends_on=("extract",)),
+            Stage("merge", merge, FinalFundingDataList, depends_on=("extract", "enrich")),
+            # Not checkpointed: it must see what is in the database right now
+            Stage("diff", diff, RoundDelta, depends_on=("scrape", "merge"), checkpoint=False),
+            Stage("upload", upload, UploadResult, depends_on=("diff",)),
+        ],
+        checkpoint_dir=checkpoint_dir,
+    )
+
+
+async def run_pipeline(args: argparse.Namespace) -> None:
+    pipeline = build_pipeline(
+        args.inc42_url,
+        args.entrackr_url,
+        batch_size=args.batch_size,
+        max_batch_size=args.max_batch_size,
+        concurrency=args.concurrency,
+        checkpoint_dir=None if args.no_checkpoint else args.checkpoint_dir,
+    )
+    try:
+        result = await pipeline.run(args.run_id, resume=not args.no_resume)
+        print(result.summary())
+    except StageError as e:
+        print(e)
+        print(e.result.summary())
+        if pipeline.checkpoint_dir:
+            print(f"Finished stages are checkpointed; re-run with --run-id {args.run_id} to resume")
     finally:
-        # with open(filename, "a") as f:
-        #     f.write("\n]")
-        print("\nAll batches completed. Results saved.\n")
+        await resources.aclose()
+        resources.close()
+        print(llm_cache.summary())
+        print(resilience.summary())
+        if tracer.enabled:
+            print(f"Trace {tracer.run_id} written to {tracer.output_file}")
+            print(tracer.summary())
 
 
 async def main():
-    # Get URLs from user
-    inc42_url = "https://inc42.com/buzz/from-tonetag-to-borderplus-indian-startups-raised-270-mn-this-week/"
-    entrackr_url = "https://entrackr.com/report/weekly-funding-report/funding-and-acquisitions-in-indian-startup-this-week-feb-10-feb-15-8723898"
-
-    # Run the selenium scraper with the URLs
-    await run_selenium_scraper(inc42_url, entrackr_url)
-    # with open(f"basic_funding_data_{date.today()}.json", "r") as f:
-    #     json_data = json.load(f)
-
-    #     # Parse back into Pydantic model
-    #     funding_data = FundingDetailsList.model_validate(json_data)
-    #     f.close()
-    
-    # if not funding_data:
-    #     print("Failed to get initial funding data")
-    #     return
-
-
-
-    # company_list : list[list[str]] = [
-    #     [company.company_name, company.industry_sector, company.funding_stage.value]
-    #     for company in funding_data.funding_companies_list
-    # ]
-    # print(len(company_list))
-    # company_list = [
-    #     ["Cashfree Payments", "Fintech", "FundRaiseStages.SERIES_C"],
-    #     ["Captain Fresh", "Ecommerce", "FundRaiseStages.NOT_AVAILABLE"],
-    #     ["TrueFoundry", "Enterprisetech", "FundRaiseStages.SERIES_A"],
-    #     ["HairOriginals", "Ecommerce", "FundRaiseStages.SERIES_A"],
-    #     ["Shadowfax", "Logistics", "FundRaiseStages.SERIES_F"],
-    #     ["Nua", "Ecommerce", "FundRaiseStages.PRE_SEED"],
-    # ]
-    # await execute_batches(company_list, batch_size=4)
+    parser = argparse.ArgumentParser(description="Scrape, enrich and upload this week's funding rounds")
+    add_pipeline_arguments(parser)
+    await run_pipeline(parser.parse_args())
 
 
 if __name__ == "__main__":
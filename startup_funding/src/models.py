@@ -0,0 +1,109 @@
+# models.py
+# Data models shared by every stage. Only pydantic and the standard library
+# are imported here so loading them stays cheap.
+from enum import Enum
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class FundRaiseStages(Enum):
+    SEED = "Seed"
+    SERIES_A = "Series A"
+    SERIES_B = "Series B"
+    SERIES_C = "Series C"
+    SERIES_D = "Series D"
+    SERIES_E = "Series E"
+    SERIES_F = "Series F"
+    PRE_SEED = "Pre-Seed"
+    GROWTH = "Growth"
+    ANGEL = "Angel"
+    DEBT = "Debt"
+    NOT_AVAILABLE = "Not Available"
+
+    def __str__(self):
+        return self.value
+
+
+# normalize.UNIT_VALUES codes; None means whole currency units
+AmountUnit = Literal["K", "Lakh", "Mn", "Cr", "Bn"]
+
+
+class ExtractedRound(BaseModel):
+    """One round as the LLM reads it: the amount as written, never converted"""
+    company_name: str
+    amount: Optional[float] = Field(description="Number as written in the report, e.g. 4.5 for INR 4.5 Cr")
+    currency: Optional[str] = Field(description="ISO code of the amount's currency, e.g. INR or USD")
+    amount_unit: Optional[AmountUnit] = Field(description="Unit written after the number; null if none")
+    investors: List[str]
+    industry_sector: str
+    funding_stage: FundRaiseStages
+    source: Optional[List[str]]
+
+
+class ExtractedRoundList(BaseModel):
+    funding_companies_list: List[ExtractedRound]
+
+
+class FundingDetails(BaseModel):
+    company_name: str
+    amount_raised_usd: Optional[float]
+    investors: List[str]
+    industry_sector: str
+    funding_stage: FundRaiseStages
+    source: Optional[List[str]]
+    # Amount as reported; fx.normalize_amounts derives amount_raised_usd from it
+    amount_raw: Optional[float] = None
+    amount_currency: Optional[str] = None
+    amount_unit: Optional[AmountUnit] = None
+    # Units of amount_currency per USD used for amount_raised_usd
+    fx_rate: Optional[float] = None
+
+    class Config:
+        json_encoders = {FundRaiseStages: lambda v: v.value}
+
+
+class FundingDetailsList(BaseModel):
+    funding_companies_list: List[FundingDetails]
+
+    class Config:
+        json_encoders = {FundRaiseStages: lambda v: v.value}
+
+
+class FinalFundingDetails(BaseModel):
+    company_name: str
+    amount_raised_usd: Optional[float] = None
+    investors: List[str] = []
+    industry_sector: str
+    funding_stage: FundRaiseStages
+    valuation_usd: Optional[float] = None
+    source: Optional[List[str]] = None
+    website: Optional[str] = None
+    linkedin: Optional[str] = None
+    brief_summary: Optional[str] = None
+    enriched_at: Optional[str] = None
+    amount_raw: Optional[float] = None
+    amount_currency: Optional[str] = None
+    amount_unit: Optional[AmountUnit] = None
+    fx_rate: Optional[float] = None
+
+    class Config:
+        json_encoders = {FundRaiseStages: lambda v: v.value}
+
+
+class FinalFundingDataList(BaseModel):
+    companies: List[FinalFundingDetails]
+
+
+class FundingDetailsAdditionalFields(BaseModel):
+    company_name: str
+    website: str
+    linkedin: str
+    brief_summary: Optional[str]
+    valuation_usd: Optional[float] = None
+    # Set on records reused from the companies table instead of the agent
+    enriched_at: Optional[str] = None
+
+
+class AdditionalFundingDetailsList(BaseModel):
+    companies: List[FundingDetailsAdditionalFields]
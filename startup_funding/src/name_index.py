@@ -0,0 +1,145 @@
+# name_index.py
+import heapq
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set
+
+# Minimum similarity (0-1) for a fuzzy match. Overridable via COMPANY_MATCH_THRESHOLD.
+DEFAULT_MATCH_THRESHOLD = float(os.getenv("COMPANY_MATCH_THRESHOLD", 0.88))
+# A runner-up this close to the best match makes the match ambiguous
+AMBIGUITY_MARGIN = 0.03
+# Candidates re-scored with the edit-distance ratio, per query
+MAX_CANDIDATES = 20
+
+LEGAL_SUFFIXES = re.compile(
+    r"(\s+(private\s+limited|pvt\.?\s*ltd\.?|limited|ltd\.?|inc\.?|llp|corp\.?))+$"
+)
+# "Vahan.ai", "Nua.in" -> "Vahan", "Nua"
+DOMAIN_SUFFIX = re.compile(r"\.(ai|in|com|io|co|app|so|xyz)$")
+
+
+def name_key(name: str) -> str:
+    """Normalized join key: lowercase, legal/domain suffixes dropped, alphanumerics only"""
+    name = name.strip().lower()
+    name = LEGAL_SUFFIXES.sub("", name)
+    name = DOMAIN_SUFFIX.sub("", name)
+    return re.sub(r"[^a-z0-9]+", "", name)
+
+
+def investor_key(name: str) -> str:
+    """Investor join key: lowercase alphanumerics, "&" read as "and".
+
+    Unlike name_key, legal and domain suffixes are kept, so "Accel" and
+    "Accel.in" or a fund and its "... LLP" vehicle stay separate investors.
+    """
+    name = name.strip().lower().replace("&", " and ")
+    return re.sub(r"[^a-z0-9]+", "", name)
+
+
+def ngrams(key: str, n: int = 3) -> Set[str]:
+    padded = f"${key}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+@dataclass
+class NameMatch:
+    query: str
+    name: Optional[str]
+    score: float
+    exact: bool = False
+    # Other names scoring within AMBIGUITY_MARGIN of the best one
+    alternatives: List[str] = field(default_factory=list)
+
+    @property
+    def ambiguous(self) -> bool:
+        return bool(self.alternatives)
+
+
+class CompanyNameIndex:
+    """Company-name lookup tolerant to spelling and suffix differences.
+
+    Exact normalized keys are a dict lookup. Otherwise candidates sharing the
+    most trigrams are pulled from an inverted index and re-scored with an
+    edit-distance ratio, so a lookup never compares against every name.
+    """
+
+    def __init__(self, names: Iterable[str] = (), threshold: float = DEFAULT_MATCH_THRESHOLD, n: int = 3):
+        self.threshold = threshold
+        self.n = n
+        self.names_by_key: Dict[str, List[str]] = {}
+        self.postings: Dict[str, List[str]] = defaultdict(list)
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names_by_key)
+
+    def add(self, name: str) -> None:
+        key = name_key(name)
+        if not key:
+            return
+        if key in self.names_by_key:
+            if name not in self.names_by_key[key]:
+                self.names_by_key[key].append(name)
+            return
+        self.names_by_key[key] = [name]
+        for gram in ngrams(key, self.n):
+            self.postings[gram].append(key)
+
+    def match(self, query: str) -> NameMatch:
+        key = name_key(query)
+        if key in self.names_by_key:
+            names = self.names_by_key[key]
+            return NameMatch(query=query, name=names[0], score=1.0, exact=True, alternatives=names[1:])
+
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in ngrams(key, self.n):
+            for candidate in self.postings.get(gram, ()):
+                shared[candidate] += 1
+
+        scored = []
+        for candidate in heapq.nlargest(MAX_CANDIDATES, shared, key=shared.get):
+            # Upper bound of the ratio from lengths alone
+            if 2 * min(len(key), len(candidate)) / (len(key) + len(candidate)) < self.threshold:
+                continue
+            score = SequenceMatcher(None, key, candidate).ratio()
+            if score >= self.threshold:
+                scored.append((score, candidate))
+
+        if not scored:
+            return NameMatch(query=query, name=None, score=0.0)
+
+        scored.sort(reverse=True)
+        best_score, best_key = scored[0]
+        alternatives = [
+            self.names_by_key[candidate][0]
+            for score, candidate in scored[1:]
+            if best_score - score <= AMBIGUITY_MARGIN
+        ]
+        alternatives += self.names_by_key[best_key][1:]
+        return NameMatch(
+            query=query,
+            name=self.names_by_key[best_key][0],
+            score=best_score,
+            alternatives=alternatives,
+        )
+
+    def resolve(self, queries: Iterable[str], label: str = "") -> Dict[str, str]:
+        """Map each query to its unambiguous match, printing fuzzy and ambiguous ones"""
+        resolved = {}
+        for query in queries:
+            result = self.match(query)
+            if result.name is None:
+                continue
+            if result.ambiguous:
+                print(f"{label}Ambiguous match for {query!r}: {[result.name] + result.alternatives}")
+                continue
+            if not result.exact:
+                print(f"{label}Fuzzy match {query!r} -> {result.name!r} ({result.score:.2f})")
+            resolved[query] = result.name
+        return resolved
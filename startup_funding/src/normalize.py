@@ -0,0 +1,151 @@
+# normalize.py
+import os
+import re
+from typing import Optional
+
+# INR per USD for rupee amounts the dated FX table (fx.py) can't price, and
+# for to_usd() callers that pass no rate. Overridable via INR_PER_USD.
+DEFAULT_INR_PER_USD = 86.8
+INR_PER_USD = float(os.getenv("INR_PER_USD", DEFAULT_INR_PER_USD))
+
+UNIT_MULTIPLIERS = {
+    "k": 1e3,
+    "thousand": 1e3,
+    "lakh": 1e5,
+    "lakhs": 1e5,
+    "lac": 1e5,
+    "l": 1e5,
+    "cr": 1e7,
+    "crore": 1e7,
+    "crores": 1e7,
+    "m": 1e6,
+    "mn": 1e6,
+    "mln": 1e6,
+    "million": 1e6,
+    "b": 1e9,
+    "bn": 1e9,
+    "billion": 1e9,
+}
+# Units that only appear with rupee amounts
+INR_UNITS = {"lakh", "lakhs", "lac", "l", "cr", "crore", "crores"}
+# Canonical unit codes stored with raw amounts (funding_rounds.amount_unit)
+UNIT_VALUES = {"K": 1e3, "Lakh": 1e5, "Mn": 1e6, "Cr": 1e7, "Bn": 1e9}
+UNIT_CODES = {
+    unit: code for unit, multiplier in UNIT_MULTIPLIERS.items() for code, value in UNIT_VALUES.items() if multiplier == value
+}
+
+CURRENCY_CODES = {"$": "USD", "usd": "USD", "us$": "USD", "₹": "INR", "inr": "INR", "rs": "INR", "rs.": "INR"}
+
+UNDISCLOSED_VALUES = {"", "-", "–", "—", "na", "n/a", "nil", "undisclosed", "not disclosed", "not available"}
+
+AMOUNT_PATTERN = re.compile(
+    r"(?P<currency>\$|usd|us\$|₹|inr|rs\.?)?\s*"
+    r"(?P<value>\d+(?:,\d{2,3})*(?:\.\d+)?)\s*"
+    r"(?P<unit>thousand|lakhs?|lac|crores?|cr|million|mln|mn|billion|bn|k|m|b|l)?\b\.?\s*"
+    r"(?P<currency_suffix>usd|inr)?",
+    re.IGNORECASE,
+)
+
+
+def is_undisclosed(text: Optional[str]) -> bool:
+    return text is None or text.strip().lower() in UNDISCLOSED_VALUES
+
+
+def normalize_currency(text: Optional[str]) -> Optional[str]:
+    """ISO code for a currency written as a symbol or code ("₹", "Rs.", "usd")"""
+    if is_undisclosed(text):
+        return None
+    text = text.strip()
+    return CURRENCY_CODES.get(text.lower(), text.upper())
+
+
+def parse_raw_amount(text: Optional[str]):
+    """Parse a report amount such as "$750K", "INR 4.5 Cr" or "₹80 Lakh" as written.
+
+    Returns (number, currency, unit code), e.g. (4.5, "INR", "Cr"), with
+    the unit None for amounts in whole currency units, or None when no
+    amount can be found.
+    """
+    if is_undisclosed(text):
+        return None
+    match = AMOUNT_PATTERN.search(text)
+    if not match:
+        return None
+
+    value = float(match.group("value").replace(",", ""))
+    unit = (match.group("unit") or "").lower()
+    currency = normalize_currency(match.group("currency") or match.group("currency_suffix"))
+    if currency is None:
+        currency = "INR" if unit in INR_UNITS else "USD"
+    return value, currency, UNIT_CODES.get(unit)
+
+
+def parse_amount(text: Optional[str]):
+    """Parse a report amount such as "$750K", "INR 4.5 Cr" or "₹80 Lakh".
+
+    Returns (value, currency, unit) with value in whole currency units, or
+    None when no amount can be found.
+    """
+    parsed = parse_raw_amount(text)
+    if parsed is None:
+        return None
+    value, currency, unit = parsed
+    return value * UNIT_VALUES.get(unit, 1), currency, unit
+
+
+def to_usd(value: float, currency: str, inr_per_usd: Optional[float] = None) -> float:
+    if currency == "INR":
+        return round(value / (inr_per_usd or INR_PER_USD), 2)
+    return value
+
+
+def parse_amount_usd(text: Optional[str], inr_per_usd: Optional[float] = None) -> Optional[float]:
+    parsed = parse_amount(text)
+    if parsed is None:
+        return None
+    value, currency, _ = parsed
+    return to_usd(value, currency, inr_per_usd)
+
+
+# Stage spellings seen in Inc42/Entrackr reports -> FundRaiseStages values
+STAGE_ALIASES = {
+    "seed": "Seed",
+    "seed round": "Seed",
+    "pre seed": "Pre-Seed",
+    "preseed": "Pre-Seed",
+    "angel": "Angel",
+    "angel round": "Angel",
+    "debt": "Debt",
+    "debt financing": "Debt",
+    "venture debt": "Debt",
+    "growth": "Growth",
+    "late stage": "Growth",
+    # Recognised, but no FundRaiseStages value says what they are; guessing
+    # Seed or Growth would put them in the wrong stage rollups
+    "pre series a": "Not Available",
+    "bridge": "Not Available",
+    "pre ipo": "Not Available",
+    "private equity": "Not Available",
+}
+SERIES_PATTERN = re.compile(r"^series\s*([a-f])\d*\b")
+
+
+def normalize_stage(text: Optional[str]) -> Optional[str]:
+    """Map a report stage label to a FundRaiseStages value.
+
+    Returns "Not Available" for blanks and None when the label is not
+    recognised, so callers can tell a missing stage from an unknown one.
+    """
+    if is_undisclosed(text):
+        return "Not Available"
+    key = re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+    if key in STAGE_ALIASES:
+        return STAGE_ALIASES[key]
+    match = SERIES_PATTERN.match(key)
+    if match:
+        return f"Series {match.group(1).upper()}"
+    for alias, stage in STAGE_ALIASES.items():
+        if key.startswith(alias):
+            return stage
+    return None
+
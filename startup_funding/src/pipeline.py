@@ -0,0 +1,154 @@
+# pipeline.py
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from tracing import tracer
+
+
+@dataclass
+class Stage:
+    """One step of the pipeline.
+
+    `run` is called with the outputs of `depends_on` as keyword arguments
+    (named after those stages) and returns an instance of `model`.
+    """
+
+    name: str
+    run: Callable[..., Awaitable[BaseModel]]
+    model: Type[BaseModel]
+    depends_on: Tuple[str, ...] = ()
+    checkpoint: bool = True
+
+
+@dataclass
+class StageTiming:
+    name: str
+    seconds: float
+    resumed: bool = False
+
+
+@dataclass
+class PipelineResult:
+    outputs: Dict[str, BaseModel] = field(default_factory=dict)
+    timings: List[StageTiming] = field(default_factory=list)
+
+    def summary(self) -> str:
+        lines = [
+            f"  {timing.name:<10} {'resumed' if timing.resumed else f'{timing.seconds:8.2f}s'}"
+            for timing in self.timings
+        ]
+        total = sum(timing.seconds for timing in self.timings)
+        return "\n".join(["Stage timings:"] + lines + [f"  {'total':<10} {total:8.2f}s"])
+
+
+class StageError(RuntimeError):
+    def __init__(self, stage: str, error: BaseException, result: PipelineResult):
+        super().__init__(f"Stage {stage!r} failed: {error}")
+        self.stage = stage
+        self.error = error
+        self.result = result
+
+
+class Pipeline:
+    """In-process DAG of stages passing Pydantic models in memory.
+
+    Stages whose dependencies are done run concurrently. With a
+    `checkpoint_dir`, each finished stage is saved as
+    `<checkpoint_dir>/<run_id>/<stage>.json`; running the same run_id again
+    loads those instead of re-running the stages, so a failed run resumes
+    from the first stage that did not finish. Stages downstream of one that
+    actually ran are always re-run.
+    """
+
+    def __init__(self, stages: Sequence[Stage], checkpoint_dir: Optional[str] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        for stage in stages:
+            missing = [name for name in stage.depends_on if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stages {missing}")
+        self.checkpoint_dir = checkpoint_dir
+        self.waves = self._waves()
+
+    def _waves(self) -> List[List[Stage]]:
+        done = set()
+        waves = []
+        remaining = dict(self.stages)
+        while remaining:
+            wave = [stage for stage in remaining.values() if done.issuperset(stage.depends_on)]
+            if not wave:
+                raise ValueError(f"Stages {sorted(remaining)} form a cycle")
+            for stage in wave:
+                del remaining[stage.name]
+            done.update(stage.name for stage in wave)
+            waves.append(wave)
+        return waves
+
+    def checkpoint_path(self, run_id: str, stage: Stage) -> Optional[str]:
+        if not self.checkpoint_dir or not stage.checkpoint:
+            return None
+        return os.path.join(self.checkpoint_dir, run_id, f"{stage.name}.json")
+
+    def load_checkpoint(self, run_id: str, stage: Stage) -> Optional[BaseModel]:
+        path = self.checkpoint_path(run_id, stage)
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return stage.model.model_validate_json(f.read())
+        except (OSError, ValidationError):
+            return None
+
+    def save_checkpoint(self, run_id: str, stage: Stage, output: BaseModel) -> None:
+        path = self.checkpoint_path(run_id, stage)
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(output.model_dump_json())
+        os.replace(tmp_path, path)
+
+    async def _run_stage(self, run_id: str, stage: Stage, result: PipelineResult, resume: bool) -> None:
+        # A checkpoint is stale once anything upstream of it was recomputed
+        fresh_inputs = any(
+            not timing.resumed for timing in result.timings if timing.name in stage.depends_on
+        )
+        if resume and not fresh_inputs:
+            output = self.load_checkpoint(run_id, stage)
+            if output is not None:
+                result.outputs[stage.name] = output
+                result.timings.append(StageTiming(stage.name, 0.0, resumed=True))
+                return
+
+        inputs = {name: result.outputs[name] for name in stage.depends_on}
+        start = time.perf_counter()
+        with tracer.span(f"stage.{stage.name}", stage=stage.name):
+            output = await stage.run(**inputs)
+        elapsed = time.perf_counter() - start
+        if not isinstance(output, stage.model):
+            # Stages may return an equivalent model from another module
+            if isinstance(output, BaseModel):
+                output = output.model_dump(mode="json")
+            output = stage.model.model_validate(output)
+        self.save_checkpoint(run_id, stage, output)
+        result.outputs[stage.name] = output
+        result.timings.append(StageTiming(stage.name, elapsed))
+
+    async def run(self, run_id: str, resume: bool = True) -> PipelineResult:
+        result = PipelineResult()
+        for wave in self.waves:
+            errors = await asyncio.gather(
+                *(self._run_stage(run_id, stage, result, resume) for stage in wave),
+                return_exceptions=True,
+            )
+            for stage, error in zip(wave, errors):
+                if isinstance(error, BaseException):
+                    raise StageError(stage.name, error, result) from error
+        return result
@@ -0,0 +1,330 @@
+# replica.py
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from resilience import resilience
+
+if TYPE_CHECKING:
+    from libsql_client import Client, ResultSet
+
+# Tables copied from the remote on pull, parents first
+REPLICATED_TABLES = ["companies", "funding_rounds", "latest_round", "investors", "round_investors", "round_sources"]
+
+REPLICA_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS _replica_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch_id TEXT NOT NULL,
+        sql TEXT NOT NULL,
+        args TEXT NOT NULL,
+        queued_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    "CREATE TABLE IF NOT EXISTS _replica_meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+READ_STATEMENTS = ("select", "with", "pragma", "explain")
+SCHEMA_STATEMENTS = ("create", "alter", "drop")
+
+
+def statement_parts(stmt, args=None) -> Tuple[str, Union[list, dict]]:
+    """(sql, args) of a Statement, plain SQL or (sql, args) tuple"""
+    if isinstance(stmt, str):
+        sql = stmt
+    elif isinstance(stmt, tuple):
+        sql, args = stmt[0], stmt[1] if len(stmt) > 1 else None
+    else:
+        sql, args = stmt.sql, stmt.args
+    return sql, args if isinstance(args, dict) else list(args or [])
+
+
+def statement_kind(sql: str) -> str:
+    verb = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ""
+    if verb in READ_STATEMENTS:
+        return "read"
+    if verb in SCHEMA_STATEMENTS:
+        return "schema"
+    return "write"
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@dataclass
+class SyncResult:
+    pushed_batches: int = 0
+    pushed_statements: int = 0
+    pulled_rows: Dict[str, int] = field(default_factory=dict)
+    queued: int = 0
+
+    def __str__(self):
+        text = f"Pushed {self.pushed_statements} statements in {self.pushed_batches} batches"
+        if self.pulled_rows:
+            text += f", pulled {sum(self.pulled_rows.values())} rows"
+        if self.queued:
+            text += f", {self.queued} statements still queued"
+        return text
+
+
+class ReplicaClient:
+    """libsql client that serves a local SQLite file and queues writes for the remote.
+
+    Reads run against the local replica. Each write, or batch of writes, is
+    applied locally and recorded in _replica_outbox in the same transaction,
+    and `push` replays the outbox on the remote in bulk, one remote batch per
+    `push_batch_statements` statements and never splitting a local batch.
+    Schema statements (and batches containing them) stay local: the remote
+    schema is created and migrated by `push` itself, so one-off migration
+    backfills are not replayed on top of the remote's own.
+
+    Online, a replica that was never pulled copies the remote on first use
+    and `close` pushes whatever is queued. With `offline=True` the remote is
+    never contacted; writes wait in the outbox for `cli.py sync`. Company
+    and round ids are generated client-side, so replayed rows keep the ids
+    they have locally.
+
+    The first pull copies every replicated table, so a one-off run is slower
+    than going straight to the remote. In bench_replica.py (840 stored
+    rounds, 40ms per round trip) the first pull takes ~850ms and the whole
+    replica run ~1100-1200ms, against ~400-520ms direct. Later runs on the
+    same replica save ~150-180ms each, so it breaks even after 5-6 runs.
+    With 10ms round trips it takes ~10. The pull grows with the remote;
+    the saving grows with the number of reads per run.
+    """
+
+    def __init__(
+        self,
+        local: Client,
+        remote_url: Optional[str] = None,
+        auth_token: Optional[str] = None,
+        offline: bool = False,
+        remote: Optional[Client] = None,
+        push_batch_statements: int = 500,
+        pull_page_size: int = 5000,
+    ):
+        self.local = local
+        self.remote_url = remote_url
+        self.auth_token = auth_token
+        self.offline = offline
+        self.push_batch_statements = push_batch_statements
+        self.pull_page_size = pull_page_size
+        self._remote = remote
+        self._ready = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def remote(self) -> Client:
+        if self.offline:
+            raise RuntimeError("Replica is offline; run `cli.py sync` to reach the remote database")
+        if self._remote is None:
+            import libsql_client
+
+            self._remote = libsql_client.create_client(url=self.remote_url, auth_token=self.auth_token)
+        return self._remote
+
+    async def ensure_ready(self) -> None:
+        """Create the local schema, and pull the remote into a never-synced replica"""
+        if self._ready:
+            return
+        async with self._lock:
+            if self._ready:
+                return
+            from validate_and_upload import create_turso_table, migrate_turso_schema
+
+            await self.local.batch(REPLICA_SCHEMA)
+            await create_turso_table(self.local)
+            await migrate_turso_schema(self.local)
+            if await self.meta("pulled_at") is None:
+                if self.offline:
+                    print("Replica was never pulled; run `cli.py sync` online first or existing companies will be duplicated")
+                elif not await self._has_queued():
+                    await self._pull()
+            self._ready = True
+
+    async def meta(self, key: str) -> Optional[str]:
+        result = await self.local.execute("SELECT value FROM _replica_meta WHERE key = ?", [key])
+        return result.rows[0][0] if result.rows else None
+
+    def _meta_statement(self, key: str, value: str):
+        from libsql_client import Statement
+
+        return Statement(
+            "INSERT INTO _replica_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [key, value],
+        )
+
+    def _outbox_statement(self, batch_id: str, sql: str, args: Union[list, dict]):
+        from libsql_client import Statement
+
+        return Statement(
+            "INSERT INTO _replica_outbox (batch_id, sql, args) VALUES (?, ?, ?)",
+            [batch_id, sql, json.dumps(args)],
+        )
+
+    async def execute(self, stmt, args=None) -> ResultSet:
+        from libsql_client import Statement
+
+        await self.ensure_ready()
+        sql, values = statement_parts(stmt, args)
+        if statement_kind(sql) != "write":
+            return await self.local.execute(stmt, args)
+        results = await self.local.batch([Statement(sql, values), self._outbox_statement(uuid.uuid4().hex, sql, values)])
+        return results[0]
+
+    async def batch(self, stmts) -> List[ResultSet]:
+        await self.ensure_ready()
+        stmts = list(stmts)
+        parts = [statement_parts(stmt) for stmt in stmts]
+        kinds = [statement_kind(sql) for sql, _ in parts]
+        if "schema" in kinds or "write" not in kinds:
+            return await self.local.batch(stmts)
+        batch_id = uuid.uuid4().hex
+        outbox = [
+            self._outbox_statement(batch_id, sql, values)
+            for (sql, values), kind in zip(parts, kinds)
+            if kind == "write"
+        ]
+        results = await self.local.batch(stmts + outbox)
+        return results[:len(stmts)]
+
+    async def _has_queued(self) -> bool:
+        return bool((await self.local.execute("SELECT 1 FROM _replica_outbox LIMIT 1")).rows)
+
+    async def queued(self) -> int:
+        await self.ensure_ready()
+        result = await self.local.execute("SELECT COUNT(*) FROM _replica_outbox")
+        return result.rows[0][0]
+
+    async def push(self) -> SyncResult:
+        """Replay queued writes on the remote, oldest first.
+
+        Stops at the first remote batch that fails; it and everything after
+        it stay queued.
+        """
+        await self.ensure_ready()
+        async with self._lock:
+            return await self._push()
+
+    async def _push(self) -> SyncResult:
+        from libsql_client import Statement
+        from validate_and_upload import create_turso_table, migrate_turso_schema
+
+        sync = SyncResult()
+        if not await self._has_queued():
+            return sync
+        placeholders = ", ".join("?" for _ in REPLICATED_TABLES)
+        tables = await resilience.acall(
+            "turso",
+            self.remote.execute,
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+            REPLICATED_TABLES,
+        )
+        if tables.rows[0][0] < len(REPLICATED_TABLES):
+            await resilience.acall("turso", create_turso_table, self.remote)
+        await resilience.acall("turso", migrate_turso_schema, self.remote)
+        last_id = 0
+        while True:
+            # Whole local batches, up to push_batch_statements statements
+            result = await self.local.execute(
+                '''
+                SELECT id, batch_id, sql, args FROM _replica_outbox
+                WHERE batch_id IN (
+                    SELECT batch_id FROM _replica_outbox WHERE id > ? GROUP BY batch_id ORDER BY MIN(id) LIMIT ?
+                )
+                ORDER BY id
+                ''',
+                [last_id, self.push_batch_statements],
+            )
+            if not result.rows:
+                break
+            chunk, batches = [], set()
+            for row_id, batch_id, sql, args in result.rows:
+                if batch_id not in batches and chunk and len(chunk) >= self.push_batch_statements:
+                    break
+                batches.add(batch_id)
+                chunk.append(Statement(sql, json.loads(args)))
+                last_id = row_id
+            await resilience.acall("turso", self.remote.batch, chunk)
+            await self.local.batch([
+                Statement("DELETE FROM _replica_outbox WHERE id <= ?", [last_id]),
+                self._meta_statement("pushed_at", now()),
+            ])
+            sync.pushed_batches += len(batches)
+            sync.pushed_statements += len(chunk)
+        return sync
+
+    async def pull(self) -> SyncResult:
+        """Replace the local tables with the remote's; refused while writes are queued"""
+        await self.ensure_ready()
+        async with self._lock:
+            return await self._pull()
+
+    async def _pull(self) -> SyncResult:
+        from libsql_client import Statement
+
+        sync = SyncResult()
+        if await self._has_queued():
+            raise RuntimeError("Replica has queued writes; push them before pulling")
+
+        statements = []
+        for table in REPLICATED_TABLES:
+            remote_columns = await resilience.acall("turso", self.remote.execute, f"PRAGMA table_info({table})")
+            if not remote_columns.rows:
+                continue
+            local_columns = {row[1] for row in (await self.local.execute(f"PRAGMA table_info({table})")).rows}
+            columns = [row[1] for row in remote_columns.rows if row[1] in local_columns]
+            # Enough rows per INSERT to stay under SQLite's bound-parameter limit
+            rows_per_insert = max(1, 900 // len(columns))
+            statements.append(f"DELETE FROM {table}")
+            sync.pulled_rows[table] = 0
+            last_rowid = 0
+            while True:
+                page = await resilience.acall(
+                    "turso",
+                    self.remote.execute,
+                    f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    [last_rowid, self.pull_page_size],
+                )
+                if not page.rows:
+                    break
+                rows = [list(row)[1:] for row in page.rows]
+                last_rowid = page.rows[-1][0]
+                for start in range(0, len(rows), rows_per_insert):
+                    group = rows[start:start + rows_per_insert]
+                    placeholders = ", ".join("(" + ", ".join("?" for _ in columns) + ")" for _ in group)
+                    statements.append(Statement(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders}",
+                        [value for row in group for value in row],
+                    ))
+                sync.pulled_rows[table] += len(rows)
+
+        # One local transaction, so readers never see a half-copied replica
+        await self.local.batch(statements + [self._meta_statement("pulled_at", now())])
+        return sync
+
+    async def sync(self) -> SyncResult:
+        """Push queued writes, then refresh the replica from the remote"""
+        await self.ensure_ready()
+        async with self._lock:
+            sync = await self._push()
+            sync.pulled_rows = (await self._pull()).pulled_rows
+        return sync
+
+    async def close(self) -> None:
+        try:
+            if self._ready and not self.offline:
+                try:
+                    await self.push()
+                except Exception as e:
+                    print(f"Replica push failed, {await self.queued()} statements stay queued for `cli.py sync`: {e}")
+        finally:
+            await self.local.close()
+            if self._remote is not None:
+                await self._remote.close()
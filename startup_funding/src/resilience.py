@@ -0,0 +1,316 @@
+# resilience.py
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: rate limited, or the server had a bad moment
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Transient errors from SDKs that are imported lazily, matched by class name
+RETRYABLE_ERRORS = {
+    "APIConnectionError",
+    "APITimeoutError",
+    # httpx, and selenium's page load / script timeouts; other selenium
+    # WebDriverExceptions (missing element, stale reference, bad selector)
+    # fail the same way on a retry
+    "TimeoutException",
+    # urllib3, under selenium's connection to the driver
+    "MaxRetryError",
+    "NewConnectionError",
+    "ReadTimeoutError",
+    "ProtocolError",
+    "ConnectError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    # urllib connection failures; HTTPError subclasses it but carries a status
+    "URLError",
+    # aiohttp, under the libsql client
+    "ClientConnectorError",
+    "ServerDisconnectedError",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the endpoint while its circuit breaker is open"""
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    # openai.APIStatusError, httpx.HTTPStatusError, urllib.error.HTTPError
+    code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if code is None:
+        response = getattr(error, "response", None)
+        code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUSES
+    if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__):
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, when the error carries one"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt n sleeps a random
+    0..min(max_delay, base_delay * 2**n) seconds, or what Retry-After asks."""
+
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(self.max_delay, requested)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+@dataclass
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`; then lets one trial call through (half-open) and
+    closes again if it succeeds."""
+
+    failure_threshold: int = 5
+    reset_seconds: float = 30.0
+    failures: int = 0
+    opened_at: Optional[float] = None
+    trial_running: bool = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half-open"
+
+    def release_trial(self) -> None:
+        """The half-open trial ended without an outcome (e.g. it was cancelled)"""
+        self.trial_running = False
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True when it opened the circuit"""
+        self.failures += 1
+        was_open = self.opened_at is not None
+        if self.trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trial_running = False
+            return not was_open
+        return False
+
+
+@dataclass
+class EndpointStats:
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    # Retries refused because the endpoint's budget was spent
+    budget_exhausted: int = 0
+    # Calls rejected by the open circuit breaker
+    short_circuited: int = 0
+    circuit_opens: int = 0
+    retry_wait_seconds: float = 0.0
+
+
+@dataclass
+class Endpoint:
+    """Retry policy, retry budget and circuit breaker for one endpoint.
+
+    The budget caps retries at `min_retries` plus `budget_ratio` of the
+    calls made so far, so a struggling endpoint sees at most ~20% extra
+    load instead of every caller retrying max_attempts times.
+    """
+
+    name: str
+    policy: RetryPolicy = field(default_factory=RetryPolicy)
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    budget_ratio: float = 0.2
+    min_retries: int = 10
+    stats: EndpointStats = field(default_factory=EndpointStats)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if not self.breaker.allow():
+                self.stats.short_circuited += 1
+                raise CircuitOpenError(f"{self.name}: circuit open after {self.breaker.failures} failures")
+            self.stats.calls += 1
+
+    def _after_abort(self) -> None:
+        with self._lock:
+            self.breaker.release_trial()
+
+    def _after_success(self) -> None:
+        with self._lock:
+            self.stats.successes += 1
+            self.breaker.record_success()
+
+    def _after_failure(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Record a failed attempt; seconds to wait before retrying, or None to give up"""
+        with self._lock:
+            self.stats.failures += 1
+            retryable = is_retryable(error)
+            if not retryable:
+                # The endpoint answered; the request itself was bad
+                self.breaker.record_success()
+            elif self.breaker.record_failure():
+                self.stats.circuit_opens += 1
+            if not retryable or attempt + 1 >= self.policy.max_attempts or self.breaker.state == "open":
+                return None
+            if self.stats.retries >= self.min_retries + self.budget_ratio * self.stats.calls:
+                self.stats.budget_exhausted += 1
+                return None
+            self.stats.retries += 1
+            delay = self.policy.delay(attempt, error)
+            self.stats.retry_wait_seconds += delay
+        print(f"{self.name}: attempt {attempt + 1} failed ({type(error).__name__}: {error}), retrying in {delay:.1f}s")
+        return delay
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        attempt = 0
+        while True:
+            self._before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the endpoint, but a
+                # half-open trial must not stay marked as running
+                self._after_abort()
+                raise
+            self._after_success()
+            return result
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        attempt = 0
+        while True:
+            self._before_call()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the endpoint, but a
+                # half-open trial must not stay marked as running
+                self._after_abort()
+                raise
+            self._after_success()
+            return result
+
+
+class Resilience:
+    """Endpoints by name, created on first use with the defaults below.
+
+    LLM calls go through "llm" and page loads through "http:<source>" and
+    "browser:<source>", so one flaky report site can't open the circuit for
+    another, and failed static fetches don't trip the browser fallback.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        budget_ratio: float = 0.2,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, Endpoint] = {}
+
+    @classmethod
+    def from_env(cls) -> "Resilience":
+        return cls(
+            max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", 4)),
+            base_delay=float(os.getenv("RETRY_BASE_DELAY_SECONDS", 1)),
+            max_delay=float(os.getenv("RETRY_MAX_DELAY_SECONDS", 30)),
+            budget_ratio=float(os.getenv("RETRY_BUDGET_RATIO", 0.2)),
+            failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5)),
+            reset_seconds=float(os.getenv("CIRCUIT_RESET_SECONDS", 30)),
+        )
+
+    def endpoint(self, name: str) -> Endpoint:
+        with self._lock:
+            if name not in self.endpoints:
+                self.endpoints[name] = Endpoint(
+                    name=name,
+                    policy=RetryPolicy(self.max_attempts, self.base_delay, self.max_delay),
+                    breaker=CircuitBreaker(self.failure_threshold, self.reset_seconds),
+                    budget_ratio=self.budget_ratio,
+                )
+            return self.endpoints[name]
+
+    def call(self, name: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        return self.endpoint(name).call(fn, *args, **kwargs)
+
+    async def acall(self, name: str, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        return await self.endpoint(name).acall(fn, *args, **kwargs)
+
+    def summary(self) -> str:
+        if not self.endpoints:
+            return "Resilience: no guarded calls"
+        lines = ["Resilience:"]
+        for name, endpoint in sorted(self.endpoints.items()):
+            stats = endpoint.stats
+            lines.append(
+                f"  {name}: {stats.calls} calls, {stats.failures} failed, {stats.retries} retries "
+                f"({stats.retry_wait_seconds:.1f}s backoff), {stats.budget_exhausted} over budget, "
+                f"{stats.short_circuited} short-circuited, circuit {endpoint.breaker.state}"
+                + (f" (opened {stats.circuit_opens}x)" if stats.circuit_opens else "")
+            )
+        return "\n".join(lines)
+
+
+resilience = Resilience.from_env()
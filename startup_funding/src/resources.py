@@ -0,0 +1,160 @@
+# resources.py
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from tracing import tracer
+
+if TYPE_CHECKING:
+    # openai, httpx and libsql_client are imported on first use; most
+    # commands only need one of them
+    import httpx
+    from libsql_client import Client
+    from openai import OpenAI
+
+DEFAULT_REPLICA_PATH = ".turso_replica.db"
+
+
+class TracedClient:
+    """libsql client wrapper that records a db span per round trip"""
+
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def execute(self, stmt, args=None):
+        # Statement, plain SQL or (sql, args)
+        sql = stmt if isinstance(stmt, str) else getattr(stmt, "sql", None) or stmt[0]
+        with tracer.span("db_execute", sql=" ".join(sql.split())[:80]) as span:
+            result = await self.client.execute(stmt, args)
+            span.set(rows=len(result.rows))
+            return result
+
+    async def batch(self, stmts):
+        stmts = list(stmts)
+        with tracer.span("db_batch", statements=len(stmts)):
+            return await self.client.batch(stmts)
+
+    async def close(self):
+        await self.client.close()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class ResourceRegistry:
+    """Long-lived clients shared by every pipeline stage.
+
+    One OpenAI client backed by a bounded, keep-alive httpx pool, so repeated
+    LLM calls reuse TLS connections instead of opening one per call, and one
+    libsql client per database URL. libsql clients hold an aiohttp session
+    bound to the event loop that created them, so they are keyed by
+    (url, loop) and a new loop (e.g. a second asyncio.run) gets its own.
+
+    With a replica path, remote databases are served from a local SQLite
+    replica (see replica.py); `offline` keeps the remote out of the run
+    entirely until an explicit `cli.py sync`.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 120.0,
+        replica_path: Optional[str] = None,
+        offline: bool = False,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.replica_path = replica_path
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._openai: Optional[OpenAI] = None
+        self._libsql: Dict[Tuple[str, int], Tuple[asyncio.AbstractEventLoop, Client]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResourceRegistry":
+        offline = os.getenv("TURSO_OFFLINE", "").lower() in ("1", "true", "yes")
+        return cls(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 10)),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 5)),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", 30)),
+            timeout=float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", 120)),
+            replica_path=os.getenv("TURSO_REPLICA_PATH") or (DEFAULT_REPLICA_PATH if offline else None),
+            offline=offline,
+        )
+
+    def openai(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
+        """Shared OpenAI client; thread-safe, so asyncio.to_thread callers can use it too"""
+        with self._lock:
+            if self._openai is None:
+                import httpx
+                from openai import OpenAI
+
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                )
+                self._http_client = httpx.Client(limits=limits, timeout=self.timeout)
+                self._openai = OpenAI(
+                    api_key=api_key or os.environ.get("OPENAI_API_KEY"),
+                    base_url=base_url,
+                    http_client=self._http_client,
+                    # resilience.py owns retries, backoff and the circuit breaker
+                    max_retries=0,
+                )
+            return self._openai
+
+    def libsql(self, url: str, auth_token: Optional[str] = None) -> Client:
+        """libsql client for `url` on the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Drop clients whose loop has finished; their sessions are unusable
+            for key, (client_loop, _) in list(self._libsql.items()):
+                if client_loop.is_closed():
+                    del self._libsql[key]
+            key = (url, id(loop))
+            if key not in self._libsql:
+                import libsql_client
+
+                if self.replica_path and not (url or "").startswith("file:"):
+                    from replica import ReplicaClient
+
+                    client = ReplicaClient(
+                        libsql_client.create_client(url=f"file:{self.replica_path}"),
+                        remote_url=url,
+                        auth_token=auth_token,
+                        offline=self.offline,
+                    )
+                else:
+                    client = libsql_client.create_client(url=url, auth_token=auth_token)
+                if tracer.enabled:
+                    client = TracedClient(client)
+                self._libsql[key] = (loop, client)
+            return self._libsql[key][1]
+
+    async def aclose(self) -> None:
+        """Close the libsql clients opened on the running loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            owned = [key for key, (client_loop, _) in self._libsql.items() if client_loop is loop]
+            clients = [self._libsql.pop(key)[1] for key in owned]
+        for client in clients:
+            await client.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._openai = None
+
+
+resources = ResourceRegistry.from_env()
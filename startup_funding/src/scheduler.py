@@ -0,0 +1,266 @@
+# scheduler.py
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+@dataclass
+class SchedulerProgress:
+    total: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    written: int = 0
+    # Wall time spent inside run_batch, summed over batches
+    busy_seconds: float = 0.0
+    # Adaptive scheduling: items sent back to the queue / given up on
+    requeued: int = 0
+    dropped: int = 0
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.running - self.completed - self.failed
+
+    def __str__(self):
+        text = (
+            f"{self.completed + self.failed}/{self.total} done "
+            f"({self.completed} ok, {self.failed} failed, {self.running} running, {self.written} written)"
+        )
+        if self.requeued or self.dropped:
+            text += f", {self.requeued} requeued, {self.dropped} dropped"
+        return text
+
+
+@dataclass
+class BatchResult:
+    index: int
+    batch: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+    # Items of the batch that were missing from the result
+    missing: List[Any] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchSizeController:
+    """Additive-increase / multiplicative-decrease batch size.
+
+    Each finished batch reports how many items were requested and returned
+    and how long it took. A batch that fails or returns less than
+    `target_completion` of its items shrinks the size to what the agent
+    managed (at most half on a total failure); a batch slower than
+    `max_batch_seconds` shrinks it by one; `grow_after` good batches in a
+    row grow it by one. The size stays within [minimum, maximum].
+    """
+
+    initial: int = 5
+    minimum: int = 1
+    maximum: int = 20
+    target_completion: float = 0.9
+    grow_after: int = 2
+    max_batch_seconds: Optional[float] = None
+    size: int = field(init=False)
+    streak: int = field(init=False, default=0)
+    # (requested, returned, elapsed, size after) per observed batch
+    history: List[Tuple[int, int, float, int]] = field(init=False, default_factory=list)
+
+    def __post_init__(self):
+        if not 1 <= self.minimum <= self.maximum:
+            raise ValueError("need 1 <= minimum <= maximum")
+        self.size = min(self.maximum, max(self.minimum, self.initial))
+
+    def observe(self, requested: int, returned: int, elapsed: float) -> int:
+        completion = returned / requested if requested else 1.0
+        if completion < self.target_completion:
+            self.size = max(self.minimum, min(self.size - 1, max(returned, self.size // 2)))
+            self.streak = 0
+        elif self.max_batch_seconds is not None and elapsed > self.max_batch_seconds:
+            self.size = max(self.minimum, self.size - 1)
+            self.streak = 0
+        else:
+            self.streak += 1
+            # Only grow on batches that were actually full-sized
+            if self.streak >= self.grow_after and requested >= self.size:
+                self.size = min(self.maximum, self.size + 1)
+                self.streak = 0
+        self.history.append((requested, returned, elapsed, self.size))
+        return self.size
+
+
+@dataclass
+class AdaptiveBatchScheduler:
+    """Forms batches on the fly from a queue of items, sized by `controller`.
+
+    `match_returned(batch, result)` tells which items of a batch came back.
+    Missing items, or every item of a failed batch, go back on the queue
+    until they have been tried `max_attempts` times, after which they are
+    reported in `dropped`; if `match_returned` raises, the batch counts as
+    failed.
+
+    `run_batch` is awaited once per batch (it can wrap a subprocess, an
+    in-process agent or a fake coroutine in tests). Before a batch starts,
+    one token is taken from every host bucket in `rate_limits`, so the
+    agent never hits a host faster than configured. Workers may finish out
+    of order, but `on_result` is always called in batch order; a requeued
+    item comes back with the later batch that retries it. If a worker
+    fails, the others are cancelled and the error is raised.
+    """
+
+    run_batch: Callable[[List[Any]], Awaitable[Any]]
+    match_returned: Callable[[List[Any], Any], List[Any]]
+    controller: BatchSizeController = field(default_factory=BatchSizeController)
+    concurrency: int = 2
+    rate_limits: Dict[str, TokenBucket] = field(default_factory=dict)
+    on_result: Optional[Callable[[BatchResult, bool], Awaitable[None]]] = None
+    on_progress: Optional[Callable[[SchedulerProgress], None]] = None
+    max_attempts: int = 3
+    progress: SchedulerProgress = field(default_factory=SchedulerProgress)
+    dropped: List[Any] = field(default_factory=list)
+
+    def _report(self) -> None:
+        if self.on_progress:
+            self.on_progress(self.progress)
+
+    async def run(self, items: List[Any]) -> List[BatchResult]:
+        if self.concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.progress = SchedulerProgress()
+        self.dropped = []
+        # (item, attempts so far); requeued items go to the front
+        pending: Deque[Tuple[Any, int]] = deque((item, 0) for item in items)
+        in_flight = 0
+        all_done = False
+        changed = asyncio.Condition()
+        # Finished batches by index, until every earlier batch is written
+        done: Dict[int, BatchResult] = {}
+        outcomes: List[BatchResult] = []
+        flush_lock = asyncio.Lock()
+
+        async def next_batch() -> Optional[Tuple[int, List[Tuple[Any, int]]]]:
+            nonlocal in_flight
+            async with changed:
+                # Wait while the queue is empty but running batches may requeue
+                await changed.wait_for(lambda: pending or in_flight == 0)
+                if not pending:
+                    return None
+                size = self.controller.size
+                batch = [pending.popleft() for _ in range(min(size, len(pending)))]
+                in_flight += 1
+                self.progress.total += 1
+                return self.progress.total - 1, batch
+
+        async def finish(batch: List[Tuple[Any, int]], outcome: BatchResult) -> None:
+            nonlocal in_flight, all_done
+            requested = [item for item, _ in batch]
+            outcome.missing = list(requested)
+            try:
+                if outcome.ok:
+                    try:
+                        returned_ids = {id(item) for item in self.match_returned(requested, outcome.result)}
+                    except Exception as e:
+                        outcome.error = e
+                    else:
+                        outcome.missing = [item for item in requested if id(item) not in returned_ids]
+                self.controller.observe(len(requested), len(requested) - len(outcome.missing), outcome.elapsed)
+            finally:
+                # Always release the batch, or workers waiting for it to
+                # requeue would wait forever
+                async with changed:
+                    retry = []
+                    for item, tries in batch:
+                        if not any(item is missing for missing in outcome.missing):
+                            continue
+                        if tries + 1 < self.max_attempts:
+                            retry.append((item, tries + 1))
+                        else:
+                            self.dropped.append(item)
+                    pending.extendleft(reversed(retry))
+                    self.progress.requeued += len(retry)
+                    self.progress.dropped = len(self.dropped)
+                    in_flight -= 1
+                    all_done = not pending and in_flight == 0
+                    changed.notify_all()
+
+        async def flush() -> None:
+            # Hand finished batches to on_result strictly in batch order
+            async with flush_lock:
+                while len(outcomes) in done:
+                    outcome = done.pop(len(outcomes))
+                    outcomes.append(outcome)
+                    if self.on_result:
+                        try:
+                            await self.on_result(outcome, all_done and not done)
+                        except Exception as e:
+                            print(f"Error writing result of batch {outcome.index + 1}: {e}")
+                    self.progress.written += 1
+
+        async def worker() -> None:
+            while (formed := await next_batch()) is not None:
+                index, batch = formed
+                await self._throttle()
+                self.progress.running += 1
+                self._report()
+                outcome = BatchResult(index=index, batch=[item for item, _ in batch])
+                started = time.perf_counter()
+                try:
+                    outcome.result = await self.run_batch(outcome.batch)
+                except Exception as e:
+                    outcome.error = e
+                outcome.elapsed = time.perf_counter() - started
+                self.progress.busy_seconds += outcome.elapsed
+                self.progress.running -= 1
+                await finish(batch, outcome)
+                if outcome.ok:
+                    self.progress.completed += 1
+                else:
+                    self.progress.failed += 1
+                done[index] = outcome
+                await flush()
+                self._report()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return outcomes
+
+    async def _throttle(self) -> None:
+        for bucket in self.rate_limits.values():
+            await bucket.acquire()
@@ -0,0 +1,286 @@
+# sources.py
+import asyncio
+import re
+import urllib.request
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from html_reduce import SERIES_WISE_DEALS_MARKER
+from resilience import resilience
+from tracing import tracer
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+)
+
+SIMPLE_SELECTOR = re.compile(r"^(?P<tag>[a-z0-9]+)?(?:#(?P<id>[\w-]+))?(?:\.(?P<cls>[\w-]+))?$", re.IGNORECASE)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def parse_selector(selector: str) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """Parse "tag", "tag#id", "tag.class" selectors separated by commas"""
+    parsed = []
+    for part in selector.split(","):
+        match = SIMPLE_SELECTOR.match(part.strip())
+        if not match:
+            raise ValueError(f"Unsupported selector: {part.strip()!r}")
+        parsed.append((match.group("tag"), match.group("id"), match.group("cls")))
+    return parsed
+
+
+class ElementFinder(HTMLParser):
+    """Finds the outerHTML of the first element matching a simple CSS selector"""
+
+    def __init__(self, html: str, selector: str):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.selectors = parse_selector(selector)
+        # getpos() counts lines by "\n" only, so "\r", U+2028 and the other
+        # characters str.splitlines() breaks on must not start a line here
+        self.line_offsets = [0]
+        for line in html.split("\n")[:-1]:
+            self.line_offsets.append(self.line_offsets[-1] + len(line) + 1)
+        self.match_tag = None
+        self.start = None
+        self.end = None
+        self.depth = 0
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def _matches(self, tag: str, attrs) -> bool:
+        attributes = dict(attrs)
+        classes = (attributes.get("class") or "").split()
+        return any(
+            (sel_tag is None or sel_tag == tag)
+            and (sel_id is None or attributes.get("id") == sel_id)
+            and (sel_cls is None or sel_cls in classes)
+            for sel_tag, sel_id, sel_cls in self.selectors
+        )
+
+    def handle_starttag(self, tag, attrs):
+        if self.end is not None:
+            return
+        if self.start is None:
+            if self._matches(tag, attrs):
+                self.match_tag = tag
+                self.start = self._offset()
+                if tag in VOID_TAGS:
+                    self.end = self.start + len(self.get_starttag_text())
+        elif tag == self.match_tag:
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if self.start is None or self.end is not None or tag != self.match_tag:
+            return
+        if self.depth:
+            self.depth -= 1
+            return
+        offset = self._offset()
+        self.end = self.html.index(">", offset) + 1
+
+    def find(self) -> Optional[str]:
+        self.feed(self.html)
+        self.close()
+        if self.start is None:
+            return None
+        # Unclosed element: take everything up to the end of the document
+        return self.html[self.start : self.end or len(self.html)]
+
+
+@dataclass
+class SourceExtractor:
+    """How to pull the funding report element out of one publication's pages"""
+
+    name: str
+    domains: Tuple[str, ...]
+    selector: str
+    # Pages that only render the report client-side go straight to a browser
+    needs_js: bool = False
+    stop_marker: Optional[str] = None
+    wait_seconds: float = 10
+
+    def extract(self, html: str) -> Optional[str]:
+        return ElementFinder(html, self.selector).find()
+
+    def extract_with_driver(self, driver, url: str) -> str:
+        """Load `url` and wait for the report element, reloading on timeouts"""
+        return resilience.call(f"browser:{self.name}", self._load_with_driver, driver, url)
+
+    def _load_with_driver(self, driver, url: str) -> str:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        with tracer.span("page_load", source=self.name, fetched_with="browser"):
+            driver.get(url)
+        with tracer.span("element_wait", source=self.name, selector=self.selector):
+            element = WebDriverWait(driver, self.wait_seconds).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, self.selector))
+            )
+        return element.get_attribute("outerHTML")
+
+
+EXTRACTORS: Dict[str, SourceExtractor] = {}
+
+
+def register_extractor(extractor: SourceExtractor) -> SourceExtractor:
+    for domain in extractor.domains:
+        EXTRACTORS[domain] = extractor
+    return extractor
+
+
+def extractor_for_url(url: str) -> SourceExtractor:
+    host = (urlparse(url).hostname or "").lower()
+    for domain, extractor in EXTRACTORS.items():
+        if host == domain or host.endswith("." + domain):
+            return extractor
+    raise ValueError("Unsupported URL type")
+
+
+register_extractor(SourceExtractor(name="Inc42", domains=("inc42.com",), selector="table"))
+register_extractor(
+    SourceExtractor(
+        name="Entrackr",
+        domains=("entrackr.com",),
+        selector="div#post-container, div#postContent",
+        stop_marker=SERIES_WISE_DEALS_MARKER,
+    )
+)
+register_extractor(
+    SourceExtractor(name="YourStory", domains=("yourstory.com",), selector="article", needs_js=True)
+)
+
+# Where report pages state their publication date, most reliable first
+PUBLISHED_DATE_PATTERNS = [
+    re.compile(r"""<meta[^>]+(?:property|name|itemprop)=["'](?:article:published_time|datePublished)["'][^>]+content=["'](\d{4}-\d{2}-\d{2})""", re.IGNORECASE),
+    re.compile(r"""<meta[^>]+content=["'](\d{4}-\d{2}-\d{2})[^"']*["'][^>]+(?:property|name|itemprop)=["'](?:article:published_time|datePublished)["']""", re.IGNORECASE),
+    re.compile(r'"datePublished"\s*:\s*"(\d{4}-\d{2}-\d{2})'),
+    re.compile(r"""<time[^>]+datetime=["'](\d{4}-\d{2}-\d{2})""", re.IGNORECASE),
+]
+CANONICAL_URL_PATTERNS = [
+    re.compile(r"""<link[^>]+rel=["']canonical["'][^>]+href=["']([^"']+)""", re.IGNORECASE),
+    re.compile(r"""<meta[^>]+property=["']og:url["'][^>]+content=["']([^"']+)""", re.IGNORECASE),
+]
+
+
+def published_date(html: str) -> Optional[str]:
+    """YYYY-MM-DD a saved or fetched report page says it was published on"""
+    for pattern in PUBLISHED_DATE_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def canonical_url(html: str) -> Optional[str]:
+    for pattern in CANONICAL_URL_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def extractor_named_in(text: str) -> Optional[SourceExtractor]:
+    """Extractor whose name appears in `text`, e.g. a saved file's name"""
+    text = text.lower()
+    for extractor in EXTRACTORS.values():
+        if extractor.name.lower() in text:
+            return extractor
+    return None
+
+
+@dataclass
+class FetchedSource:
+    url: str
+    extractor: SourceExtractor
+    html: str
+    # "http" or "browser"
+    fetched_with: str
+
+
+def http_get(url: str, timeout: float) -> str:
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with tracer.span("page_load", url=url, fetched_with="http") as span:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            page = response.read().decode(charset, errors="replace")
+        span.set(bytes=len(page))
+    return page
+
+
+@dataclass
+class SourceFetcher:
+    """Fetches report pages concurrently.
+
+    Static pages are loaded over plain HTTP in worker threads. Pages marked
+    `needs_js`, or whose report element is missing from the static HTML,
+    fall back to a small pool of webdrivers created by `driver_factory`.
+    """
+
+    driver_factory: Optional[Callable[[], object]] = None
+    max_drivers: int = 2
+    timeout: float = 10
+    drivers: List[object] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.idle_drivers: Optional[asyncio.Queue] = None
+        self.driver_lock: Optional[asyncio.Lock] = None
+        self._pool_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _driver_pool(self) -> None:
+        """Queue and lock for the running loop; each asyncio.run() gets its own"""
+        loop = asyncio.get_running_loop()
+        if self._pool_loop is not loop:
+            self.idle_drivers = asyncio.Queue()
+            for driver in self.drivers:
+                self.idle_drivers.put_nowait(driver)
+            self.driver_lock = asyncio.Lock()
+            self._pool_loop = loop
+
+    async def _checkout_driver(self):
+        self._driver_pool()
+        async with self.driver_lock:
+            if self.idle_drivers.empty() and len(self.drivers) < self.max_drivers:
+                driver = await asyncio.to_thread(self.driver_factory)
+                self.drivers.append(driver)
+                return driver
+        return await self.idle_drivers.get()
+
+    async def _fetch_with_browser(self, url: str, extractor: SourceExtractor) -> FetchedSource:
+        if self.driver_factory is None:
+            raise RuntimeError(f"{url} needs a browser but no driver_factory was given")
+        driver = await self._checkout_driver()
+        try:
+            html = await asyncio.to_thread(extractor.extract_with_driver, driver, url)
+        finally:
+            self.idle_drivers.put_nowait(driver)
+        return FetchedSource(url=url, extractor=extractor, html=html, fetched_with="browser")
+
+    async def fetch(self, url: str) -> FetchedSource:
+        extractor = extractor_for_url(url)
+        if not extractor.needs_js:
+            try:
+                page = await asyncio.to_thread(resilience.call, f"http:{extractor.name}", http_get, url, self.timeout)
+                html = extractor.extract(page)
+                if html is not None:
+                    return FetchedSource(url=url, extractor=extractor, html=html, fetched_with="http")
+                print(f"{extractor.name}: report element not in static HTML, using browser")
+            except Exception as e:
+                print(f"{extractor.name}: HTTP fetch failed ({e}), using browser")
+        return await self._fetch_with_browser(url, extractor)
+
+    async def fetch_all(self, urls: List[str]) -> List[FetchedSource]:
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    def close(self) -> None:
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error closing webdriver: {e}")
+        self.drivers = []
+        self.idle_drivers = self.driver_lock = self._pool_loop = None
@@ -0,0 +1,206 @@
+# tracing.py
+import contextvars
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Iterable, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from jsonl_store import JsonLinesWriter, iter_json_lines
+
+# USD per million (prompt, completion) tokens, for the run cost estimate
+MODEL_PRICES_PER_MTOK = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class TraceEntry(BaseModel):
+    """One finished span as written to the trace file; span attributes are extra fields"""
+
+    model_config = ConfigDict(extra="allow")
+
+    run_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    name: str
+    duration_ms: float
+    error: Optional[str] = None
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class Span:
+    """A timed operation. Nested spans, also across asyncio tasks and
+    asyncio.to_thread, record their parent's id."""
+
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "start", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = tracer.next_span_id()
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self.token)
+        error = f"{exc_type.__name__}: {exc}" if exc is not None else None
+        self.tracer.record(self, duration, error)
+
+
+class NullSpan:
+    """Stand-in returned while tracing is disabled"""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Spans for page loads, element waits, LLM calls, agent runs, DB round
+    trips and pipeline stages, written to `output_file` as JSON Lines.
+
+    Spans are buffered and appended in chunks. The run id is exported as
+    TRACE_RUN_ID so agent worker processes write into the same run. With
+    tracing disabled (no TRACE_FILE) `span()` returns a shared no-op object,
+    so an instrumented call costs one attribute check.
+    """
+
+    def __init__(self, output_file: Optional[str] = None, run_id: Optional[str] = None, flush_every: int = 200):
+        self.output_file = output_file
+        self.enabled = bool(output_file)
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer: List[dict] = []
+        self._span_ids = itertools.count(1)
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        tracer = cls(output_file=os.getenv("TRACE_FILE") or None, run_id=os.getenv("TRACE_RUN_ID") or None)
+        if tracer.enabled:
+            os.environ["TRACE_RUN_ID"] = tracer.run_id
+        return tracer
+
+    def next_span_id(self) -> str:
+        # Unique within a run across the worker processes writing into it
+        return f"{os.getpid():x}-{next(self._span_ids):x}"
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, span: Span, duration: float, error: Optional[str] = None) -> None:
+        entry = {
+            "run_id": self.run_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "duration_ms": round(duration * 1000, 3),
+            **span.attrs,
+        }
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self._buffer.append(entry)
+            if len(self._buffer) < self.flush_every:
+                return
+            entries, self._buffer = self._buffer, []
+        JsonLinesWriter(self.output_file).append(entries)
+
+    def flush(self) -> None:
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if entries:
+            JsonLinesWriter(self.output_file).append(entries)
+
+    def summary(self) -> str:
+        """Summary of this run, including spans written by worker processes"""
+        if not self.enabled:
+            return "Tracing disabled (set TRACE_FILE to enable)"
+        self.flush()
+        return summarize_trace(load_trace(self.output_file, self.run_id))
+
+
+def load_trace(filename: str, run_id: Optional[str] = None) -> List[TraceEntry]:
+    """Entries of one run (the last run in the file when run_id is None)"""
+    entries = list(iter_json_lines(filename, TraceEntry))
+    if run_id is None and entries:
+        run_id = entries[-1].run_id
+    return [entry for entry in entries if entry.run_id == run_id]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = round(fraction * (len(sorted_values) - 1))
+    return sorted_values[min(len(sorted_values) - 1, max(0, index))]
+
+
+def estimated_cost_usd(tokens: dict) -> Optional[float]:
+    cost = 0.0
+    for model, (prompt, completion) in tokens.items():
+        prices = MODEL_PRICES_PER_MTOK.get(model)
+        if prices is None:
+            return None
+        cost += (prompt * prices[0] + completion * prices[1]) / 1_000_000
+    return cost
+
+
+def summarize_trace(entries: Iterable[TraceEntry]) -> str:
+    """Table of count, errors, p50/p95 and total time per span name, then tokens and cost"""
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    tokens = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        durations[entry.name].append(entry.duration_ms)
+        if entry.error:
+            errors[entry.name] += 1
+        if entry.prompt_tokens is not None:
+            totals = tokens[entry.model or "unknown"]
+            totals[0] += entry.prompt_tokens
+            totals[1] += entry.completion_tokens or 0
+
+    lines = [f"{'span':<24} {'count':>6} {'errors':>6} {'p50 ms':>10} {'p95 ms':>10} {'total s':>9}"]
+    for name in sorted(durations, key=lambda name: -sum(durations[name])):
+        values = sorted(durations[name])
+        lines.append(
+            f"{name:<24} {len(values):>6} {errors[name]:>6} {percentile(values, 0.5):>10.1f} "
+            f"{percentile(values, 0.95):>10.1f} {sum(values) / 1000:>9.2f}"
+        )
+    for model, (prompt, completion) in sorted(tokens.items()):
+        lines.append(f"tokens {model}: {prompt:,} prompt + {completion:,} completion")
+    if tokens:
+        cost = estimated_cost_usd(tokens)
+        lines.append(f"estimated LLM cost: ${cost:.4f}" if cost is not None else "estimated LLM cost: unknown model price")
+    return "\n".join(lines)
+
+
+tracer = Tracer.from_env()
@@ -1,14 +1,34 @@
-from enum import Enum
+from __future__ import annotations
+
 import json
-from typing import List, Optional
-from pydantic import BaseModel, ValidationError
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from pydantic import ValidationError
 import os
 import uuid
-from datetime import date, datetime
+import weakref
+from datetime import date, datetime, timezone
 import asyncio
-import libsql_client
-from libsql_client import Client
 from dotenv import load_dotenv
+from jsonl_store import iter_json_lines
+from models import (
+    AdditionalFundingDetailsList,
+    FinalFundingDataList,
+    FinalFundingDetails,
+    FundingDetails,
+    FundingDetailsAdditionalFields,
+    FundingDetailsList,
+    FundRaiseStages,
+)
+from name_index import DEFAULT_MATCH_THRESHOLD, CompanyNameIndex, investor_key
+from resources import resources
+from tracing import tracer
+from week_diff import RoundDelta, diff_week, fingerprint
+
+if TYPE_CHECKING:
+    # libsql_client pulls in aiohttp; it is imported where statements are built
+    from libsql_client import Client, Statement
+
+    from fx import FxTable
 
 load_dotenv()
 
@@ -16,88 +36,11 @@ load_dotenv()
 TURSO_URL = os.getenv("TURSO_DATABASE_URL")
 TURSO_AUTH_TOKEN = os.getenv("TURSO_AUTH_TOKEN")
 
-class FundRaiseStages(Enum):
-    SEED = "Seed"
-    SERIES_A = "Series A"
-    SERIES_B = "Series B"
-    SERIES_C = "Series C"
-    SERIES_D = "Series D"
-    SERIES_E = "Series E"
-    SERIES_F = "Series F"
-    PRE_SEED = "Pre-Seed"
-    GROWTH = "Growth"
-    ANGEL = "Angel"
-    DEBT = "Debt"
-    NOT_AVAILABLE = "Not Available"
-
-    def __str__(self):
-        return self.value
-
-class FundRaiseStages(Enum):
-    SEED = "Seed"
-    SERIES_A = "Series A"
-    SERIES_B = "Series B"
-    SERIES_C = "Series C"
-    SERIES_D = "Series D"
-    SERIES_E = "Series E"
-    SERIES_F = "Series F"
-    PRE_SEED = "Pre-Seed"
-    GROWTH = "Growth"
-    ANGEL = "Angel"
-    DEBT = "Debt"
-    NOT_AVAILABLE = "Not Available"
-
-    def __str__(self):
-        return self.value
-
-
-class FundingDetails(BaseModel):
-    company_name: str
-    amount_raised_usd: Optional[float]
-    investors: List[str]
-    industry_sector: str
-    funding_stage: FundRaiseStages
-    # valuation_usd: Optional[float]
-    source: Optional[List[str]]
-
-    class Config:
-        json_encoders = {FundRaiseStages: lambda v: v.value}
-
-
-class FundingDetailsList(BaseModel):
-    funding_companies_list: List[FundingDetails]
-
-class FinalFundingDetails(BaseModel):
-    company_name: str
-    amount_raised_usd: Optional[float] = None
-    investors: List[str] = []
-    industry_sector: str
-    funding_stage: FundRaiseStages
-    valuation_usd: Optional[float] = None
-    source: Optional[List[str]] = None
-    website: Optional[str] = None
-    linkedin: Optional[str] = None
-    brief_summary: Optional[str] = None
-
-    class Config:
-        json_encoders = {FundRaiseStages: lambda v: v.value}
-
-class FinalFundingDataList(BaseModel):
-    companies: List[FinalFundingDetails]
-
-class FundingDetailsAdditionalFields(BaseModel):
-    company_name: str
-    website: str
-    linkedin: str
-    brief_summary: Optional[str]
-    valuation_usd: Optional[float] = None
-
-class AdditionalFundingDetailsList(BaseModel):
-    companies: List[FundingDetailsAdditionalFields]
-
-def load_and_validate_funding():
+def load_and_validate_funding(filename: Optional[str] = None):
+    if filename is None:
+        filename = f'basic_funding_data_{date.today()}.json'
     try:    
-        with open(f'basic_funding_data_{date.today()}.json', 'r') as file:
+        with open(filename, 'r') as file:
             data = json.load(file)
             validated_companies_data = FundingDetailsList.model_validate(data)
             return validated_companies_data
@@ -108,15 +51,13 @@ def load_and_validate_funding():
         print(f"Error loading funding data: {e}")
         return None
 
-def load_and_validate_companies():
+def load_and_validate_companies(filename: Optional[str] = None):
+    """Stream the agent's JSON Lines output, validating one record at a time"""
+    if filename is None:
+        filename = f'extended_funding_data_{date.today()}.jsonl'
     try:
-        with open(f'extended_funding_data_{date.today()}.json', 'r') as file:
-            data = json.load(file)
-            validated_company_additional_data = AdditionalFundingDetailsList.model_validate(data)
-            return validated_company_additional_data
-    except ValidationError as e:
-        print(f"Validation error in company data: {e}")
-        return None
+        companies = list(iter_json_lines(filename, FundingDetailsAdditionalFields))
+        return AdditionalFundingDetailsList(companies=companies)
     except Exception as e:
         print(f"Error loading company data: {e}")
         return None
@@ -125,9 +66,87 @@ def generate_uuid():
     """Generate a UUID hex string"""
     return uuid.uuid4().hex
 
+# Latest snapshot per company, kept up to date by insert_weekly_data so
+# "latest round" reads don't need a correlated MAX() over all history.
+LATEST_ROUND_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS latest_round (
+        company_id TEXT PRIMARY KEY,
+        snapshot_date TEXT NOT NULL,
+        FOREIGN KEY (company_id) REFERENCES companies(company_id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_latest_round_snapshot_date ON latest_round(snapshot_date)",
+    "CREATE INDEX IF NOT EXISTS idx_funding_rounds_snapshot_date ON funding_rounds(snapshot_date)",
+]
+
+# Covers an investor's rounds newest first and their per-investor counts
+ROUND_INVESTORS_INVESTOR_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_round_investors_investor_round "
+    "ON round_investors(investor_id, snapshot_date, company_id)"
+)
+
+# Investors and sources of each round, normalized out of the comma-joined
+# funding_rounds columns (which are still written for existing readers).
+# investor_id is the canonical investor key, so the same investor spelled
+# "Blume Ventures" or "Blume ventures." maps to one row.
+ROUND_LINKS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS investors (
+        investor_id TEXT PRIMARY KEY,
+        investor_name TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS round_investors (
+        company_id TEXT NOT NULL,
+        snapshot_date TEXT NOT NULL,
+        investor_id TEXT NOT NULL,
+        PRIMARY KEY (company_id, snapshot_date, investor_id),
+        FOREIGN KEY (investor_id) REFERENCES investors(investor_id)
+    )
+    ''',
+    ROUND_INVESTORS_INVESTOR_INDEX,
+    "CREATE INDEX IF NOT EXISTS idx_round_investors_snapshot_date ON round_investors(snapshot_date)",
+    '''
+    CREATE TABLE IF NOT EXISTS round_sources (
+        company_id TEXT NOT NULL,
+        snapshot_date TEXT NOT NULL,
+        source TEXT NOT NULL,
+        PRIMARY KEY (company_id, snapshot_date, source)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_round_sources_source ON round_sources(source, snapshot_date)",
+]
+
+# Progress of one-off migrations that walk funding_rounds: the last rowid
+# done, or 'done', so an interrupted migration resumes where it stopped
+META_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS schema_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    ''',
+]
+# v2: investor_id is investor_key() rather than the company-name key
+ROUND_LINKS_MARKER = "round_links_v2"
+
+# The amount as reported and the rate amount_raised_usd was converted at, so
+# history can be re-priced when the FX table changes (recompute_usd_amounts)
+RAW_AMOUNT_COLUMNS = [
+    ("amount_raw", "REAL"),
+    ("amount_currency", "TEXT"),
+    ("amount_unit", "TEXT"),
+    ("fx_rate", "REAL"),
+]
+
 async def create_turso_table(client: Client):
     """Create database schema in Turso"""
     try:
+        existing = await client.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funding_rounds'"
+        )
         # Create companies table with UUID primary key
         await client.execute('''
         CREATE TABLE IF NOT EXISTS companies (
@@ -137,6 +156,7 @@ async def create_turso_table(client: Client):
             website TEXT,
             linkedin TEXT,
             brief_summary TEXT,
+            enriched_at TEXT,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
         ''')
@@ -152,106 +172,535 @@ async def create_turso_table(client: Client):
             investors TEXT,
             sources TEXT,
             snapshot_date TEXT,
+            fingerprint TEXT,
+            amount_raw REAL,
+            amount_currency TEXT,
+            amount_unit TEXT,
+            fx_rate REAL,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (company_id) REFERENCES companies(company_id),
             UNIQUE(company_id, snapshot_date)
         )
         ''')
+
+        for statement in LATEST_ROUND_SCHEMA + ROUND_LINKS_SCHEMA + META_SCHEMA:
+            await client.execute(statement)
+        if not existing.rows:
+            # A new database has no links to migrate
+            await client.execute(meta_statement(ROUND_LINKS_MARKER, "done"))
     except Exception as e:
         print(f"Error creating tables: {e}")
         raise
 
-async def insert_weekly_data(client: Client, funding_data: FinalFundingDataList, snapshot_date: Optional[str] = None):
-    """Insert data with weekly snapshot into Turso"""
+async def fetch_existing_companies(client: Client, company_names: List[str]) -> dict:
+    """Load existing company rows for the whole week in a single query"""
+    if not company_names:
+        return {}
+    placeholders = ', '.join('?' for _ in company_names)
+    result = await client.execute(
+        f"SELECT company_id, company_name, website, linkedin, brief_summary, enriched_at FROM companies WHERE company_name IN ({placeholders})",
+        list(company_names)
+    )
+    return {row[1]: tuple(row) for row in result.rows}
+
+def enrichment_timestamp(company: FinalFundingDetails) -> Optional[str]:
+    """When the company's enrichment fields were looked up, if it has any"""
+    if not (company.website or company.linkedin or company.brief_summary):
+        return None
+    return company.enriched_at or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+async def migrate_turso_schema(client: Client):
+    """Add columns introduced after the tables were first created"""
+    columns = await client.execute("PRAGMA table_info(companies)")
+    if columns.rows and "enriched_at" not in {row[1] for row in columns.rows}:
+        await client.execute("ALTER TABLE companies ADD COLUMN enriched_at TEXT")
+
+    tables = await client.execute(
+        "SELECT name FROM sqlite_master WHERE name IN "
+        "('funding_rounds', 'latest_round', 'investors', 'idx_round_investors_investor_round')"
+    )
+    table_names = {row[0] for row in tables.rows}
+    if "investors" in table_names and "idx_round_investors_investor_round" not in table_names:
+        # Replaces the (investor_id, snapshot_date) index, which made the
+        # by-investor lookup fetch every round to sort them
+        await client.batch([
+            "DROP INDEX IF EXISTS idx_round_investors_investor",
+            ROUND_INVESTORS_INVESTOR_INDEX,
+        ])
+    if "funding_rounds" in table_names and "latest_round" not in table_names:
+        # One-off backfill from the existing history
+        await client.batch(LATEST_ROUND_SCHEMA + ['''
+            INSERT INTO latest_round (company_id, snapshot_date)
+            SELECT company_id, MAX(snapshot_date)
+            FROM funding_rounds
+            GROUP BY company_id
+        '''])
+
+    if "funding_rounds" in table_names:
+        await client.batch(META_SCHEMA)
+        marker = await read_meta(client, ROUND_LINKS_MARKER)
+        if marker is None:
+            statements = list(ROUND_LINKS_SCHEMA)
+            if "investors" in table_names:
+                # Linked under the old company-name key: relink from scratch
+                statements += ["DELETE FROM round_investors", "DELETE FROM investors"]
+            await client.batch(statements + [meta_statement(ROUND_LINKS_MARKER, "0")])
+        if marker != "done":
+            await backfill_round_links(client)
+
+    if "funding_rounds" in table_names:
+        round_columns = await client.execute("PRAGMA table_info(funding_rounds)")
+        round_column_names = {row[1] for row in round_columns.rows}
+        # Rounds stored before keep a NULL fingerprint and count as changed once
+        if "fingerprint" not in round_column_names:
+            await client.execute("ALTER TABLE funding_rounds ADD COLUMN fingerprint TEXT")
+        # week_diff matches rounds by company_id, through UNIQUE(company_id, snapshot_date)
+        if "round_key" in round_column_names:
+            await client.batch([
+                "DROP INDEX IF EXISTS idx_funding_rounds_round_key",
+                "ALTER TABLE funding_rounds DROP COLUMN round_key",
+            ])
+        # Rounds stored before keep a NULL raw amount, which recompute skips
+        missing = [(name, kind) for name, kind in RAW_AMOUNT_COLUMNS if name not in round_column_names]
+        if missing:
+            await client.batch([f"ALTER TABLE funding_rounds ADD COLUMN {name} {kind}" for name, kind in missing])
+
+async def fetch_enriched_companies(
+    client: Client,
+    company_names: List[str],
+    max_age_days: float = 90,
+    match_threshold: Optional[float] = DEFAULT_MATCH_THRESHOLD,
+) -> dict:
+    """Companies whose website/LinkedIn/summary were looked up within max_age_days.
+
+    Names are resolved to the stored spelling the way the upload does it
+    (fuzzy-matched unless match_threshold is None), so a repeat raiser
+    spelled differently this week is still recognised. Returns incoming
+    company name -> FundingDetailsAdditionalFields under that name. Only
+    those company-level fields are reused; valuation_usd stays None,
+    because a past round's valuation says nothing about this week's round.
+    """
+    if not company_names:
+        return {}
+    if match_threshold is None:
+        stored_names = {}
+    else:
+        stored_names = await resolve_existing_company_names(client, company_names, match_threshold)
+    lookup = {name: stored_names.get(name, name) for name in company_names}
+    stored = list(dict.fromkeys(lookup.values()))
+    placeholders = ', '.join('?' for _ in stored)
+    result = await client.execute(f'''
+        SELECT
+            c.company_name,
+            c.website,
+            c.linkedin,
+            c.brief_summary,
+            c.enriched_at
+        FROM companies c
+        WHERE c.company_name IN ({placeholders})
+            AND c.website IS NOT NULL
+            AND c.linkedin IS NOT NULL
+            AND c.enriched_at >= datetime('now', ?)
+    ''', stored + [f'-{max_age_days} days'])
+
+    rows = {row[0]: row for row in result.rows}
+    return {
+        name: FundingDetailsAdditionalFields(
+            company_name=name,
+            website=rows[stored_name][1],
+            linkedin=rows[stored_name][2],
+            brief_summary=rows[stored_name][3],
+            enriched_at=rows[stored_name][4],
+        )
+        for name, stored_name in lookup.items()
+        if stored_name in rows
+    }
+
+def build_company_statements(company: FinalFundingDetails, existing_row: Optional[tuple], snapshot_date: str):
+    """Build the company upsert and funding round statements for one company.
+
+    Returns the statements and the company row as it looks once they are applied.
+    """
+    from libsql_client import Statement
+
+    if existing_row:
+        # Company exists - update only if new data is available
+        company_id = existing_row[0]
+
+        # Use existing values if new ones are empty/None
+        website = company.website if company.website else existing_row[2]
+        linkedin = company.linkedin if company.linkedin else existing_row[3]
+        brief_summary = company.brief_summary if company.brief_summary else existing_row[4]
+        enriched_at = enrichment_timestamp(company) or existing_row[5]
+
+        company_statement = Statement('''
+        UPDATE companies
+        SET
+            industry_sector = ?,
+            website = ?,
+            linkedin = ?,
+            brief_summary = ?,
+            enriched_at = ?
+        WHERE company_id = ?
+        ''', [
+            company.industry_sector,
+            website,
+            linkedin,
+            brief_summary,
+            enriched_at,
+            company_id
+        ])
+    else:
+        # New company - insert all data
+        company_id = generate_uuid()
+        website, linkedin, brief_summary = company.website, company.linkedin, company.brief_summary
+        enriched_at = enrichment_timestamp(company)
+
+        company_statement = Statement('''
+        INSERT INTO companies
+        (company_id, company_name, industry_sector, website, linkedin, brief_summary, enriched_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            company_id,
+            company.company_name,
+            company.industry_sector,
+            website,
+            linkedin,
+            brief_summary,
+            enriched_at
+        ])
+
+    # Insert funding round with weekly snapshot
+    round_statement = Statement('''
+    INSERT INTO funding_rounds
+    (round_id, company_id, amount_raised_usd, funding_stage, valuation_usd,
+     investors, sources, snapshot_date, fingerprint,
+     amount_raw, amount_currency, amount_unit, fx_rate)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(company_id, snapshot_date) DO UPDATE SET
+    amount_raised_usd = excluded.amount_raised_usd,
+    amount_raw = excluded.amount_raw,
+    amount_currency = excluded.amount_currency,
+    amount_unit = excluded.amount_unit,
+    fx_rate = excluded.fx_rate,
+    funding_stage = excluded.funding_stage,
+    valuation_usd = COALESCE(excluded.valuation_usd, funding_rounds.valuation_usd),
+    investors = COALESCE(excluded.investors, funding_rounds.investors),
+    sources = COALESCE(excluded.sources, funding_rounds.sources),
+    fingerprint = excluded.fingerprint
+    ''', [
+        generate_uuid(),
+        company_id,
+        company.amount_raised_usd,
+        str(company.funding_stage),
+        company.valuation_usd,
+        ','.join(company.investors) if company.investors else None,
+        ','.join(company.source) if company.source else None,
+        snapshot_date,
+        fingerprint(company),
+        company.amount_raw,
+        company.amount_currency,
+        company.amount_unit,
+        company.fx_rate
+    ])
+
+    # Move the company's latest-round pointer unless this is an older snapshot
+    latest_round_statement = Statement('''
+    INSERT INTO latest_round (company_id, snapshot_date)
+    VALUES (?, ?)
+    ON CONFLICT(company_id) DO UPDATE SET
+    snapshot_date = excluded.snapshot_date
+    WHERE excluded.snapshot_date > latest_round.snapshot_date
+    ''', [company_id, snapshot_date])
+
+    link_statements = build_round_link_statements(
+        company_id, snapshot_date, company.investors or [], company.source or []
+    )
+
+    merged_row = (company_id, company.company_name, website, linkedin, brief_summary, enriched_at)
+    return [company_statement, round_statement, latest_round_statement] + link_statements, merged_row
+
+def investor_rows(investors: List[str]) -> List[tuple]:
+    """(investor_id, investor_name) pairs for a round, deduplicated by canonical key"""
+    rows = {}
+    for investor in investors:
+        investor_id = investor_key(investor)
+        if investor_id and investor_id not in rows:
+            rows[investor_id] = investor.strip()
+    return list(rows.items())
+
+def build_round_link_statements(company_id: str, snapshot_date: str, investors: List[str], sources: List[str]) -> List[Statement]:
+    """Statements that replace a round's rows in round_investors/round_sources.
+
+    Like the COALESCE in the funding_rounds upsert, an empty list keeps
+    whatever the round already had.
+    """
+    from libsql_client import Statement
+
+    statements = []
+    investor_pairs = investor_rows(investors)
+    if investor_pairs:
+        placeholders = ', '.join('(?, ?)' for _ in investor_pairs)
+        statements.append(Statement(
+            f"INSERT INTO investors (investor_id, investor_name) VALUES {placeholders} ON CONFLICT(investor_id) DO NOTHING",
+            [value for pair in investor_pairs for value in pair]
+        ))
+        statements.append(Statement(
+            "DELETE FROM round_investors WHERE company_id = ? AND snapshot_date = ?",
+            [company_id, snapshot_date]
+        ))
+        placeholders = ', '.join('(?, ?, ?)' for _ in investor_pairs)
+        statements.append(Statement(
+            f"INSERT INTO round_investors (company_id, snapshot_date, investor_id) VALUES {placeholders}",
+            [value for investor_id, _ in investor_pairs for value in (company_id, snapshot_date, investor_id)]
+        ))
+
+    sources = list(dict.fromkeys(source.strip() for source in sources if source and source.strip()))
+    if sources:
+        statements.append(Statement(
+            "DELETE FROM round_sources WHERE company_id = ? AND snapshot_date = ?",
+            [company_id, snapshot_date]
+        ))
+        placeholders = ', '.join('(?, ?, ?)' for _ in sources)
+        statements.append(Statement(
+            f"INSERT INTO round_sources (company_id, snapshot_date, source) VALUES {placeholders}",
+            [value for source in sources for value in (company_id, snapshot_date, source)]
+        ))
+    return statements
+
+async def read_meta(client: Client, key: str) -> Optional[str]:
+    result = await client.execute("SELECT value FROM schema_meta WHERE key = ?", [key])
+    return result.rows[0][0] if result.rows else None
+
+def meta_statement(key: str, value: str) -> Statement:
+    from libsql_client import Statement
+
+    return Statement(
+        "INSERT INTO schema_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        [key, value]
+    )
+
+async def backfill_round_links(client: Client, page_size: int = 2000):
+    """Populate investors/round_investors/round_sources from the comma-joined columns.
+
+    Each page is written together with the last rowid it covered in
+    schema_meta, so an interrupted backfill resumes after that round; once
+    every round is linked the marker is set to 'done'.
+    """
+    marker = await read_meta(client, ROUND_LINKS_MARKER)
+    if marker == "done":
+        return
+    last_rowid = int(marker or 0)
+    while True:
+        result = await client.execute('''
+            SELECT rowid, company_id, snapshot_date, investors, sources
+            FROM funding_rounds
+            WHERE rowid > ? AND (investors IS NOT NULL OR sources IS NOT NULL)
+            ORDER BY rowid
+            LIMIT ?
+        ''', [last_rowid, page_size])
+        if not result.rows:
+            break
+        statements = []
+        for rowid, company_id, snapshot_date, investors, sources in result.rows:
+            statements += build_round_link_statements(
+                company_id,
+                snapshot_date,
+                (investors or '').split(','),
+                (sources or '').split(',')
+            )
+            last_rowid = rowid
+        await client.batch(statements + [meta_statement(ROUND_LINKS_MARKER, str(last_rowid))])
+    await client.batch([meta_statement(ROUND_LINKS_MARKER, "done")])
+
+async def recompute_usd_amounts(
+    client: Client,
+    table: Optional[FxTable] = None,
+    page_size: int = 5000,
+    dry_run: bool = False,
+) -> Tuple[int, int]:
+    """Re-price stored rounds from their raw amounts with the current FX table.
+
+    Each page of rounds is converted in one vectorized pass at the rate for
+    its snapshot_date and only rounds whose USD amount or rate changed are
+    updated, in one batch per page. Their fingerprint is cleared, so the
+    columnar export rewrites those weeks and the next upload of such a week
+    rewrites the round once. Returns (rounds checked, rounds changed).
+    """
+    from libsql_client import Statement
+
+    from fx import usd_amounts
+
+    checked = changed = 0
+    last_rowid = 0
+    while True:
+        result = await client.execute('''
+            SELECT rowid, round_id, amount_raw, amount_unit, amount_currency, snapshot_date,
+                   amount_raised_usd, fx_rate
+            FROM funding_rounds
+            WHERE rowid > ? AND amount_raw IS NOT NULL
+            ORDER BY rowid
+            LIMIT ?
+        ''', [last_rowid, page_size])
+        if not result.rows:
+            break
+        rows = [tuple(row) for row in result.rows]
+        last_rowid = rows[-1][0]
+        _, _, amounts, units, currencies, dates, _, _ = zip(*rows)
+        usd, rates = usd_amounts(amounts, units, currencies, dates, table)
+        statements = []
+        for row, amount, rate in zip(rows, usd.tolist(), rates.tolist()):
+            # Unknown currencies keep what is stored
+            if rate != rate or (row[6], row[7]) == (amount, rate):
+                continue
+            statements.append(Statement(
+                "UPDATE funding_rounds SET amount_raised_usd = ?, fx_rate = ?, fingerprint = NULL WHERE round_id = ?",
+                [amount, rate, row[1]]
+            ))
+        checked += len(rows)
+        changed += len(statements)
+        if statements and not dry_run:
+            await client.batch(statements)
+    return checked, changed
+
+# client -> threshold -> (index of stored company names, last companies rowid in it)
+_company_name_indexes: "weakref.WeakKeyDictionary[Client, dict]" = weakref.WeakKeyDictionary()
+
+async def company_name_index(client: Client, threshold: float = DEFAULT_MATCH_THRESHOLD) -> CompanyNameIndex:
+    """CompanyNameIndex over the stored company names, kept per client.
+
+    The first call reads every name; later ones only read the companies
+    inserted since (by rowid), including those written by other processes.
+    Company names are never updated, so the index never goes stale otherwise.
+    """
+    indexes = _company_name_indexes.setdefault(client, {})
+    index, last_rowid = indexes.get(threshold) or (CompanyNameIndex(threshold=threshold), 0)
+    result = await client.execute(
+        "SELECT rowid, company_name FROM companies WHERE rowid > ? ORDER BY rowid", [last_rowid]
+    )
+    for rowid, company_name in result.rows:
+        index.add(company_name)
+        last_rowid = rowid
+    indexes[threshold] = (index, last_rowid)
+    return index
+
+async def resolve_existing_company_names(client: Client, company_names: List[str], threshold: float = DEFAULT_MATCH_THRESHOLD) -> dict:
+    """Map incoming names to the spelling already stored in companies"""
+    index = await company_name_index(client, threshold)
+    return index.resolve(company_names, label="companies: ")
+
+async def insert_weekly_data(
+    client: Client,
+    funding_data: FinalFundingDataList,
+    snapshot_date: Optional[str] = None,
+    match_threshold: Optional[float] = DEFAULT_MATCH_THRESHOLD,
+):
+    """Insert data with weekly snapshot into Turso.
+
+    Existing companies are looked up in one query and every statement is sent
+    in a single transactional batch. If that batch fails, each company is
+    retried in its own batch so failures are still reported per company.
+    Incoming names are fuzzy-matched to stored ones unless match_threshold
+    is None. Returns the names of companies that could not be saved.
+    """
     if snapshot_date is None:
         snapshot_date = datetime.now().strftime('%Y-%m-%d')
-    
+
+    company_names = list(dict.fromkeys(company.company_name for company in funding_data.companies))
+    if match_threshold is None:
+        stored_names = {}
+    else:
+        stored_names = await resolve_existing_company_names(client, company_names, match_threshold)
+    rows_by_stored_name = await fetch_existing_companies(
+        client, list({stored_names.get(name, name) for name in company_names})
+    )
+    existing_companies = {
+        name: rows_by_stored_name[stored_names.get(name, name)]
+        for name in company_names
+        if stored_names.get(name, name) in rows_by_stored_name
+    }
+
+    company_statements = []
+    failed_companies = []
     for company in funding_data.companies:
         try:
-            company_id = generate_uuid()
-            
-            # First check if company exists and get its data
-            existing_company = await client.execute(
-                "SELECT company_id, website, linkedin, brief_summary FROM companies WHERE company_name = ?",
-                [company.company_name]
+            statements, merged_row = build_company_statements(
+                company, existing_companies.get(company.company_name), snapshot_date
             )
-            
-            if existing_company.rows:
-                # Company exists - update only if new data is available
-                company_id = existing_company.rows[0][0]
-                current_website = existing_company.rows[0][1]
-                current_linkedin = existing_company.rows[0][2]
-                current_brief_summary = existing_company.rows[0][3]
-                
-                # Use existing values if new ones are empty/None
-                website = company.website if company.website else current_website
-                linkedin = company.linkedin if company.linkedin else current_linkedin
-                brief_summary = company.brief_summary if company.brief_summary else current_brief_summary
-                
-                await client.execute('''
-                UPDATE companies 
-                SET 
-                    industry_sector = ?,
-                    website = ?,
-                    linkedin = ?,
-                    brief_summary = ?
-                WHERE company_id = ?
-                ''', [
-                    company.industry_sector,
-                    website,
-                    linkedin,
-                    brief_summary,
-                    company_id
-                ])
-            else:
-                # New company - insert all data
-                await client.execute('''
-                INSERT INTO companies 
-                (company_id, company_name, industry_sector, website, linkedin, brief_summary)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', [
-                    company_id,
-                    company.company_name,
-                    company.industry_sector,
-                    company.website,
-                    company.linkedin,
-                    company.brief_summary
-                ])
-
-            # Insert funding round with weekly snapshot
-            # Use either the funding_data valuation or company valuation, prioritizing non-null values
-            valuation = company.valuation_usd if company.valuation_usd is not None else None
-            
-            await client.execute('''
-            INSERT INTO funding_rounds 
-            (round_id, company_id, amount_raised_usd, funding_stage, valuation_usd, 
-             investors, sources, snapshot_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(company_id, snapshot_date) DO UPDATE SET
-            amount_raised_usd = excluded.amount_raised_usd,
-            funding_stage = excluded.funding_stage,
-            valuation_usd = COALESCE(excluded.valuation_usd, funding_rounds.valuation_usd),
-            investors = COALESCE(excluded.investors, funding_rounds.investors),
-            sources = COALESCE(excluded.sources, funding_rounds.sources)
-            ''', [
-                generate_uuid(),
-                company_id,
-                company.amount_raised_usd,
-                str(company.funding_stage),
-                valuation,
-                ','.join(company.investors) if company.investors else None,
-                ','.join(company.source) if company.source else None,
-                snapshot_date
-            ])
+            # A company listed twice in the same week updates the row built above
+            existing_companies[company.company_name] = merged_row
+            company_statements.append((company.company_name, statements))
         except Exception as e:
             print(f"Error processing company {company.company_name}: {e}")
-            continue
+            failed_companies.append(company.company_name)
+
+    if not company_statements:
+        return failed_companies
 
-async def query_latest_rounds(client: Client):
-    """Query latest funding rounds from Turso"""
     try:
-        result = await client.execute('''
-            SELECT 
+        await client.batch([stmt for _, statements in company_statements for stmt in statements])
+    except Exception as e:
+        print(f"Bulk upload failed, retrying company by company: {e}")
+        for company_name, statements in company_statements:
+            try:
+                await client.batch(statements)
+            except Exception as e:
+                print(f"Error processing company {company_name}: {e}")
+                failed_companies.append(company_name)
+
+    return failed_companies
+
+async def upload_week_delta(
+    client: Client,
+    funding_data: FinalFundingDataList,
+    snapshot_date: str,
+    match_threshold: Optional[float] = DEFAULT_MATCH_THRESHOLD,
+) -> Tuple[List[str], RoundDelta]:
+    """Upload only the week's new and changed rounds.
+
+    Rounds identical to what is stored for this snapshot, and deals already
+    stored under an adjacent week, are left out. Returns the companies that
+    could not be saved and the delta.
+    """
+    delta = await diff_week(client, funding_data, snapshot_date, match_threshold=match_threshold)
+    print(delta.summary())
+    failed_companies = await insert_weekly_data(client, delta.upload, snapshot_date, match_threshold)
+    return failed_companies, delta
+
+async def query_latest_rounds(
+    client: Client,
+    stage: Optional[str] = None,
+    sector: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """Latest funding round per company, newest first.
+
+    Reads the latest_round table maintained by the upload path, so the cost
+    is one page of index lookups instead of a MAX() per company. Filters
+    are optional; dates are inclusive 'YYYY-MM-DD' strings.
+    """
+    conditions = []
+    args = []
+    if stage is not None:
+        conditions.append("fr.funding_stage = ?")
+        args.append(str(stage))
+    if sector is not None:
+        conditions.append("c.industry_sector = ?")
+        args.append(sector)
+    if start_date is not None:
+        conditions.append("lr.snapshot_date >= ?")
+        args.append(start_date)
+    if end_date is not None:
+        conditions.append("lr.snapshot_date <= ?")
+        args.append(end_date)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    try:
+        result = await client.execute(f'''
+            SELECT
                 c.company_name,
                 c.industry_sector,
                 fr.amount_raised_usd,
@@ -259,54 +708,146 @@ async def query_latest_rounds(client: Client):
                 fr.valuation_usd,
                 fr.investors,
                 fr.snapshot_date
-            FROM companies c
-            LEFT JOIN funding_rounds fr ON c.company_id = fr.company_id
-            WHERE fr.snapshot_date = (
-                SELECT MAX(snapshot_date) 
-                FROM funding_rounds 
-                WHERE company_id = c.company_id
-            )
-        ''')
-        
-        for row in result.rows:
-            print(f"\nCompany: {row[0]}")
-            print(f"Industry: {row[1]}")
-            print(f"Latest Amount: ${row[2]:,.2f}" if row[2] else "Amount: Not disclosed")
-            print(f"Stage: {row[3]}")
-            print(f"Valuation: ${row[4]:,.2f}" if row[4] else "Valuation: Not disclosed")
-            print(f"Investors: {row[5]}" if row[5] else "Investors: None")
-            print(f"Snapshot Date: {row[6]}")
+            FROM latest_round lr
+            JOIN funding_rounds fr ON fr.company_id = lr.company_id AND fr.snapshot_date = lr.snapshot_date
+            JOIN companies c ON c.company_id = lr.company_id
+            {where}
+            ORDER BY lr.snapshot_date DESC, lr.company_id
+            LIMIT ? OFFSET ?
+        ''', args + [limit, offset])
+        return result.rows
     except Exception as e:
         print(f"Error querying latest rounds: {e}")
+        return []
 
-async def main():
-    # Load and validate data
-    funding_data = load_and_validate_funding()
-    if not funding_data:
-        print("Failed to load funding data")
-        return
-        
-    additional_data = load_and_validate_companies()
-    if not additional_data:
-        print("Failed to load additional company data")
-        return
+async def query_rounds_by_investor(
+    client: Client,
+    investor_name: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """Rounds an investor took part in, newest first, via the round_investors index"""
+    conditions = ["ri.investor_id = ?"]
+    args = [investor_key(investor_name)]
+    if start_date is not None:
+        conditions.append("ri.snapshot_date >= ?")
+        args.append(start_date)
+    if end_date is not None:
+        conditions.append("ri.snapshot_date <= ?")
+        args.append(end_date)
+
+    result = await client.execute(f'''
+        SELECT
+            c.company_name,
+            c.industry_sector,
+            fr.amount_raised_usd,
+            fr.funding_stage,
+            fr.valuation_usd,
+            fr.investors,
+            fr.snapshot_date
+        FROM round_investors ri
+        JOIN funding_rounds fr ON fr.company_id = ri.company_id AND fr.snapshot_date = ri.snapshot_date
+        JOIN companies c ON c.company_id = ri.company_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY ri.snapshot_date DESC, ri.company_id DESC
+        LIMIT ? OFFSET ?
+    ''', args + [limit, offset])
+    return result.rows
 
-    # Create a mapping of company data with valuations
+async def query_top_investors(
+    client: Client,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 20,
+):
+    """Investors by number of rounds (and total amount) in a date range.
+
+    Rounds are counted from the round_investors index alone; amounts are
+    only summed for investors whose count can make the top `limit`, since
+    the total just breaks ties. Summing for every investor probes
+    funding_rounds once per link, which is slower than scanning the
+    comma-joined column.
+    """
+    conditions = []
+    args = []
+    if start_date is not None:
+        conditions.append("snapshot_date >= ?")
+        args.append(start_date)
+    if end_date is not None:
+        conditions.append("snapshot_date <= ?")
+        args.append(end_date)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    round_where = " ".join(f"AND ri.{condition}" for condition in conditions)
+
+    result = await client.execute(f'''
+        WITH counts AS (
+            SELECT investor_id, COUNT(*) AS rounds
+            FROM round_investors
+            {where}
+            GROUP BY investor_id
+        ),
+        candidates AS (
+            -- Every investor tied with the limit-th one, or all if there are fewer
+            SELECT investor_id, rounds FROM counts
+            WHERE rounds >= COALESCE((SELECT rounds FROM counts ORDER BY rounds DESC LIMIT 1 OFFSET ?), 0)
+        )
+        SELECT
+            i.investor_name,
+            c.rounds,
+            (
+                SELECT SUM(fr.amount_raised_usd)
+                FROM round_investors ri
+                CROSS JOIN funding_rounds fr
+                    ON fr.company_id = ri.company_id AND fr.snapshot_date = ri.snapshot_date
+                WHERE ri.investor_id = c.investor_id {round_where}
+            ) AS total_raised_usd
+        FROM candidates c
+        JOIN investors i ON i.investor_id = c.investor_id
+        ORDER BY c.rounds DESC, total_raised_usd DESC
+        LIMIT ?
+    ''', args + [limit - 1] + args + [limit])
+    return result.rows
+
+def print_latest_rounds(rows):
+    for row in rows:
+        print(f"\nCompany: {row[0]}")
+        print(f"Industry: {row[1]}")
+        print(f"Latest Amount: ${row[2]:,.2f}" if row[2] else "Amount: Not disclosed")
+        print(f"Stage: {row[3]}")
+        print(f"Valuation: ${row[4]:,.2f}" if row[4] else "Valuation: Not disclosed")
+        print(f"Investors: {row[5]}" if row[5] else "Investors: None")
+        print(f"Snapshot Date: {row[6]}")
+
+def combine_funding_data(funding_data: FundingDetailsList, additional_data: AdditionalFundingDetailsList) -> FinalFundingDataList:
+    """Join the scraped rounds with the agent's enrichment by company name"""
+    # Create a mapping of company data with valuations. The agent doesn't
+    # always keep names verbatim, so names are matched through a fuzzy index.
     company_data_map = {
         company.company_name: company 
         for company in additional_data.companies
     }
+    name_index = CompanyNameIndex(company_data_map)
+    matched_names = name_index.resolve(
+        (funding.company_name for funding in funding_data.funding_companies_list),
+        label="enrichment: ",
+    )
     
     # Combine the data
     combined_companies = []
     
     for funding in funding_data.funding_companies_list:
-        additional_info = company_data_map.get(funding.company_name, None)
+        additional_info = company_data_map.get(matched_names.get(funding.company_name), None)
         
         # Create combined record with valuation from additional data if available
         combined_record = FinalFundingDetails(
             company_name=funding.company_name,
             amount_raised_usd=funding.amount_raised_usd,
+            amount_raw=funding.amount_raw,
+            amount_currency=funding.amount_currency,
+            amount_unit=funding.amount_unit,
+            fx_rate=funding.fx_rate,
             investors=funding.investors,
             industry_sector=funding.industry_sector,
             funding_stage=funding.funding_stage,
@@ -314,33 +855,50 @@ async def main():
             source=funding.source,
             website=additional_info.website if additional_info else None,
             linkedin=additional_info.linkedin if additional_info else None,
-            brief_summary=additional_info.brief_summary if additional_info else None
+            brief_summary=additional_info.brief_summary if additional_info else None,
+            enriched_at=additional_info.enriched_at if additional_info else None
         )
         combined_companies.append(combined_record)
     
     # Create final combined dataset
-    final_funding_data = FinalFundingDataList(companies=combined_companies)
-    
-    client = None
+    return FinalFundingDataList(companies=combined_companies)
+
+async def main():
+    # Load and validate data
+    funding_data = load_and_validate_funding()
+    if not funding_data:
+        print("Failed to load funding data")
+        return
+        
+    additional_data = load_and_validate_companies()
+    if not additional_data:
+        print("Failed to load additional company data")
+        return
+
+    final_funding_data = combine_funding_data(funding_data, additional_data)
+
     try:
-        # Initialize Turso client
-        client = libsql_client.create_client(url=TURSO_URL, auth_token=TURSO_AUTH_TOKEN)
+        # Shared Turso client for this event loop
+        client = resources.libsql(TURSO_URL, TURSO_AUTH_TOKEN)
         
         # Create tables if they don't exist
         # await create_turso_table(client)
+        await migrate_turso_schema(client)
         
         # Insert current week's data
         snapshot_date = datetime.now().strftime('%Y-%m-%d')
-        await insert_weekly_data(client, final_funding_data, snapshot_date)
+        failed_companies, _ = await upload_week_delta(client, final_funding_data, snapshot_date)
+        if failed_companies:
+            print(f"Failed to save {len(failed_companies)} companies: {', '.join(failed_companies)}")
         
         # Optionally query and display results
-        # await query_latest_rounds(client)
+        # print_latest_rounds(await query_latest_rounds(client))
         
     except Exception as e:
         print(f"Error in main execution: {e}")
     finally:
-        if client:
-            await client.close()
+        await resources.aclose()
+        tracer.flush()
         print('SAVED')
 
 if __name__ == "__main__":    
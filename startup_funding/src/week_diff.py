@@ -0,0 +1,266 @@
+# week_diff.py
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import defaultdict
+from datetime import date
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from models import FinalFundingDataList, FinalFundingDetails
+from name_index import DEFAULT_MATCH_THRESHOLD, DOMAIN_SUFFIX, LEGAL_SUFFIXES, investor_key, name_key
+
+if TYPE_CHECKING:
+    from libsql_client import Client
+
+# Rounds of the same company and stage reported up to this many days apart are
+# treated as one deal repeated by the outlets in adjacent weeks
+DUPLICATE_WINDOW_DAYS = 14
+# Amounts within this fraction of each other count as the same round
+AMOUNT_TOLERANCE = 0.1
+
+
+def round_key(company: FinalFundingDetails) -> str:
+    """Normalized company name and stage; one deal keeps its key across outlets and weeks"""
+    return f"{name_key(company.company_name)}|{company.funding_stage.value}"
+
+
+def stored_round_key(company_id: str, funding_stage: str) -> str:
+    """Stored company and stage, whatever spelling each outlet used for the name"""
+    return f"{company_id}|{funding_stage}"
+
+
+def fingerprint(company: FinalFundingDetails) -> str:
+    """Hash of everything an upload writes for the company and its round.
+
+    Investors are compared by canonical key and lists are sorted, so
+    re-ordered or re-spelled investor lists don't count as changes;
+    enriched_at is left out because it only says when a lookup happened.
+    """
+    payload = {
+        "amount_raised_usd": company.amount_raised_usd,
+        "funding_stage": company.funding_stage.value,
+        "valuation_usd": company.valuation_usd,
+        "investors": sorted({investor_key(investor) for investor in company.investors or []}),
+        "source": sorted(set(company.source or [])),
+        "industry_sector": company.industry_sector,
+        "website": company.website,
+        "linkedin": company.linkedin,
+        "brief_summary": company.brief_summary,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def rows_written(company: FinalFundingDetails) -> int:
+    # companies, funding_rounds and latest_round, plus an investors and a
+    # round_investors row per investor and a round_sources row per source
+    return 3 + 2 * len(company.investors or []) + len(company.source or [])
+
+
+def name_words(name: str) -> List[str]:
+    name = LEGAL_SUFFIXES.sub("", name.strip().lower())
+    return re.findall(r"[a-z0-9]+", DOMAIN_SUFFIX.sub("", name))
+
+
+def shares_name_prefix(a: str, b: str) -> bool:
+    """Whether one name is the other's leading words, as in Cashfree and Cashfree Payments"""
+    shorter, longer = sorted((name_words(a), name_words(b)), key=len)
+    return bool(shorter) and len(shorter) < len(longer) and longer[: len(shorter)] == shorter
+
+
+def amounts_match(a: Optional[float], b: Optional[float]) -> bool:
+    if a is None or b is None:
+        return True
+    return abs(a - b) <= AMOUNT_TOLERANCE * max(a, b)
+
+
+class DuplicateRound(BaseModel):
+    company_name: str
+    round_key: str
+    # Snapshot that already holds the round
+    stored_snapshot_date: str
+
+
+class RoundDelta(BaseModel):
+    """What changed in a week compared with the rounds already stored"""
+
+    snapshot_date: str
+    inserts: List[FinalFundingDetails] = []
+    changes: List[FinalFundingDetails] = []
+    duplicates: List[DuplicateRound] = []
+    unchanged: List[str] = []
+    rows_total: int = 0
+    rows_sent: int = 0
+
+    @property
+    def upload(self) -> FinalFundingDataList:
+        return FinalFundingDataList(companies=self.inserts + self.changes)
+
+    def summary(self) -> str:
+        total = len(self.inserts) + len(self.changes) + len(self.duplicates) + len(self.unchanged)
+        saved = self.rows_total - self.rows_sent
+        saved_pct = saved / self.rows_total * 100 if self.rows_total else 0.0
+        return (
+            f"Diff {self.snapshot_date}: {len(self.upload.companies)}/{total} rounds to upload "
+            f"({len(self.inserts)} new, {len(self.changes)} changed), {len(self.unchanged)} unchanged, "
+            f"{len(self.duplicates)} likely duplicates of earlier weeks; "
+            f"~{saved}/{self.rows_total} row writes saved ({saved_pct:.0f}%)"
+        )
+
+
+def classify(
+    funding_data: FinalFundingDataList,
+    snapshot_date: str,
+    stored: Dict[str, List[tuple]],
+    window_days: int = DUPLICATE_WINDOW_DAYS,
+    key: Callable[[FinalFundingDetails], str] = round_key,
+) -> RoundDelta:
+    """Split a week into inserts, changes, unchanged and cross-week duplicates.
+
+    `stored` maps a round key -> (snapshot_date, fingerprint, amount_raised_usd)
+    rows already in the database around `snapshot_date`; `key` gives the
+    same key for an incoming record.
+    """
+    delta = RoundDelta(snapshot_date=snapshot_date)
+    week = date.fromisoformat(snapshot_date)
+    for company in funding_data.companies:
+        key_of_round = key(company)
+        rows = stored.get(key_of_round, [])
+        delta.rows_total += rows_written(company)
+
+        same_week = next((row for row in rows if row[0] == snapshot_date), None)
+        if same_week is not None:
+            if same_week[1] == fingerprint(company):
+                delta.unchanged.append(company.company_name)
+            else:
+                delta.changes.append(company)
+                delta.rows_sent += rows_written(company)
+            continue
+
+        earlier = next(
+            (
+                row for row in sorted(rows, key=lambda row: row[0])
+                if abs((date.fromisoformat(row[0]) - week).days) <= window_days
+                and amounts_match(row[2], company.amount_raised_usd)
+            ),
+            None,
+        )
+        if earlier is not None:
+            delta.duplicates.append(
+                DuplicateRound(
+                    company_name=company.company_name, round_key=key_of_round, stored_snapshot_date=earlier[0]
+                )
+            )
+            continue
+
+        delta.inserts.append(company)
+        delta.rows_sent += rows_written(company)
+    return delta
+
+
+async def diff_week(
+    client: Client,
+    funding_data: FinalFundingDataList,
+    snapshot_date: str,
+    window_days: int = DUPLICATE_WINDOW_DAYS,
+    match_threshold: Optional[float] = DEFAULT_MATCH_THRESHOLD,
+) -> RoundDelta:
+    """Compare a week's records with the stored rounds.
+
+    Incoming names are first resolved to the stored company the upload would
+    write to (fuzzy-matched unless match_threshold is None), so "Cashfree
+    Payments" one week and "Cashfree" the next are the same company's round.
+    Rounds are then compared by company_id and stage, in one query.
+    """
+    from validate_and_upload import fetch_existing_companies, resolve_existing_company_names
+
+    company_names = list(dict.fromkeys(company.company_name for company in funding_data.companies))
+    if match_threshold is None or not company_names:
+        stored_names = {}
+    else:
+        stored_names = await resolve_existing_company_names(client, company_names, match_threshold)
+    rows_by_stored_name = await fetch_existing_companies(
+        client, list({stored_names.get(name, name) for name in company_names})
+    )
+    company_ids = {
+        name: rows_by_stored_name[stored_names.get(name, name)][0]
+        for name in company_names
+        if stored_names.get(name, name) in rows_by_stored_name
+    }
+
+    def key(company: FinalFundingDetails) -> str:
+        company_id = company_ids.get(company.company_name)
+        if company_id is None:
+            # Not stored yet, so nothing to compare against
+            return f"new|{round_key(company)}"
+        return stored_round_key(company_id, company.funding_stage.value)
+
+    ids = list(dict.fromkeys(company_ids.values()))
+    stored = defaultdict(list)
+    if ids:
+        placeholders = ", ".join("?" for _ in ids)
+        result = await client.execute(
+            f"""
+            SELECT company_id, funding_stage, snapshot_date, fingerprint, amount_raised_usd
+            FROM funding_rounds
+            WHERE company_id IN ({placeholders})
+                AND snapshot_date BETWEEN date(?, ?) AND date(?, ?)
+            """,
+            ids + [snapshot_date, f"-{window_days} days", snapshot_date, f"+{window_days} days"],
+        )
+        for company_id, funding_stage, stored_date, stored_fingerprint, amount in result.rows:
+            stored[stored_round_key(company_id, funding_stage)].append((stored_date, stored_fingerprint, amount))
+    delta = classify(funding_data, snapshot_date, stored, window_days, key)
+    await find_renamed_duplicates(client, delta, window_days)
+    return delta
+
+
+async def find_renamed_duplicates(client: Client, delta: RoundDelta, window_days: int = DUPLICATE_WINDOW_DAYS) -> None:
+    """Move new rounds that repeat a stored deal under a longer or shorter name to duplicates.
+
+    Outlets drop or add trailing words ("Cashfree" vs "Cashfree Payments"),
+    which the fuzzy matcher rightly won't merge into one company. A new
+    round still counts as a repeat when a stored round in an adjacent week
+    has the same stage and amount and one name is the other's leading words.
+    """
+    if not delta.inserts:
+        return
+    stages = list({company.funding_stage.value for company in delta.inserts})
+    placeholders = ", ".join("?" for _ in stages)
+    result = await client.execute(
+        f"""
+        SELECT c.company_name, fr.funding_stage, fr.snapshot_date, fr.amount_raised_usd
+        FROM funding_rounds fr
+        JOIN companies c ON c.company_id = fr.company_id
+        WHERE fr.funding_stage IN ({placeholders})
+            AND fr.snapshot_date BETWEEN date(?, ?) AND date(?, ?)
+            AND fr.snapshot_date != ?
+        ORDER BY fr.snapshot_date
+        """,
+        stages + [
+            delta.snapshot_date, f"-{window_days} days", delta.snapshot_date, f"+{window_days} days",
+            delta.snapshot_date,
+        ],
+    )
+    inserts = []
+    for company in delta.inserts:
+        matches = [
+            row for row in result.rows
+            if row[1] == company.funding_stage.value
+            and amounts_match(row[3], company.amount_raised_usd)
+            and shares_name_prefix(row[0], company.company_name)
+        ]
+        # Only when the stored name is unambiguous
+        if len({row[0] for row in matches}) != 1:
+            inserts.append(company)
+            continue
+        delta.duplicates.append(DuplicateRound(
+            company_name=company.company_name,
+            round_key=round_key(company),
+            stored_snapshot_date=matches[0][2],
+        ))
+        delta.rows_sent -= rows_written(company)
+    delta.inserts = inserts